@@ -1,43 +1,237 @@
 import uvicorn
-from fasthtml.common import *
 from fasthtml.core import FastHTML
 from starlette.middleware.sessions import SessionMiddleware
-from starlette.staticfiles import StaticFiles
+from starlette.requests import Request
 from contextlib import asynccontextmanager
+import asyncio
+import functools
+import importlib
+import os
 import secrets
 import logging
-from pathlib import Path
 import tempfile
-
-# Importar componentes
-from components.layout import page_layout
-from components.ui import tool_card
+import time
+from pathlib import Path
 
 # Importar rotas
 from routes import home, pdf_tools, text_corrector, media_converter, transcriber, rdpm_query, prescription
 
 # Importar utilitários
-from utils.task_manager import initialize_async_processor, shutdown_async_processor, submit_task, get_task_status
-from utils.file_utils import UPLOAD_TEMP_DIR, download_file_route
+from utils.task_manager import initialize_async_processor, shutdown_async_processor, start_process_pool, submit_task, get_task_status
+from utils.file_utils import UPLOAD_TEMP_DIR, download_file_route, temp_files_cleanup_scheduler
+from utils.responses import ORJSONResponse
+from utils.static_files import STATIC_DIR, CachedStaticFiles, precompress_static_files
+from utils.unoserver_pool import UnoServerPool
 
 # Configuração de Logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper(), format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 log = logging.getLogger(__name__)
 
 # Constantes e Caminhos
-MODULES_DIR = Path(__file__).parent / "modules"
-FILES_DIR = Path(__file__).parent / "files"
-STATIC_DIR = Path(__file__).parent / "static"
+SESSION_KEY_FILE = Path(__file__).parent / ".session_key"
+# Tentativas de leitura de um arquivo de chave ainda vazio (intervalo de 100 ms)
+SESSION_KEY_READ_ATTEMPTS = 20
 
 # Verificar diretório temporário
 UPLOAD_TEMP_DIR.mkdir(exist_ok=True)
-log.info(f"Diretório temporário para uploads: {UPLOAD_TEMP_DIR}")
+log.info("Diretório temporário para uploads: %s", UPLOAD_TEMP_DIR)
+
+def _load_session_secret(key_file: Path = SESSION_KEY_FILE) -> str:
+    """
+    Obtém a chave das sessões: variável SESSION_SECRET ou arquivo persistido.
+    A chave é gerada uma única vez, para que todos os workers e reinícios compartilhem as sessões.
+
+    Args:
+        key_file (Path, optional): Arquivo onde a chave gerada é persistida
+
+    Returns:
+        str: Chave secreta para o SessionMiddleware
+    """
+    secret = os.environ.get("SESSION_SECRET")
+    if secret:
+        return secret
+
+    # A chave é gravada por completo num arquivo temporário e só então ligada ao nome final:
+    # os.link falha se o arquivo já existir, então apenas o primeiro worker cria a chave
+    # e os demais nunca leem um arquivo parcialmente escrito
+    secret = secrets.token_urlsafe(32)
+    fd, tmp_name = tempfile.mkstemp(dir=key_file.parent, prefix=f".{key_file.name}.")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(secret)
+        try:
+            os.link(tmp_name, key_file)
+            log.info("Chave de sessão gerada e persistida em %s", key_file)
+            return secret
+        except FileExistsError:
+            pass
+
+        # Outro worker (ou execução anterior) já criou a chave: usar a mesma
+        for _ in range(SESSION_KEY_READ_ATTEMPTS):
+            existing = key_file.read_text().strip()
+            if existing:
+                return existing
+            time.sleep(0.1)
+
+        # Arquivo vazio que não se completou (gravação interrompida): substituir atomicamente
+        log.warning("Arquivo de chave de sessão vazio: %s. Gravando nova chave.", key_file)
+        os.replace(tmp_name, key_file)
+        return key_file.read_text().strip()
+    finally:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+
+class AppSessionMiddleware(SessionMiddleware):
+    """
+    SessionMiddleware que não atua em /static: CSS/JS/imagens não usam sessão,
+    então não pagam a verificação da assinatura do cookie nem a serialização na resposta.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith("/static/"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+async def _import_module(name: str):
+    """Importa um módulo em thread: imports pesados (torch, langchain) não travam o event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, importlib.import_module, name)
+
+async def _init_text_corrector(app: FastHTML) -> bool:
+    """Inicializa o TextCorrector (API LLM)"""
+    try:
+        text_corrector_module = await _import_module("modules.text_corrector")
+        loop = asyncio.get_running_loop()
+        app.state.text_corrector = await loop.run_in_executor(None, text_corrector_module.TextCorrector)
+        # A configuração só muda na inicialização: calculada uma vez para as rotas
+        app.state.text_corrector_configured = app.state.text_corrector.is_configured()
+        if not app.state.text_corrector_configured:
+            log.warning("TextCorrector (API LLM) não configurado.")
+        return True
+    except Exception as tc_e:
+        log.error("Erro ao inicializar TextCorrector: %s", tc_e, exc_info=True)
+        app.state.text_corrector = None
+        app.state.text_corrector_configured = False
+        return False
+
+async def _init_process_pool(app: FastHTML) -> bool:
+    """Cria os workers do pool de processos (PDF/OCR) a partir do forkserver"""
+    try:
+        await start_process_pool()
+        return True
+    except Exception as pool_e:
+        log.error("Erro ao iniciar o pool de processos: %s", pool_e, exc_info=True)
+        return False
+
+async def _init_pdf(app: FastHTML) -> bool:
+    """Inicializa o PDFTransformer"""
+    try:
+        pdf_module = await _import_module("modules.pdf_transformer")
+        # O construtor verifica as ferramentas externas (subprocessos): executar em thread
+        loop = asyncio.get_running_loop()
+        app.state.pdf_transformer = await loop.run_in_executor(None, pdf_module.PDFTransformer)
+        # Operações enviadas ao pool de processos: funções do módulo, não métodos da instância
+        app.state.pdf_module = pdf_module
+        # Ferramentas externas detectadas uma única vez: as rotas consultam apenas estes flags
+        app.state.libreoffice_available = bool(app.state.pdf_transformer.libreoffice_path)
+        app.state.ocr_available = bool(app.state.pdf_transformer.ocrmypdf_installed)
+        log.info("PDFTransformer inicializado.")
+        return True
+    except Exception as pdf_e:
+        log.error("Erro ao inicializar PDFTransformer: %s", pdf_e, exc_info=True)
+        app.state.pdf_transformer = None
+        app.state.pdf_module = None
+        return False
+
+async def _init_unoserver(app: FastHTML) -> bool:
+    """Inicia o pool de LibreOffice residente (unoserver), se instalado"""
+    try:
+        pool = UnoServerPool()
+        if await pool.start():
+            app.state.unoserver_pool = pool
+            log.info("Pool unoserver inicializado.")
+        # Sem unoserver as conversões seguem pelo soffice --headless: não é um erro
+        return True
+    except Exception as uno_e:
+        log.error("Erro ao iniciar o pool unoserver: %s", uno_e, exc_info=True)
+        return False
+
+async def _init_whisper(app: FastHTML) -> bool:
+    """Tenta carregar o modelo Whisper e as funções de mídia"""
+    try:
+        # O módulo importa whisper/torch: import e carregamento executados em thread
+        media_module = await _import_module("modules.media_converter")
+        loop = asyncio.get_running_loop()
+        whisper_model = await loop.run_in_executor(None, media_module.load_whisper_model_instance)
+        if whisper_model is not None:  # Verificar se o modelo foi carregado
+            app.state.transcribe_audio_file = media_module.transcribe_audio_file
+            app.state.convert_video_to_mp3 = media_module.convert_video_to_mp3
+            app.state.whisper_model = whisper_model
+            log.info("Modelo Whisper carregado globalmente.")
+            return True
+        log.error("Falha ao carregar modelo Whisper.")
+    except Exception as whisper_e:
+        log.error("Erro ao carregar recursos de mídia: %s", whisper_e, exc_info=True)
+    app.state.whisper_model = None
+    return False
+
+async def _init_rdpm(app: FastHTML, text_corrector_task: asyncio.Task) -> bool:
+    """Tenta inicializar o Agente RDPM (depende do TextCorrector)"""
+    # O agente usa o cliente LLM do TextCorrector, então aguarda sua inicialização
+    await text_corrector_task
+    try:
+        if app.state.text_corrector:
+            # Imports do LangChain, indexação do PDF e embeddings são bloqueantes: executar em thread
+            rdpm_module = await _import_module("modules.rdpm_agent")
+            loop = asyncio.get_running_loop()
+            initialized = await loop.run_in_executor(
+                None, functools.partial(rdpm_module.initialize_rdpm_agent, llm_client=app.state.text_corrector.get_llm_client())
+            )
+            app.state.query_rdpm = rdpm_module.query_rdpm
+            app.state.stream_rdpm = rdpm_module.stream_rdpm
+            app.state.rdpm_agent_initialized = initialized
+
+            if not initialized:
+                log.error("Falha ao inicializar o Agente RDPM.")
+            else:
+                log.info("Agente RDPM inicializado globalmente.")
+            return initialized
+        log.warning("TextCorrector não inicializado, pulando Agente RDPM.")
+    except Exception as rag_e:
+        log.error("Erro ao inicializar Agente RDPM: %s", rag_e, exc_info=True)
+    app.state.rdpm_agent_initialized = False
+    return False
+
+async def _log_startup_result(tasks: list) -> None:
+    """Aguarda as inicializações em background e registra o resultado geral"""
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    if all(result is True for result in results):
+        log.info("Inicialização de componentes concluída com sucesso.")
+    else:
+        log.error("Inicialização de componentes concluída com erros (alguns componentes podem estar indisponíveis).")
 
 @asynccontextmanager
 async def lifespan(app: FastHTML):
     """Gerencia recursos durante o ciclo de vida da aplicação"""
-    log.info("Iniciando Lifespan - Carregando modelos e inicializando módulos...")
-    startup_success = True
+    log.info("Iniciando Lifespan - Agendando carregamento de modelos e módulos...")
+
+    # Estado inicial: componentes indisponíveis até que as tarefas de inicialização terminem
+    app.state.text_corrector = None
+    app.state.text_corrector_configured = False
+    app.state.pdf_transformer = None
+    app.state.pdf_module = None
+    app.state.libreoffice_available = False
+    app.state.ocr_available = False
+    app.state.unoserver_pool = None
+    app.state.whisper_model = None
+    app.state.transcribe_audio_file = None
+    app.state.convert_video_to_mp3 = None
+    app.state.query_rdpm = None
+    app.state.stream_rdpm = None
+    app.state.rdpm_agent_initialized = False
+    init_tasks = []
+    temp_cleanup_task = None
 
     try:
         # 1. Inicializar o processador assíncrono
@@ -45,97 +239,92 @@ async def lifespan(app: FastHTML):
         await initialize_async_processor()
         app.state.submit_task = submit_task
         app.state.get_task_status = get_task_status
-        
-        # 2. Inicializar TextCorrector
-        try:
-            from modules.text_corrector import TextCorrector
-            app.state.text_corrector = TextCorrector()
-            if not app.state.text_corrector.is_configured():
-                log.warning("TextCorrector (API LLM) não configurado.")
-        except Exception as tc_e:
-            log.error(f"Erro ao inicializar TextCorrector: {tc_e}", exc_info=True)
-            app.state.text_corrector = None
-
-        # 3. Inicializar PDFTransformer
-        try:
-            from modules.pdf_transformer import PDFTransformer
-            app.state.pdf_transformer = PDFTransformer()
-            log.info("PDFTransformer inicializado.")
-        except Exception as pdf_e:
-            log.error(f"Erro ao inicializar PDFTransformer: {pdf_e}", exc_info=True)
-            app.state.pdf_transformer = None
-            startup_success = False
-
-        # 4. Tentar carregar Modelo Whisper
-        # 4. Tentar carregar Modelo Whisper
-        try:
-            from modules.media_converter import load_whisper_model_instance, transcribe_audio_file, convert_video_to_mp3
-            app.state.whisper_model = load_whisper_model_instance()
-            if app.state.whisper_model is not None:  # Verificar se o modelo foi carregado
-                app.state.transcribe_audio_file = transcribe_audio_file
-                app.state.convert_video_to_mp3 = convert_video_to_mp3
-                log.info("Modelo Whisper carregado globalmente.")
-            else:
-                log.error("Falha ao carregar modelo Whisper.")
-        except Exception as whisper_e:
-            log.error(f"Erro ao carregar recursos de mídia: {whisper_e}", exc_info=True)
-            app.state.whisper_model = None
 
-        # 5. Tentar inicializar Agente RDPM
-        try:
-            from modules.rdpm_agent import initialize_rdpm_agent, query_rdpm
-            
-            if hasattr(app.state, "text_corrector") and app.state.text_corrector:
-                app.state.rdpm_agent_initialized = initialize_rdpm_agent(llm_client=app.state.text_corrector.get_llm_client())
-                app.state.query_rdpm = query_rdpm
-                
-                if not app.state.rdpm_agent_initialized:
-                    log.error("Falha ao inicializar o Agente RDPM.")
-                else:
-                    log.info("Agente RDPM inicializado globalmente.")
-            else:
-                log.warning("TextCorrector não inicializado, pulando Agente RDPM.")
-                app.state.rdpm_agent_initialized = False
-        except Exception as rag_e:
-            log.error(f"Erro ao inicializar Agente RDPM: {rag_e}", exc_info=True)
-            app.state.rdpm_agent_initialized = False
+        # Limpeza periódica dos arquivos gerados em UPLOAD_TEMP_DIR
+        temp_cleanup_task = asyncio.create_task(temp_files_cleanup_scheduler())
 
-        if startup_success:
-            log.info("Lifespan iniciado com sucesso (alguns componentes podem estar indisponíveis).")
-        else:
-            log.error("Lifespan iniciado com erros na inicialização de componentes.")
+        # 2. Carregar os componentes pesados em background, sem atrasar a abertura do socket
+        text_corrector_task = asyncio.create_task(_init_text_corrector(app))
+        init_tasks = [
+            # Primeiro: os workers saem do forkserver, nunca de um processo com os modelos já carregados
+            asyncio.create_task(_init_process_pool(app)),
+            text_corrector_task,
+            asyncio.create_task(_init_pdf(app)),
+            asyncio.create_task(_init_unoserver(app)),
+            asyncio.create_task(_init_whisper(app)),
+            asyncio.create_task(_init_rdpm(app, text_corrector_task)),
+        ]
+        app.state.init_tasks = init_tasks
+        app.state.startup_summary_task = asyncio.create_task(_log_startup_result(init_tasks))
+        log.info("Lifespan iniciado; componentes sendo carregados em background.")
 
     except Exception as e:
-        log.critical(f"Erro crítico não capturado durante o Lifespan startup: {e}", exc_info=True)
+        log.critical("Erro crítico não capturado durante o Lifespan startup: %s", e, exc_info=True)
 
     yield # Aplicação roda aqui
 
     log.info("Encerrando Lifespan...")
+    # Aguardar inicializações pendentes antes de liberar recursos
+    await asyncio.gather(*init_tasks, return_exceptions=True)
+    if temp_cleanup_task:
+        temp_cleanup_task.cancel()
+    if app.state.unoserver_pool:
+        await app.state.unoserver_pool.stop()
     # Limpar recursos
     try:
         # Fechar o executor de tarefas assíncronas
         shutdown_async_processor()
     except Exception as cleanup_e:
-        log.error(f"Erro durante limpeza de recursos: {cleanup_e}", exc_info=True)
+        log.error("Erro durante limpeza de recursos: %s", cleanup_e, exc_info=True)
 
 
 # Inicialização da Aplicação FastHTML
 app = FastHTML(lifespan=lifespan)
-app.add_middleware(SessionMiddleware, secret_key=secrets.token_urlsafe(32))
+# Middlewares envolvem todas as rotas (inclusive o mount /static): os que forem adicionados
+# aqui devem ignorar /static, como o AppSessionMiddleware, para não onerar os arquivos estáticos
+app.add_middleware(AppSessionMiddleware, secret_key=_load_session_secret())
 
 # Montar Diretório Estático
 if STATIC_DIR.exists() and STATIC_DIR.is_dir():
     try:
-        app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
-        log.info(f"Diretório estático '{STATIC_DIR}' montado em '/static'")
+        precompress_static_files(STATIC_DIR)
+        app.mount("/static", CachedStaticFiles(directory=STATIC_DIR), name="static")
+        log.info("Diretório estático '%s' montado em '/static'", STATIC_DIR)
     except Exception as mount_err:
-        log.error(f"Erro ao montar diretório estático '{STATIC_DIR}': {mount_err}")
+        log.error("Erro ao montar diretório estático '%s': %s", STATIC_DIR, mount_err)
 
 # Rota de download comum
 @app.route("/download/{filename:path}", methods=["GET"])
-async def download_file(filename: str):
+async def download_file(request: Request, filename: str):
     """Rota para download de arquivos gerados"""
-    return download_file_route(None, filename)
+    return download_file_route(request, filename)
+
+# Rotas de verificação de saúde (liveness/readiness)
+@app.route("/health/live", methods=["GET"])
+async def health_live():
+    """Indica que o processo está aceitando conexões"""
+    return ORJSONResponse({"live": True})
+
+@app.route("/health/ready", methods=["GET"])
+async def health_ready(request: Request):
+    """
+    Indica se as inicializações em background terminaram (503 apenas enquanto há tarefas pendentes).
+    Componentes que falharam de vez (ex: Whisper sem modelo ou sem memória de GPU) aparecem
+    no corpo como indisponíveis, sem impedir o roteamento para as demais ferramentas.
+    """
+    state = request.app.state
+    pending = sum(1 for task in getattr(state, "init_tasks", []) if not task.done())
+    ready = pending == 0
+    return ORJSONResponse({
+        "ready": ready,
+        "pending_init_tasks": pending,
+        "components": {
+            "pdf_transformer": getattr(state, "pdf_transformer", None) is not None,
+            "whisper_model": getattr(state, "whisper_model", None) is not None,
+            "text_corrector": bool(getattr(state, "text_corrector_configured", False)),
+            "rdpm_agent": bool(getattr(state, "rdpm_agent_initialized", False)),
+        },
+    }, status_code=200 if ready else 503)
 
 # Rota para verificar estado de tarefas assíncronas
 @app.route("/task-status/{task_id}", methods=["GET"])
@@ -146,8 +335,8 @@ async def task_status(task_id: str):
         # Filtrar dados sensíveis ou grandes do resultado
         if 'result' in status and isinstance(status['result'], str) and len(status['result']) > 100:
             status['result'] = '[Conteúdo disponível]'
-        return JSONResponse(status)
-    return JSONResponse({"status": "not_found"}, status_code=404)
+        return ORJSONResponse(status)
+    return ORJSONResponse({"status": "not_found"}, status_code=404)
 
 # Registrar rotas
 home.register_routes(app)
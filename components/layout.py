@@ -1,25 +1,21 @@
 # components/layout.py
 
 from fasthtml.common import *
+from html import escape as html_escape
+from starlette.responses import HTMLResponse
+from utils.static_files import static_url, vendor_url
 
-def page_layout(title: str, *body_content):
+def _build_layout(title: str, *body_content):
     """
-    Layout padrão da página para todas as rotas.
-    
-    Args:
-        title (str): Título da página
-        *body_content: Conteúdo do corpo da página (cabeçalho, main, etc.)
-        
-    Returns:
-        O HTML completo da página
+    Árvore completa da página (cabeçalho, corpo, rodapé e scripts).
+    Usada uma única vez, na importação, para gerar o molde _LAYOUT_TEMPLATE.
     """
     return Html(
         Head(
             Title(title),
             Meta(charset="UTF-8"),
             Meta(name="viewport", content="width=device-width, initial-scale=1.0"),
-            Link(rel="stylesheet", href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css"),
-            Link(rel="stylesheet", href="/static/style.css")
+            Link(rel="stylesheet", href=static_url("style.css"))
         ),
         Body(
             *body_content,
@@ -28,10 +24,50 @@ def page_layout(title: str, *body_content):
                 P("Desenvolvido pelo 1º SGT QPPM Mat. ******023 DIOGO RIBEIRO"),
                 cls="footer"
             ),
-            Script(src="https://unpkg.com/htmx.org@1.9.10")
+            Script(src=vendor_url("htmx-1.9.10.min.js", "https://unpkg.com/htmx.org@1.9.10"), defer=True),
+            Script(src=static_url("loader.js"), defer=True)
         )
     )
 
+# Molde da página renderizado uma única vez: cada requisição só preenche título e corpo
+_TITLE_MARKER = "__PAGE_TITLE__"
+_BODY_MARKER = "__PAGE_BODY__"
+_LAYOUT_TEMPLATE = (
+    to_xml(_build_layout(_TITLE_MARKER, _BODY_MARKER))
+    .replace("{", "{{").replace("}", "}}")
+    .replace(_TITLE_MARKER, "{title}")
+    .replace(_BODY_MARKER, "{body}")
+)
+
+def render_page(title: str, *body_content) -> str:
+    """
+    Renderiza a página completa a partir do molde pré-compilado.
+    
+    Args:
+        title (str): Título da página
+        *body_content: Conteúdo do corpo da página (cabeçalho, main, etc.)
+        
+    Returns:
+        str: O HTML completo da página
+    """
+    return _LAYOUT_TEMPLATE.format_map({
+        "title": html_escape(title),
+        "body": "".join(to_xml(component) for component in body_content)
+    })
+
+def page_layout(title: str, *body_content) -> HTMLResponse:
+    """
+    Layout padrão da página para todas as rotas.
+    
+    Args:
+        title (str): Título da página
+        *body_content: Conteúdo do corpo da página (cabeçalho, main, etc.)
+        
+    Returns:
+        HTMLResponse: A resposta com o HTML completo da página
+    """
+    return HTMLResponse(render_page(title, *body_content))
+
 def loading_indicator(id: str, message: str, additional_message: str = None, hidden: bool = True):
     """
     Componente de indicador de carregamento reutilizável.
@@ -1,8 +1,9 @@
 # components/ui.py
 
+from typing import Sequence
 from fasthtml.common import *
 
-def tool_card(id:str, icon: str, title: str, description: str, items: list[str], link: str, link_text: str):
+def tool_card(id:str, icon: str, title: str, description: str, items: Sequence[str], link: str, link_text: str):
     """
     Componente de card para ferramentas na página inicial.
     
@@ -11,7 +12,7 @@ def tool_card(id:str, icon: str, title: str, description: str, items: list[str],
         icon (str): Ícone (emoji ou classe) do card
         title (str): Título do card
         description (str): Descrição do card
-        items (list[str]): Lista de itens/funcionalidades
+        items (Sequence[str]): Itens/funcionalidades (tupla ou lista)
         link (str): Link para a ferramenta
         link_text (str): Texto do botão de link
         
@@ -23,7 +24,7 @@ def tool_card(id:str, icon: str, title: str, description: str, items: list[str],
             Span(icon, cls="tool-icon"),
             H2(title),
             P(description),
-            Ul(*[Li(item) for item in items])
+            Ul(*map(Li, items))
         ),
         A(link_text, href=link, cls="button-link"),
         id=id,
@@ -5,14 +5,17 @@ import tempfile
 import subprocess
 import logging
 import whisper # openai-whisper
+import numpy as np
+import torch
 import shutil
 import json
 # REMOVIDO: import streamlit as st
 
-logging.basicConfig(level=logging.INFO)
 log = logging.getLogger(__name__) # Logger específico
 
 WHISPER_MODEL_NAME = "small" # Ou o modelo que você preferir
+# Pré-aquecimento do modelo na inicialização (WHISPER_WARMUP=0 desativa, p.ex. em execuções curtas)
+WHISPER_WARMUP = os.environ.get("WHISPER_WARMUP", "1") != "0"
 
 # Variáveis globais para caminhos (ainda podem ser úteis)
 ffmpeg_path = None
@@ -26,7 +29,7 @@ def _find_ffmpeg():
     # Usar shutil.which que é mais robusto
     ffmpeg_path = shutil.which("ffmpeg")
     if ffmpeg_path:
-        log.info(f"FFmpeg encontrado em: {ffmpeg_path}")
+        log.info("FFmpeg encontrado em: %s", ffmpeg_path)
     else:
         # Usar logging.error para erros críticos
         log.error("FFmpeg não encontrado no PATH. Funções de áudio/vídeo não funcionarão.")
@@ -38,12 +41,36 @@ def _find_ffprobe():
     if ffprobe_path: return ffprobe_path
     ffprobe_path = shutil.which("ffprobe")
     if ffprobe_path:
-        log.info(f"ffprobe encontrado em: {ffprobe_path}")
+        log.info("ffprobe encontrado em: %s", ffprobe_path)
     else:
         # Usar logging.warning para avisos
         log.warning("ffprobe não encontrado no PATH. Verificação de stream de áudio não será possível.")
     return ffprobe_path
 
+def _use_fp16(model):
+    """fp16 só é suportado (e vantajoso) quando o modelo está em GPU."""
+    return model.device.type == "cuda"
+
+def _release_model_memory(model):
+    """
+    Devolve ao driver os blocos de GPU mantidos em cache pelo PyTorch após uma transcrição.
+    Sem isso o processo mantém o pico de memória do maior áudio já transcrito.
+    """
+    if model.device.type == "cuda":
+        torch.cuda.empty_cache()
+
+def _warm_up_model(model):
+    """
+    Executa uma transcrição curta de silêncio logo após o carregamento.
+    Assim a primeira requisição não paga a inicialização do backend (kernels, alocador, filtros mel).
+    """
+    try:
+        silence = np.zeros(whisper.audio.SAMPLE_RATE, dtype=np.float32)
+        model.transcribe(silence, language='pt', fp16=_use_fp16(model))
+        log.info("Modelo Whisper pré-aquecido.")
+    except Exception as e:
+        log.warning("Falha ao pré-aquecer o modelo Whisper: %s", e)
+
 # --- NOVA Função para carregar o modelo (será chamada pelo lifespan) ---
 # REMOVIDO: @st.cache_resource(...)
 def load_whisper_model_instance():
@@ -53,7 +80,7 @@ def load_whisper_model_instance():
     """
     model = None
     try:
-        log.info(f"Carregando modelo Whisper '{WHISPER_MODEL_NAME}'...")
+        log.info("Carregando modelo Whisper '%s'...", WHISPER_MODEL_NAME)
         # Garante que ffmpeg está disponível, pois whisper pode precisar
         if not _find_ffmpeg():
              log.error("FFmpeg não encontrado, necessário para Whisper. Tentando carregar mesmo assim...")
@@ -62,10 +89,12 @@ def load_whisper_model_instance():
 
         # Carrega o modelo
         model = whisper.load_model(WHISPER_MODEL_NAME)
-        log.info(f"Modelo Whisper '{WHISPER_MODEL_NAME}' carregado com sucesso.")
+        log.info("Modelo Whisper '%s' carregado com sucesso (dispositivo: %s).", WHISPER_MODEL_NAME, model.device)
+        if WHISPER_WARMUP:
+            _warm_up_model(model)
         return model
     except Exception as e:
-        log.error(f"Erro CRÍTICO ao carregar modelo Whisper '{WHISPER_MODEL_NAME}': {e}", exc_info=True)
+        log.error("Erro CRÍTICO ao carregar modelo Whisper '%s': %s", WHISPER_MODEL_NAME, e, exc_info=True)
         # Retorna None para indicar falha no carregamento,
         # o lifespan em app.py deve tratar isso.
         return None
@@ -84,19 +113,19 @@ def _has_audio_stream(input_path):
     command = [
         ffprobe, '-v', 'quiet', '-print_format', 'json', '-show_streams', '-select_streams', 'a', input_path
     ]
-    log.info(f"Verificando streams de áudio com ffprobe para: {os.path.basename(input_path)}")
+    log.info("Verificando streams de áudio com ffprobe para: %s", os.path.basename(input_path))
     try:
         # Timeout aumentado um pouco para arquivos maiores/rede
         process = subprocess.run(command, capture_output=True, check=False, text=True, timeout=90)
 
         if process.returncode != 0:
             # Log mais detalhado do erro ffprobe
-            log.error(f"Erro ao executar ffprobe (código {process.returncode}): {process.stderr.strip()}")
+            log.error("Erro ao executar ffprobe (código %s): %s", process.returncode, process.stderr.strip())
             return True, f"Falha ao analisar streams (erro ffprobe)." # Assume que tem audio para tentar converter
 
         # Verificar se stdout não está vazio antes de tentar decodificar JSON
         if not process.stdout or not process.stdout.strip():
-            log.warning(f"ffprobe não retornou dados de stream de áudio para {os.path.basename(input_path)} (saída vazia).")
+            log.warning("ffprobe não retornou dados de stream de áudio para %s (saída vazia).", os.path.basename(input_path))
             # Pode ser um arquivo sem áudio ou corrompido
             return False, "O arquivo pode não conter áudio ou ffprobe falhou em analisá-lo."
 
@@ -109,13 +138,13 @@ def _has_audio_stream(input_path):
              return False, "O arquivo de vídeo selecionado não contém uma trilha de áudio."
 
     except json.JSONDecodeError as json_err:
-        log.error(f"Erro ao decodificar JSON do ffprobe: {json_err}. Saída recebida: '{process.stdout[:200]}...'")
+        log.error("Erro ao decodificar JSON do ffprobe: %s. Saída recebida: '%s...'", json_err, process.stdout[:200])
         return True, "Falha ao ler informações dos streams (erro JSON)." # Assume que tem para tentar
     except subprocess.TimeoutExpired:
         log.error("ffprobe excedeu o tempo limite ao verificar streams de áudio.")
         return True, "Verificação de áudio excedeu o tempo limite." # Assume que tem para tentar
     except Exception as e:
-        log.error(f"Erro inesperado ao verificar streams de áudio: {str(e)}", exc_info=True)
+        log.error("Erro inesperado ao verificar streams de áudio: %s", str(e), exc_info=True)
         return True, f"Erro inesperado na verificação de áudio." # Assume que tem para tentar
 
 
@@ -130,16 +159,16 @@ def convert_video_to_mp3(input_video_path, output_mp3_path):
 
     # 1. Verificar se o arquivo de entrada existe
     if not os.path.exists(input_video_path):
-        log.error(f"Arquivo de entrada não encontrado: {input_video_path}")
+        log.error("Arquivo de entrada não encontrado: %s", input_video_path)
         return False, "Arquivo de vídeo de entrada não encontrado."
 
     # 2. Verificar stream de áudio
     has_audio, check_msg = _has_audio_stream(input_video_path)
     if not has_audio:
-        log.warning(f"Conversão cancelada: {check_msg} para o arquivo {os.path.basename(input_video_path)}")
+        log.warning("Conversão cancelada: %s para o arquivo %s", check_msg, os.path.basename(input_video_path))
         return False, check_msg # Retorna a mensagem do _has_audio_stream
 
-    log.info(f"Iniciando conversão para MP3: {os.path.basename(input_video_path)}")
+    log.info("Iniciando conversão para MP3: %s", os.path.basename(input_video_path))
 
     # Comando FFmpeg (mantido) - '-y' para sobrescrever saída se existir
     command = [
@@ -151,7 +180,7 @@ def convert_video_to_mp3(input_video_path, output_mp3_path):
         '-y',              # Sobrescrever arquivo de saída
         output_mp3_path
     ]
-    log.info(f"Executando comando FFmpeg: {' '.join(command)}")
+    log.info("Executando comando FFmpeg: %s", ' '.join(command))
 
     try:
         # Timeout para conversão (pode precisar ser maior para vídeos longos)
@@ -160,7 +189,7 @@ def convert_video_to_mp3(input_video_path, output_mp3_path):
         # Verificar código de retorno do ffmpeg
         if process.returncode != 0:
             error_msg_detail = process.stderr.strip()
-            log.error(f"Erro no FFmpeg (código {process.returncode}) ao converter {os.path.basename(input_video_path)}:\n{error_msg_detail}")
+            log.error("Erro no FFmpeg (código %s) ao converter %s:\n%s", process.returncode, os.path.basename(input_video_path), error_msg_detail)
 
             # Mensagem de erro mais amigável
             error_msg_user = "Ocorreu um erro durante a conversão com FFmpeg."
@@ -169,7 +198,7 @@ def convert_video_to_mp3(input_video_path, output_mp3_path):
             # Tentar remover saída parcial se existir
             if os.path.exists(output_mp3_path):
                 try: os.unlink(output_mp3_path)
-                except OSError as e: log.warning(f"Não foi possível remover arquivo de saída parcial {output_mp3_path}: {e}")
+                except OSError as e: log.warning("Não foi possível remover arquivo de saída parcial %s: %s", output_mp3_path, e)
             return False, error_msg_user
 
         # Verificar se o arquivo de saída foi criado e não está vazio
@@ -179,18 +208,18 @@ def convert_video_to_mp3(input_video_path, output_mp3_path):
              # Tentar remover saída vazia se existir
              if os.path.exists(output_mp3_path):
                 try: os.unlink(output_mp3_path)
-                except OSError as e: log.warning(f"Não foi possível remover arquivo de saída vazio {output_mp3_path}: {e}")
+                except OSError as e: log.warning("Não foi possível remover arquivo de saída vazio %s: %s", output_mp3_path, e)
              return False, "Falha na criação do arquivo MP3 após conversão."
 
-        log.info(f"Conversão vídeo->MP3 concluída com sucesso: {os.path.basename(output_mp3_path)}")
+        log.info("Conversão vídeo->MP3 concluída com sucesso: %s", os.path.basename(output_mp3_path))
         return True, "Conversão concluída com sucesso."
 
     except subprocess.TimeoutExpired:
-        log.error(f"Conversão vídeo->MP3 excedeu o tempo limite de 600s para {os.path.basename(input_video_path)}.")
+        log.error("Conversão vídeo->MP3 excedeu o tempo limite de 600s para %s.", os.path.basename(input_video_path))
         # Tentar remover saída parcial
         if os.path.exists(output_mp3_path):
              try: os.unlink(output_mp3_path)
-             except OSError as e: log.warning(f"Não foi possível remover arquivo de saída parcial (timeout) {output_mp3_path}: {e}")
+             except OSError as e: log.warning("Não foi possível remover arquivo de saída parcial (timeout) %s: %s", output_mp3_path, e)
         return False, "Conversão excedeu o tempo limite."
     except Exception as e:
         error_msg = f"Erro inesperado na conversão vídeo->MP3: {str(e)}"
@@ -198,7 +227,7 @@ def convert_video_to_mp3(input_video_path, output_mp3_path):
         # Tentar remover saída parcial
         if os.path.exists(output_mp3_path):
             try: os.unlink(output_mp3_path)
-            except OSError as os_err: log.warning(f"Não foi possível remover arquivo de saída parcial (exceção) {output_mp3_path}: {os_err}")
+            except OSError as os_err: log.warning("Não foi possível remover arquivo de saída parcial (exceção) %s: %s", output_mp3_path, os_err)
         return False, "Ocorreu um erro inesperado durante o processamento."
 
 
@@ -226,16 +255,18 @@ def transcribe_audio_file(input_audio_path, model):
 
     # Verificar se o arquivo de entrada existe
     if not os.path.exists(input_audio_path):
-        log.error(f"Arquivo de áudio para transcrição não encontrado: {input_audio_path}")
+        log.error("Arquivo de áudio para transcrição não encontrado: %s", input_audio_path)
         return False, "Arquivo de áudio de entrada não encontrado.", ""
 
-    log.info(f"Iniciando transcrição com Whisper ({WHISPER_MODEL_NAME}): {os.path.basename(input_audio_path)}")
+    log.info("Iniciando transcrição com Whisper (%s): %s", WHISPER_MODEL_NAME, os.path.basename(input_audio_path))
     try:
         # Realiza a transcrição
-        # fp16=False é mais seguro para CPU, True pode ser mais rápido em GPU compatível
-        result = model.transcribe(input_audio_path, language='pt', fp16=False)
+        # fp16 apenas em GPU: na CPU o Whisper recai para fp32 com aviso
+        result = model.transcribe(input_audio_path, language='pt', fp16=_use_fp16(model))
         transcribed_text = result.get("text", "") # Usar .get para evitar KeyError
-        log.info(f"Transcrição Whisper concluída para {os.path.basename(input_audio_path)}.")
+        # Apenas o texto é usado: descartar segmentos/tokens antes de devolver
+        del result
+        log.info("Transcrição Whisper concluída para %s.", os.path.basename(input_audio_path))
         return True, "Transcrição concluída com sucesso.", transcribed_text
 
     except Exception as e:
@@ -244,4 +275,6 @@ def transcribe_audio_file(input_audio_path, model):
         if not ffmpeg_path and isinstance(e, RuntimeError) and "ffmpeg" in str(e).lower():
              error_msg += " (Verifique se FFmpeg está instalado e no PATH do sistema, pois é necessário para Whisper processar muitos formatos de áudio)"
         log.exception(error_msg) # Loga o traceback
-        return False, "Ocorreu um erro durante a transcrição.", ""
\ No newline at end of file
+        return False, "Ocorreu um erro durante a transcrição.", ""
+    finally:
+        _release_model_memory(model)
\ No newline at end of file
@@ -9,7 +9,7 @@ import shutil
 import subprocess
 import io # Para trabalhar com bytes em memória
 import zipfile
-from PyPDF2 import PdfReader, PdfWriter # Import mantido para merge_pdfs
+from PyPDF2 import PdfReader, PdfWriter # Import mantido para merge_pdf_files
 
 try:
     import fitz  # PyMuPDF
@@ -32,8 +32,7 @@ except ImportError:
     img2pdf = None
     Image = None
 
-# Configuração de Logging (pode ser configurado centralmente em app.py também)
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Configuração de Logging: feita centralmente em app.py
 # Logger nomeado para este módulo
 log = logging.getLogger(__name__)
 
@@ -44,6 +43,8 @@ class PDFTransformer:
         self.libreoffice_path = self._find_external_command(['libreoffice', 'soffice'], 'LibreOffice')
         self.gs_cmd = self._find_external_command(['gswin64c', 'gs'], 'Ghostscript') # Encontra gs ou gswin64c
         self.ocrmypdf_installed = self._check_command_exists(self.ocrmypdf_cmd, 'OCRmyPDF')
+        # Cliente do unoserver (opcional): conversões via LibreOffice residente
+        self.unoconvert_cmd = shutil.which('unoconvert')
 
         # Log inicial sobre dependências
         if not self.gs_cmd: log.warning("Ghostscript não detectado. Funções de compressão/manipulação podem ser limitadas.")
@@ -55,9 +56,9 @@ class PDFTransformer:
         for cmd in potential_cmds:
             found_path = shutil.which(cmd)
             if found_path:
-                log.info(f"{tool_name} detectado em: {found_path}")
+                log.info("%s detectado em: %s", tool_name, found_path)
                 return found_path # Retorna o caminho completo encontrado
-        log.warning(f"{tool_name} (comandos testados: {', '.join(potential_cmds)}) não encontrado no PATH.")
+        log.warning("%s (comandos testados: %s) não encontrado no PATH.", tool_name, ', '.join(potential_cmds))
         return None
 
     def _check_command_exists(self, cmd, tool_name):
@@ -71,7 +72,7 @@ class PDFTransformer:
             # except (subprocess.SubprocessError, FileNotFoundError, Exception) as e:
             #     log.warning(f"Erro ao verificar {tool_name} com '--version': {e}")
             #     return False # Existe mas pode não funcionar
-            log.info(f"{tool_name} (comando: {cmd}) parece estar disponível no PATH.")
+            log.info("%s (comando: %s) parece estar disponível no PATH.", tool_name, cmd)
             return True # Assume que existe se shutil.which encontrar
         else:
             # Log já feito em _find_external_command se aplicável, mas pode repetir para clareza
@@ -80,22 +81,22 @@ class PDFTransformer:
 
     def _run_subprocess(self, command, description, timeout=300):
         """Executa um subprocesso com logging e tratamento de erro."""
-        log.info(f"Executando {description}: {' '.join(command)}")
+        log.info("Executando %s: %s", description, ' '.join(command))
         try:
             process = subprocess.run(command, capture_output=True, check=False, text=True, timeout=timeout)
             if process.returncode != 0:
-                log.error(f"Erro em {description} (código {process.returncode}):\nStderr: {process.stderr.strip()}\nStdout: {process.stdout.strip()}")
+                log.error("Erro em %s (código %s):\nStderr: %s\nStdout: %s", description, process.returncode, process.stderr.strip(), process.stdout.strip())
                 return False, f"Erro durante {description} (código {process.returncode})."
-            log.info(f"{description} concluído com sucesso.")
+            log.info("%s concluído com sucesso.", description)
             return True, process # Retorna o processo para análise posterior se necessário
         except subprocess.TimeoutExpired:
-            log.error(f"{description} excedeu o tempo limite de {timeout}s.")
+            log.error("%s excedeu o tempo limite de %ss.", description, timeout)
             return False, f"{description.capitalize()} excedeu o tempo limite."
         except FileNotFoundError:
-            log.error(f"Comando não encontrado para {description}: {command[0]}")
+            log.error("Comando não encontrado para %s: %s", description, command[0])
             return False, f"Comando necessário para {description} não encontrado."
         except Exception as e:
-            log.exception(f"Erro inesperado ao executar {description}: {e}") # Loga traceback
+            log.exception("Erro inesperado ao executar %s: %s", description, e) # Loga traceback
             return False, f"Erro inesperado durante {description}."
 
     # --- Métodos Principais (Lógica interna praticamente inalterada, apenas logging ajustado) ---
@@ -111,12 +112,13 @@ class PDFTransformer:
             try:
                 shutil.copy2(input_path, temp_input)
             except Exception as copy_err:
-                log.error(f"Erro ao copiar arquivo para OCR: {copy_err}")
+                log.error("Erro ao copiar arquivo para OCR: %s", copy_err)
                 return False, "Erro ao preparar arquivo para OCR."
 
             temp_output = Path(temp_ocr_dir) / "output_ocr.pdf"
             args = [
-                self.ocrmypdf_cmd, '--force-ocr', '--optimize', '1', '--output-type', 'pdf',
+                # --skip-text: páginas que já têm texto não são rasterizadas novamente
+                self.ocrmypdf_cmd, '--skip-text', '--optimize', '1', '--output-type', 'pdf',
                 '--jobs', '2', '-l', language, str(temp_input), str(temp_output)
             ]
             # Usar o helper _run_subprocess
@@ -130,16 +132,16 @@ class PDFTransformer:
                 try:
                     # Mover o resultado para o caminho de saída final
                     shutil.move(str(temp_output), output_path)
-                    log.info(f"OCR aplicado com sucesso e salvo em {output_path}")
+                    log.info("OCR aplicado com sucesso e salvo em %s", output_path)
                     return True, "OCR aplicado com sucesso."
                 except Exception as move_err:
-                    log.error(f"OCRmyPDF executado, mas erro ao mover o resultado: {move_err}")
+                    log.error("OCRmyPDF executado, mas erro ao mover o resultado: %s", move_err)
                     return False, "Erro ao salvar o resultado do OCR."
             else:
                 log.error("OCRmyPDF terminou sem erros aparentes, mas o arquivo de saída não foi encontrado ou está vazio.")
                 # Incluir stdout/stderr se possível (result_msg_or_proc é o 'process' object aqui)
                 if isinstance(result_msg_or_proc, subprocess.CompletedProcess):
-                    log.error(f"Stderr: {result_msg_or_proc.stderr.strip()}\nStdout: {result_msg_or_proc.stdout.strip()}")
+                    log.error("Stderr: %s\nStdout: %s", result_msg_or_proc.stderr.strip(), result_msg_or_proc.stdout.strip())
                 return False, "Falha na criação do arquivo OCRizado."
 
     def _compress_pdf_gs(self, input_file_path, output_file_path, power=3):
@@ -162,45 +164,44 @@ class PDFTransformer:
             # Tentar remover arquivo de saída parcial se existir
             if os.path.exists(output_file_path):
                 try: os.unlink(output_file_path)
-                except OSError as e: log.warning(f"Não foi possível remover arquivo de saída parcial (GS Error) {output_file_path}: {e}")
+                except OSError as e: log.warning("Não foi possível remover arquivo de saída parcial (GS Error) %s: %s", output_file_path, e)
             return False, result_msg_or_proc # Mensagem de erro do helper
 
         # Verificar se o arquivo de saída foi criado e tem conteúdo
         if os.path.exists(output_file_path) and os.path.getsize(output_file_path) > 0:
-            log.info(f"Compressão com Ghostscript concluída: {os.path.basename(output_file_path)}")
+            log.info("Compressão com Ghostscript concluída: %s", os.path.basename(output_file_path))
             return True, "Compressão bem-sucedida."
         else:
             log.error("Ghostscript finalizou sem erro aparente, mas o arquivo de saída não foi criado ou está vazio.")
             # Tentar remover arquivo de saída vazio se existir
             if os.path.exists(output_file_path):
                 try: os.unlink(output_file_path)
-                except OSError as e: log.warning(f"Não foi possível remover arquivo de saída vazio (GS) {output_file_path}: {e}")
+                except OSError as e: log.warning("Não foi possível remover arquivo de saída vazio (GS) %s: %s", output_file_path, e)
             return False, "Falha na criação do arquivo comprimido."
 
     # Método principal para compressão e/ou OCR
-    def process_compression_ocr(self, file_bytes, compression_level=3, apply_ocr=False, ocr_language='por'):
+    def process_compression_ocr_file(self, input_pdf_path, output_pdf_path, compression_level=3, apply_ocr=False, ocr_language='por'):
         """
-        Processa um PDF aplicando compressão e/ou OCR.
+        Processa um PDF em disco aplicando compressão e/ou OCR, gravando o resultado em output_pdf_path.
 
         Args:
-            file_bytes (bytes): Conteúdo do PDF original.
+            input_pdf_path (str): Caminho do PDF original.
+            output_pdf_path (str): Caminho onde o PDF processado será salvo.
             compression_level (int): Nível de compressão Ghostscript (-1 para pular, 0-4).
             apply_ocr (bool): Se True, aplica OCR com OCRmyPDF.
             ocr_language (str): Código do idioma para OCR (ex: 'por', 'eng').
 
         Returns:
-            tuple: (bool: success, bytes | None: processed_bytes, str: message)
+            tuple: (bool: success, str: message)
         """
-        if not file_bytes:
-            return False, None, "Nenhum dado de arquivo fornecido."
+        input_path = Path(input_pdf_path)
+        if not input_path.exists() or input_path.stat().st_size == 0:
+            return False, "Nenhum dado de arquivo fornecido."
 
-        original_size_mb = len(file_bytes) / 1024 / 1024
-        log.info(f"Iniciando processamento (Compressão: {compression_level}, OCR: {apply_ocr}, Lang: {ocr_language}). Tamanho Original: {original_size_mb:.2f} MB")
+        original_size_mb = input_path.stat().st_size / 1024 / 1024
+        log.info("Iniciando processamento (Compressão: %s, OCR: %s, Lang: %s). Tamanho Original: %.2f MB", compression_level, apply_ocr, ocr_language, original_size_mb)
 
         with tempfile.TemporaryDirectory() as temp_dir:
-            input_path = Path(temp_dir) / "input.pdf"
-            with open(input_path, "wb") as f: f.write(file_bytes)
-
             current_step_output = input_path
             last_successful_output = input_path # Guarda o último resultado válido
             step_message = "Processo iniciado."
@@ -208,7 +209,7 @@ class PDFTransformer:
             # Etapa 1: Compressão (se solicitada)
             if compression_level >= 0:
                 compressed_path = Path(temp_dir) / "compressed.pdf"
-                log.info(f"Aplicando compressão (Nível {compression_level})...")
+                log.info("Aplicando compressão (Nível %s)...", compression_level)
                 comp_success, comp_msg = self._compress_pdf_gs(str(current_step_output), str(compressed_path), compression_level)
                 step_message = comp_msg
                 if comp_success:
@@ -216,7 +217,7 @@ class PDFTransformer:
                     last_successful_output = compressed_path
                     log.info("Compressão concluída.")
                 else:
-                    log.error(f"Falha na etapa de compressão: {comp_msg}")
+                    log.error("Falha na etapa de compressão: %s", comp_msg)
                     # Opcional: retornar o estado anterior se a compressão falhar? Ou falhar tudo?
                     # Vamos falhar tudo se a compressão era obrigatória.
                     # Se OCR ainda for aplicado, podemos continuar do input original? Decidimos falhar.
@@ -225,9 +226,9 @@ class PDFTransformer:
                             compressed_path.unlink()
                         except:
                             pass
-                    return False, None, f"Falha na compressão: {comp_msg}"
+                    return False, f"Falha na compressão: {comp_msg}"
 
-            # Etapa 2: OCR (se solicitado)
+            # Etapa 2: OCR (se solicitado; --skip-text preserva as páginas que já têm texto)
             if apply_ocr:
                 ocr_output_path = Path(temp_dir) / "ocr_output.pdf"
                 log.info("Aplicando OCR...")
@@ -238,29 +239,31 @@ class PDFTransformer:
                     last_successful_output = ocr_output_path
                     log.info("OCR concluído.")
                 else:
-                    log.warning(f"Falha na etapa de OCR: {ocr_msg}. Continuando com o resultado anterior (se houver).")
+                    log.warning("Falha na etapa de OCR: %s. Continuando com o resultado anterior (se houver).", ocr_msg)
                     # Se o OCR falhar, continuamos com o arquivo que entrou nesta etapa (last_successful_output)
                     current_step_output = last_successful_output # Reverte para o último sucesso
                     # Não retorna erro aqui, permite que o usuário receba pelo menos o resultado da compressão (se houve)
                     step_message = f"Compressão concluída, mas OCR falhou: {ocr_msg}"
 
-            # Ler o resultado final
+            # Gravar o resultado final no destino
             if last_successful_output.exists() and last_successful_output.stat().st_size > 0:
                 try:
-                    with open(last_successful_output, 'rb') as f:
-                        processed_bytes = f.read()
-                    final_size_mb = len(processed_bytes) / 1024 / 1024
-                    log.info(f"Processamento finalizado. Tamanho Final: {final_size_mb:.2f} MB. Mensagem: {step_message}")
-                    return True, processed_bytes, step_message # Retorna a mensagem da última etapa principal
-                except Exception as read_err:
-                    log.error(f"Erro ao ler o arquivo processado final {last_successful_output}: {read_err}")
-                    return False, None, "Erro ao ler o resultado final do processamento."
+                    if last_successful_output == input_path:
+                        shutil.copyfile(str(last_successful_output), output_pdf_path)
+                    else:
+                        shutil.move(str(last_successful_output), output_pdf_path)
+                    final_size_mb = os.path.getsize(output_pdf_path) / 1024 / 1024
+                    log.info("Processamento finalizado. Tamanho Final: %.2f MB. Mensagem: %s", final_size_mb, step_message)
+                    return True, step_message # Retorna a mensagem da última etapa principal
+                except Exception as write_err:
+                    log.error("Erro ao gravar o arquivo processado final em %s: %s", output_pdf_path, write_err)
+                    return False, "Erro ao salvar o resultado final do processamento."
             else:
-                log.error(f"Arquivo de resultado final ({last_successful_output}) não encontrado ou vazio após processamento.")
-                return False, None, "Falha geral no processamento ou resultado final inválido."
+                log.error("Arquivo de resultado final (%s) não encontrado ou vazio após processamento.", last_successful_output)
+                return False, "Falha geral no processamento ou resultado final inválido."
 
     def image_to_pdf(self, image_files_bytes, output_pdf_path):
-        """Converte uma lista de bytes de imagem em um único PDF."""
+        """Converte uma lista de imagens (bytes ou caminhos de arquivo) em um único PDF."""
         if not image_files_bytes:
             return False, "Nenhuma imagem fornecida."
 
@@ -270,13 +273,15 @@ class PDFTransformer:
 
         for idx, img_bytes in enumerate(image_files_bytes):
             try:
-                with Image.open(io.BytesIO(img_bytes)) as img:
+                # Caminhos são abertos diretamente do disco, sem copiar para a memória
+                img_source = img_bytes if isinstance(img_bytes, (str, os.PathLike)) else io.BytesIO(img_bytes)
+                with Image.open(img_source) as img:
                     # Tenta converter para RGB (img2pdf lida melhor, evita problemas com paletas, RGBA, LA)
                     # Mantém PNG se for PNG, senão converte para JPEG para eficiência
                     output_format = "PNG" if img.format == 'PNG' else "JPEG"
                     # Se não for RGB/L (grayscale), converte
                     if img.mode not in ('RGB', 'L'):
-                        log.debug(f"Convertendo imagem {idx+1} de modo {img.mode} para RGB.")
+                        log.debug("Convertendo imagem %s de modo %s para RGB.", idx+1, img.mode)
                         # Usar um fundo branco para transparência se converter de RGBA/LA/P
                         if img.mode in ('RGBA', 'LA', 'P'):
                             img = img.convert('RGB', palette=Image.ADAPTIVE, colors=256) # Tentativa com paleta
@@ -294,7 +299,7 @@ class PDFTransformer:
                     processed_count += 1
 
             except Exception as img_err:
-                log.warning(f"Erro ao processar/converter imagem {idx+1}: {img_err}. Imagem pulada.")
+                log.warning("Erro ao processar/converter imagem %s: %s. Imagem pulada.", idx+1, img_err)
                 skipped_count += 1
                 continue # Pula para a próxima imagem
 
@@ -307,10 +312,10 @@ class PDFTransformer:
             pdf_bytes = img2pdf.convert(valid_image_bytes_for_pdf)
             with open(output_pdf_path, "wb") as f:
                 f.write(pdf_bytes)
-            log.info(f"{processed_count} imagem(ns) convertida(s) para PDF: {output_pdf_path}. {skipped_count} imagem(ns) pulada(s).")
+            log.info("%s imagem(ns) convertida(s) para PDF: %s. %s imagem(ns) pulada(s).", processed_count, output_pdf_path, skipped_count)
             return True, f"{processed_count} imagem(ns) convertida(s) para PDF. {skipped_count} pulada(s)."
         except Exception as e:
-            log.exception(f"Erro ao criar PDF a partir das imagens: {str(e)}")
+            log.exception("Erro ao criar PDF a partir das imagens: %s", str(e))
             return False, f"Erro ao gerar o arquivo PDF final: {e}"
 
     def pdf_to_docx(self, input_pdf_path, output_docx_path, apply_ocr=False, ocr_language='por'):
@@ -344,10 +349,10 @@ class PDFTransformer:
                             ocr_applied_msg = " (com OCR pré-aplicado)"
                             log.info("OCR aplicado com sucesso antes da conversão.")
                         else:
-                            log.warning(f"Falha ao aplicar OCR antes da conversão para DOCX: {ocr_msg}. Procedendo com o PDF original.")
+                            log.warning("Falha ao aplicar OCR antes da conversão para DOCX: %s. Procedendo com o PDF original.", ocr_msg)
                             ocr_applied_msg = f" (tentativa de OCR falhou: {ocr_msg})"
 
-                log.info(f"Iniciando conversão de {pdf_to_process.name} para DOCX{ocr_applied_msg}.")
+                log.info("Iniciando conversão de %s para DOCX%s.", pdf_to_process.name, ocr_applied_msg)
                 doc = fitz.open(str(pdf_to_process)) # PyMuPDF
                 document = Document() # python-docx
                 has_content = False
@@ -377,9 +382,9 @@ class PDFTransformer:
                                 document.add_picture(str(temp_img_path), width=Inches(6.0)) # Largura padrão A4
                                 has_content = True
                             except Exception as pic_err:
-                                log.warning(f"Não foi possível adicionar imagem da pág {page_num+1} (idx {img_index}) ao DOCX: {pic_err}")
+                                log.warning("Não foi possível adicionar imagem da pág %s (idx %s) ao DOCX: %s", page_num+1, img_index, pic_err)
                         except Exception as img_extract_err:
-                            log.warning(f"Não foi possível extrair imagem da pág {page_num+1} (idx {img_index}): {img_extract_err}")
+                            log.warning("Não foi possível extrair imagem da pág %s (idx %s): %s", page_num+1, img_index, img_extract_err)
 
                     # Adicionar quebra de página (exceto após a última)
                     if page_num < len(doc) - 1:
@@ -388,111 +393,73 @@ class PDFTransformer:
                 doc.close() # Fecha o documento PDF
 
                 if not has_content:
-                    log.warning(f"Conversão PDF->DOCX concluída, mas nenhum conteúdo (texto ou imagem) foi extraído para {output_docx_path}.")
+                    log.warning("Conversão PDF->DOCX concluída, mas nenhum conteúdo (texto ou imagem) foi extraído para %s.", output_docx_path)
                     # Não necessariamente um erro, pode ser um PDF em branco
                     message = "Conversão concluída, mas o DOCX pode estar vazio (nenhum conteúdo extraído)."
                 else:
                     message = f"PDF convertido para DOCX com sucesso{ocr_applied_msg}."
 
                 document.save(output_docx_path)
-                log.info(f"Arquivo DOCX salvo em: {output_docx_path}")
+                log.info("Arquivo DOCX salvo em: %s", output_docx_path)
                 return True, message
 
         except Exception as e:
-            log.exception(f"Erro durante a conversão PDF para DOCX: {str(e)}")
+            log.exception("Erro durante a conversão PDF para DOCX: %s", str(e))
             return False, f"Erro inesperado durante a conversão: {e}"
         finally:
             # Limpeza adicional se necessário (embora temp dirs cuidem disso)
             pass
 
-    def pdf_to_image(self, input_pdf_path, output_folder, image_format='png', dpi=150):
-        """Converte cada página de um PDF em arquivos de imagem."""
+    def pdf_to_image_zip(self, input_pdf_path, output_zip_path, image_format='png', dpi=150):
+        """
+        Converte cada página de um PDF em imagem gravando direto no ZIP de saída.
+        As imagens são renderizadas em memória: nenhum arquivo intermediário por página.
+        Retorna (número de imagens, mensagem); None em caso de erro.
+        """
         if not fitz:
             log.error("PyMuPDF não disponível. Conversão PDF para imagem impossível.")
             return None, "Biblioteca PyMuPDF necessária não disponível."
-            
-        generated_images = []
-        doc = None
-        output_path = Path(output_folder)
 
         if not Path(input_pdf_path).exists():
             return None, "Arquivo PDF de entrada não encontrado."
 
+        doc = None
         try:
-            # Cria pasta de saída se não existir
-            output_path.mkdir(parents=True, exist_ok=True)
-
             doc = fitz.open(input_pdf_path)
             if not doc.page_count:
-                return [], "PDF não contém páginas."
+                return 0, "PDF não contém páginas."
 
-            log.info(f"Convertendo {len(doc)} página(s) PDF para {image_format.upper()} (DPI: {dpi}) em: {output_folder}")
+            log.info("Convertendo %s página(s) PDF para %s (DPI: %s) em: %s", len(doc), image_format.upper(), dpi, output_zip_path)
 
-            # Zoom baseado no DPI (72 é base)
-            zoom = dpi / 72.0
-            mat = fitz.Matrix(zoom, zoom)
+            extension = image_format.lower()
 
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                # Renderiza a página como imagem
-                # alpha=False para evitar canal alfa (pode não ser suportado por todos os visualizadores/formatos)
-                pix = page.get_pixmap(matrix=mat, alpha=False)
-                output_image_path = output_path / f"pagina_{page_num + 1}.{image_format.lower()}"
-
-                # Salva a imagem
-                pix.save(str(output_image_path))
-                generated_images.append(str(output_image_path))
-                log.debug(f"Salva imagem: {output_image_path.name}")
-
-            log.info(f"{len(generated_images)} imagem(ns) gerada(s) com sucesso.")
-            return generated_images, f"{len(generated_images)} imagem(ns) gerada(s)."
-
-        except Exception as e:
-            log.exception(f"Erro durante a conversão PDF para imagens: {str(e)}")
-            return None, f"Erro inesperado na conversão: {e}"
-        finally:
-            if doc:
-                try: doc.close()
-                except: pass # Tenta fechar mesmo se houve erro antes
-
-    def create_zip_from_files(self, file_paths, output_zip_path):
-        """Cria um arquivo ZIP a partir de uma lista de caminhos de arquivo."""
-        if not file_paths:
-            return False, "Nenhum arquivo fornecido para compactar."
-
-        try:
-            log.info(f"Criando arquivo ZIP '{os.path.basename(output_zip_path)}' com {len(file_paths)} arquivo(s).")
-            with zipfile.ZipFile(output_zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for file_path in file_paths:
-                    if os.path.exists(file_path):
-                        # Adiciona o arquivo ao ZIP usando apenas o nome base do arquivo
-                        zipf.write(file_path, os.path.basename(file_path))
-                    else:
-                        log.warning(f"Arquivo não encontrado, pulando adição ao ZIP: {file_path}")
-
-            if os.path.exists(output_zip_path) and os.path.getsize(output_zip_path) > 0:
-                log.info(f"Arquivo ZIP criado com sucesso: {output_zip_path}")
-                return True, "Arquivo ZIP criado com sucesso."
-            elif not os.path.exists(output_zip_path):
-                # Isso não deveria acontecer se o zipfile não deu erro, mas checar nunca é demais
-                log.error("Arquivo ZIP não foi criado após a operação.")
-                return False, "Falha ao criar o arquivo ZIP (não encontrado)."
-            else:
-                # ZIP foi criado mas está vazio (talvez nenhum arquivo de entrada válido?)
-                log.warning(f"Arquivo ZIP criado ({output_zip_path}), mas está vazio.")
-                return True, "Arquivo ZIP criado, mas pode estar vazio (verifique arquivos de entrada)."
+            # PNG/JPEG já são comprimidos: ZIP_STORED evita recompressão inútil
+            with zipfile.ZipFile(output_zip_path, 'w', zipfile.ZIP_STORED) as zipf:
+                for page_num in range(len(doc)):
+                    pix = doc.load_page(page_num).get_pixmap(dpi=dpi, alpha=False)
+                    zipf.writestr(f"pagina_{page_num + 1}.{extension}", pix.tobytes(extension))
 
+            log.info("%s imagem(ns) gerada(s) com sucesso.", len(doc))
+            return len(doc), f"{len(doc)} imagem(ns) gerada(s)."
 
         except Exception as e:
-            log.exception(f"Erro ao criar arquivo ZIP: {str(e)}")
+            log.exception("Erro durante a conversão PDF para imagens: %s", str(e))
             # Tentar remover zip parcial
             if os.path.exists(output_zip_path):
                 try: os.unlink(output_zip_path)
                 except OSError: pass
-            return False, f"Erro ao criar o arquivo ZIP: {e}"
+            return None, f"Erro inesperado na conversão: {e}"
+        finally:
+            if doc:
+                try: doc.close()
+                except: pass
 
-    def document_to_pdf(self, input_doc_path, output_pdf_path):
-        """Converte DOC, DOCX, ODT, TXT, etc. para PDF usando LibreOffice."""
+    def document_to_pdf(self, input_doc_path, output_pdf_path, profile_dir=None):
+        """
+        Converte DOC, DOCX, ODT, TXT, etc. para PDF usando LibreOffice.
+        profile_dir: perfil de usuário exclusivo do LibreOffice. Instâncias que
+        compartilham o mesmo perfil não rodam em paralelo (falham silenciosamente).
+        """
         if not self.libreoffice_path:
             log.error("LibreOffice não encontrado. Conversão de documento indisponível.")
             return False, "LibreOffice não está disponível no servidor."
@@ -520,6 +487,8 @@ class PDFTransformer:
             '--convert-to', 'pdf', '--outdir', str(output_dir),
             input_doc_path
         ]
+        if profile_dir:
+            command.insert(1, f"-env:UserInstallation={Path(profile_dir).resolve().as_uri()}")
 
         # Usar helper para rodar LO
         success, result_msg_or_proc = self._run_subprocess(command, "Conversão LibreOffice", timeout=300) # Timeout LO
@@ -535,86 +504,163 @@ class PDFTransformer:
             # Renomear para o nome desejado
             try:
                 shutil.move(str(expected_lo_output_simple), output_pdf_path)
-                log.info(f"Arquivo LibreOffice renomeado para: {os.path.basename(output_pdf_path)}")
+                log.info("Arquivo LibreOffice renomeado para: %s", os.path.basename(output_pdf_path))
                 final_pdf_found = Path(output_pdf_path)
             except Exception as move_err:
-                log.error(f"LibreOffice gerou {expected_lo_output_simple.name}, mas falhou ao renomear para {os.path.basename(output_pdf_path)}: {move_err}")
+                log.error("LibreOffice gerou %s, mas falhou ao renomear para %s: %s", expected_lo_output_simple.name, os.path.basename(output_pdf_path), move_err)
                 return False, "Erro ao renomear o PDF gerado pelo LibreOffice."
         # Adicionar verificação para outros nomes possíveis se LO for imprevisível?
 
         if final_pdf_found:
-            log.info(f"Documento convertido para PDF com sucesso: {output_pdf_path}")
+            log.info("Documento convertido para PDF com sucesso: %s", output_pdf_path)
             return True, "Documento convertido para PDF com sucesso."
         else:
-            log.error(f"LibreOffice executado, mas o arquivo PDF final não foi encontrado ou está vazio em {output_dir}.")
+            log.error("LibreOffice executado, mas o arquivo PDF final não foi encontrado ou está vazio em %s.", output_dir)
             # Logar stdout/stderr do processo LO para debug
             if isinstance(result_msg_or_proc, subprocess.CompletedProcess):
-                log.error(f"Stderr LO: {result_msg_or_proc.stderr.strip()}\nStdout LO: {result_msg_or_proc.stdout.strip()}")
+                log.error("Stderr LO: %s\nStdout LO: %s", result_msg_or_proc.stderr.strip(), result_msg_or_proc.stdout.strip())
             return False, "Falha na criação do arquivo PDF pelo LibreOffice."
 
 
-    def merge_pdfs(self, pdf_byte_streams):
-        """Junta múltiplos streams de bytes de PDF em um único stream de bytes."""
-        if not pdf_byte_streams or len(pdf_byte_streams) < 2:
-            return False, None, "Pelo menos dois PDFs são necessários para a junção."
+    def document_to_pdf_uno(self, input_doc_path, output_pdf_path, port, host='127.0.0.1'):
+        """
+        Converte um documento para PDF através de um unoserver já em execução (cliente unoconvert).
+        Evita a inicialização do LibreOffice a cada conversão.
+        """
+        if not self.unoconvert_cmd:
+            return False, "unoconvert não está disponível no servidor."
+
+        if not Path(input_doc_path).exists():
+            return False, "Arquivo de documento de entrada não encontrado."
+
+        command = [
+            self.unoconvert_cmd, '--host', host, '--port', str(port),
+            '--convert-to', 'pdf', input_doc_path, output_pdf_path
+        ]
+        success, result_msg_or_proc = self._run_subprocess(command, "Conversão unoserver", timeout=300)
+        if not success:
+            return False, result_msg_or_proc
+
+        if Path(output_pdf_path).exists() and Path(output_pdf_path).stat().st_size > 0:
+            log.info("Documento convertido para PDF com sucesso (unoserver): %s", output_pdf_path)
+            return True, "Documento convertido para PDF com sucesso."
+        log.error("unoconvert executado, mas o arquivo PDF final não foi encontrado ou está vazio: %s", output_pdf_path)
+        return False, "Falha na criação do arquivo PDF pelo LibreOffice."
+
+    def _build_merged_writer(self, pdf_sources):
+        """
+        Adiciona as páginas de cada PDF (caminho) a um único PdfWriter.
 
+        Returns:
+            tuple: (PdfWriter: merged_writer, int: valid_pdfs_merged)
+        """
         merged_writer = PdfWriter()
-        log.info(f"Iniciando junção de {len(pdf_byte_streams)} PDF(s).")
+        log.info("Iniciando junção de %s PDF(s).", len(pdf_sources))
         valid_pdfs_merged = 0
 
-        try:
-            for idx, pdf_bytes in enumerate(pdf_byte_streams):
-                try:
-                    # Usar BytesIO para ler os bytes como um arquivo
-                    pdf_stream = io.BytesIO(pdf_bytes)
-                    reader = PdfReader(pdf_stream)
+        for idx, pdf_source in enumerate(pdf_sources):
+            try:
+                reader = PdfReader(pdf_source)
 
-                    if not reader.pages:
-                        log.warning(f"PDF {idx+1} está vazio ou corrompido, pulando.")
-                        continue
+                if not reader.pages:
+                    log.warning("PDF %s está vazio ou corrompido, pulando.", idx+1)
+                    continue
 
-                    # Adicionar todas as páginas do PDF atual
-                    for page in reader.pages:
-                        merged_writer.add_page(page)
+                # Adicionar todas as páginas do PDF atual
+                for page in reader.pages:
+                    merged_writer.add_page(page)
 
-                    valid_pdfs_merged += 1
-                    log.debug(f"Adicionado PDF {idx+1} ({len(reader.pages)} páginas).")
+                valid_pdfs_merged += 1
+                log.debug("Adicionado PDF %s (%s páginas).", idx+1, len(reader.pages))
 
-                except Exception as read_err:
-                    # Logar erro específico na leitura/processamento de um PDF, mas continuar
-                    log.error(f"Erro ao processar PDF {idx+1}: {read_err}. Pulando este PDF.")
-                    # Considerar se deve falhar tudo ou apenas pular o PDF problemático
-                    # Aqui estamos pulando.
+            except Exception as read_err:
+                # Logar erro específico na leitura/processamento de um PDF, mas continuar
+                log.error("Erro ao processar PDF %s: %s. Pulando este PDF.", idx+1, read_err)
+                # Considerar se deve falhar tudo ou apenas pular o PDF problemático
+                # Aqui estamos pulando.
 
-            # Verificar se algum PDF válido foi adicionado
-            if valid_pdfs_merged == 0:
-                return False, None, "Nenhum PDF válido encontrado para juntar."
-            if valid_pdfs_merged < len(pdf_byte_streams):
-                merge_message_suffix = f" ({valid_pdfs_merged} de {len(pdf_byte_streams)} PDFs juntados com sucesso)."
-            else:
-                merge_message_suffix = "."
+        return merged_writer, valid_pdfs_merged
+
+    def _merge_message_suffix(self, valid_pdfs_merged, total_pdfs):
+        """Monta o sufixo da mensagem de junção indicando PDFs pulados."""
+        if valid_pdfs_merged < total_pdfs:
+            return f" ({valid_pdfs_merged} de {total_pdfs} PDFs juntados com sucesso)."
+        return "."
+
+    def merge_pdf_files(self, input_pdf_paths, output_pdf_path):
+        """
+        Junta múltiplos PDFs em disco em um único arquivo, sem carregá-los inteiros na memória.
 
-            # Escrever o resultado em um stream de bytes na memória
-            output_stream = io.BytesIO()
-            merged_writer.write(output_stream)
-            # merged_writer.close() # PdfWriter não tem close() explícito necessário como arquivos
+        Args:
+            input_pdf_paths (list): Caminhos dos PDFs, na ordem de junção.
+            output_pdf_path (str): Caminho do PDF resultante.
 
-            # Obter os bytes resultantes
-            output_stream.seek(0)
-            result_bytes = output_stream.getvalue()
+        Returns:
+            tuple: (bool: success, str: message)
+        """
+        if not input_pdf_paths or len(input_pdf_paths) < 2:
+            return False, "Pelo menos dois PDFs são necessários para a junção."
 
-            if not result_bytes:
-                # Isso seria estranho se valid_pdfs_merged > 0
+        try:
+            merged_writer, valid_pdfs_merged = self._build_merged_writer([str(path) for path in input_pdf_paths])
+
+            if valid_pdfs_merged == 0:
+                return False, "Nenhum PDF válido encontrado para juntar."
+            merge_message_suffix = self._merge_message_suffix(valid_pdfs_merged, len(input_pdf_paths))
+
+            with open(output_pdf_path, "wb") as output_file:
+                merged_writer.write(output_file)
+
+            if not os.path.exists(output_pdf_path) or os.path.getsize(output_pdf_path) == 0:
                 log.error("Junção de PDFs resultou em um arquivo vazio.")
-                return False, None, "Erro inesperado: Junção resultou em arquivo vazio."
+                return False, "Erro inesperado: Junção resultou em arquivo vazio."
 
-            log.info(f"Junção de PDFs concluída com sucesso{merge_message_suffix}")
-            return True, result_bytes, f"PDFs juntados com sucesso{merge_message_suffix}"
+            log.info("Junção de PDFs concluída com sucesso%s", merge_message_suffix)
+            return True, f"PDFs juntados com sucesso{merge_message_suffix}"
 
         except Exception as e:
             error_msg = f"Erro inesperado durante a junção de PDFs: {e}"
             log.exception(error_msg)
-            return False, None, error_msg
-        finally:
-            # Garantir que o writer seja fechado (embora não seja estritamente necessário para BytesIO?)
-            pass # PdfWriter não tem close()
\ No newline at end of file
+            if os.path.exists(output_pdf_path):
+                try: os.unlink(output_pdf_path)
+                except OSError: pass
+            return False, error_msg
+
+
+# --- Operações executadas no pool de processos (utils.task_manager.run_in_process) ---
+# Funções de módulo: só os caminhos e parâmetros são serializados a cada chamada,
+# e cada worker cria o seu PDFTransformer uma única vez.
+_worker_transformer = None
+
+def _get_worker_transformer():
+    """PDFTransformer do processo atual, criado na primeira chamada"""
+    global _worker_transformer
+    if _worker_transformer is None:
+        _worker_transformer = PDFTransformer()
+    return _worker_transformer
+
+def process_compression_ocr_file(input_pdf_path, output_pdf_path, compression_level=3, apply_ocr=False, ocr_language='por'):
+    """Ver PDFTransformer.process_compression_ocr_file."""
+    return _get_worker_transformer().process_compression_ocr_file(
+        input_pdf_path, output_pdf_path, compression_level=compression_level, apply_ocr=apply_ocr, ocr_language=ocr_language
+    )
+
+def image_to_pdf(image_paths, output_pdf_path):
+    """Ver PDFTransformer.image_to_pdf."""
+    return _get_worker_transformer().image_to_pdf(image_paths, output_pdf_path)
+
+def pdf_to_docx(input_pdf_path, output_docx_path, apply_ocr=False, ocr_language='por'):
+    """Ver PDFTransformer.pdf_to_docx."""
+    return _get_worker_transformer().pdf_to_docx(input_pdf_path, output_docx_path, apply_ocr=apply_ocr, ocr_language=ocr_language)
+
+def pdf_to_image_zip(input_pdf_path, output_zip_path, image_format='png', dpi=150):
+    """Ver PDFTransformer.pdf_to_image_zip."""
+    return _get_worker_transformer().pdf_to_image_zip(input_pdf_path, output_zip_path, image_format=image_format, dpi=dpi)
+
+def document_to_pdf(input_doc_path, output_pdf_path, profile_dir=None):
+    """Ver PDFTransformer.document_to_pdf."""
+    return _get_worker_transformer().document_to_pdf(input_doc_path, output_pdf_path, profile_dir=profile_dir)
+
+def merge_pdf_files(input_pdf_paths, output_pdf_path):
+    """Ver PDFTransformer.merge_pdf_files."""
+    return _get_worker_transformer().merge_pdf_files(input_pdf_paths, output_pdf_path)
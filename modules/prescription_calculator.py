@@ -75,11 +75,11 @@ def calculate_prescription(
                     total_dias_suspensao += duracao_susp
                     dias_susp_str_parts.append(f"{duracao_susp.days}d ({inicio.strftime('%d/%m/%y')}-{fim.strftime('%d/%m/%y')})")
                 else:
-                     log.warning(f"Período de suspensão {i+1} inválido (fim < inicio): {susp}")
+                     log.warning("Período de suspensão %s inválido (fim < inicio): %s", i+1, susp)
             else:
-                 log.warning(f"Período de suspensão {i+1} ignorado (fora do prazo relevante): {susp}")
+                 log.warning("Período de suspensão %s ignorado (fora do prazo relevante): %s", i+1, susp)
         else:
-            log.warning(f"Período de suspensão {i+1} inválido ou incompleto: {susp}")
+            log.warning("Período de suspensão %s inválido ou incompleto: %s", i+1, susp)
 
     # 4. Calcular data final com suspensões
     data_final_prescricao = prescricao_base_interrompida + total_dias_suspensao
@@ -1,7 +1,11 @@
 # modules/rdpm_agent.py
 
 import os
+import re
+import hashlib
 import logging
+import threading
+import numpy as np
 # REMOVED: import streamlit as st
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
@@ -11,22 +15,140 @@ from langchain_openai import ChatOpenAI  # Needs OpenAI client details
 from langchain.prompts import ChatPromptTemplate
 from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
-from typing import Union
+from typing import Any, Iterator, List, Tuple, Union
 from openai import OpenAI # Import OpenAI client type hint
 
 # Configuração de Logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 log = logging.getLogger(__name__)
 
 # --- Constantes ---
 PDF_PATH = "files/rdpm.pdf"
 EMBEDDING_MODEL_NAME = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
 CACHE_DIR = os.getenv("HF_HOME", "/app/.cache/huggingface") # Use HF_HOME from env if set
+SEMANTIC_CACHE_SIZE = 1000
+SEMANTIC_CACHE_THRESHOLD = 0.95 # Similaridade de cosseno mínima para reutilizar uma resposta
 
 # --- Module-Level Globals (to store initialized resources) ---
 RDP_RETRIEVER = None
 RDP_RAG_CHAIN = None
 
+class SemanticCache:
+    """
+    Cache de respostas por similaridade semântica da pergunta: paráfrases de uma
+    pergunta já respondida reutilizam a resposta sem nova recuperação nem chamada ao LLM.
+    As perguntas são independentes (o chat não envia histórico), então basta comparar
+    a pergunta atual. Cada worker do uvicorn mantém seu próprio cache, com descarte LRU.
+    Repetições exatas (após normalização) são encontradas pela chave, sem calcular embedding.
+    A similaridade só seleciona candidatas: a resposta é reutilizada apenas se a assinatura
+    (ver answer_signature) coincidir, pois perguntas sobre artigos diferentes podem ter
+    embeddings quase idênticos.
+    """
+
+    def __init__(self, size: int = SEMANTIC_CACHE_SIZE, threshold: float = SEMANTIC_CACHE_THRESHOLD):
+        self.size = size
+        self.threshold = threshold
+        self._vectors = None # Matriz (size, dim) de embeddings normalizados
+        self._entries = [None] * size # (resposta, documentos de contexto)
+        self._keys = [None] * size # Chave da pergunta normalizada de cada posição
+        self._signatures = [None] * size # Assinatura (números e trechos recuperados) de cada posição
+        self._index_by_key = {}
+        self._last_used = np.full(size, -1, dtype=np.int64) # -1 = posição livre
+        self._clock = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup_key(self, key: str) -> Union[Tuple[str, list], None]:
+        """
+        Procura a resposta de uma pergunta idêntica (mesma chave normalizada).
+
+        Args:
+            key (str): Chave da pergunta (ver question_key)
+
+        Returns:
+            Tuple[str, list]: (resposta, documentos de contexto) ou None se não houver
+        """
+        with self._lock:
+            index = self._index_by_key.get(key)
+            if index is None:
+                return None
+            self._clock += 1
+            self._last_used[index] = self._clock
+            return self._entries[index]
+
+    def candidates(self, vector) -> List[Tuple[int, Tuple[str, list], tuple]]:
+        """
+        Procura respostas de perguntas semanticamente próximas (ainda a verificar).
+
+        Args:
+            vector: Embedding da pergunta
+
+        Returns:
+            List: (posição, (resposta, documentos de contexto), assinatura) das entradas
+                  acima do limiar, da mais para a menos similar
+        """
+        with self._lock:
+            if self._vectors is None:
+                return []
+            scores = self._vectors @ self._normalize(vector)
+            scores[self._last_used < 0] = -1.0
+            indices = np.flatnonzero(scores >= self.threshold)
+            indices = indices[np.argsort(-scores[indices])]
+            return [(int(index), self._entries[index], self._signatures[index]) for index in indices]
+
+    def touch(self, index: int) -> None:
+        """Marca a entrada como usada agora (descarte LRU), após uma candidata ser confirmada"""
+        with self._lock:
+            self._clock += 1
+            self._last_used[index] = self._clock
+
+    def store(self, key: str, vector, answer: str, context: list, signature: tuple) -> None:
+        """
+        Armazena uma resposta, substituindo a entrada usada há mais tempo se o cache estiver cheio.
+
+        Args:
+            key (str): Chave da pergunta normalizada
+            vector: Embedding da pergunta
+            answer (str): Resposta gerada
+            context (list): Documentos recuperados para a resposta
+            signature (tuple): Assinatura da pergunta (ver answer_signature)
+        """
+        vector = self._normalize(vector)
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.size, vector.shape[0]), dtype=np.float32)
+            index = self._index_by_key.get(key)
+            if index is None:
+                index = int(np.argmin(self._last_used))
+                self._index_by_key.pop(self._keys[index], None)
+                self._keys[index] = key
+                self._index_by_key[key] = index
+            self._clock += 1
+            self._vectors[index] = vector
+            self._entries[index] = (answer, context)
+            self._signatures[index] = signature
+            self._last_used[index] = self._clock
+
+def question_key(question: str) -> str:
+    """Chave da pergunta normalizada (minúsculas, espaços colapsados)"""
+    normalized = re.sub(r"\s+", " ", question.strip().lower())
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+def answer_signature(question: str, documents: list) -> tuple:
+    """
+    O que precisa coincidir para uma paráfrase reutilizar a resposta: os números citados
+    na pergunta (artigos, incisos, prazos) e os trechos do RDPM recuperados para ela.
+    """
+    numerals = tuple(re.findall(r"\d+|\b[IVXLCDM]+\b", question))
+    chunks = frozenset(hashlib.blake2b(doc.page_content.encode("utf-8"), digest_size=8).digest() for doc in documents)
+    return numerals, chunks
+
+RDP_SEMANTIC_CACHE = SemanticCache()
+
 # --- Initialization Functions (Called once via lifespan) ---
 
 def initialize_rdpm_retriever():
@@ -36,9 +158,9 @@ def initialize_rdpm_retriever():
     Returns:
         FAISS retriever instance or None if initialization fails.
     """
-    log.info(f"Initializing RDPM Retriever from: {PDF_PATH}")
+    log.info("Initializing RDPM Retriever from: %s", PDF_PATH)
     if not os.path.exists(PDF_PATH):
-        log.error(f"Arquivo PDF do RDPM não encontrado em: {PDF_PATH}")
+        log.error("Arquivo PDF do RDPM não encontrado em: %s", PDF_PATH)
         return None
     try:
         loader = PyPDFLoader(PDF_PATH)
@@ -46,11 +168,11 @@ def initialize_rdpm_retriever():
         try:
              docs = loader.load()
         except Exception as load_err:
-             log.error(f"Erro ao carregar o PDF '{PDF_PATH}' com PyPDFLoader: {load_err}", exc_info=True)
+             log.error("Erro ao carregar o PDF '%s' com PyPDFLoader: %s", PDF_PATH, load_err, exc_info=True)
              return None
 
         if not docs:
-            log.error(f"Nenhum documento carregado do PDF: {PDF_PATH}")
+            log.error("Nenhum documento carregado do PDF: %s", PDF_PATH)
             return None
 
         text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150)
@@ -58,10 +180,10 @@ def initialize_rdpm_retriever():
         if not splits:
             log.error("Falha ao dividir o documento PDF em chunks.")
             return None
-        log.info(f"RDPM PDF carregado e dividido em {len(splits)} chunks.")
+        log.info("RDPM PDF carregado e dividido em %s chunks.", len(splits))
 
         # Initialize Embeddings
-        log.info(f"Inicializando embeddings: {EMBEDDING_MODEL_NAME} (Cache: {CACHE_DIR})...")
+        log.info("Inicializando embeddings: %s (Cache: %s)...", EMBEDDING_MODEL_NAME, CACHE_DIR)
         try:
             # Certifique-se que o diretório de cache existe
             os.makedirs(CACHE_DIR, exist_ok=True)
@@ -72,7 +194,7 @@ def initialize_rdpm_retriever():
             )
             log.info("Embeddings HuggingFace inicializados.")
         except Exception as emb_err:
-             log.error(f"Erro ao inicializar embeddings '{EMBEDDING_MODEL_NAME}': {emb_err}", exc_info=True)
+             log.error("Erro ao inicializar embeddings '%s': %s", EMBEDDING_MODEL_NAME, emb_err, exc_info=True)
              return None
 
         # Create FAISS index and retriever
@@ -83,11 +205,11 @@ def initialize_rdpm_retriever():
             log.info("Retriever FAISS para RDPM criado com sucesso.")
             return retriever
         except Exception as faiss_err:
-            log.error(f"Erro ao criar índice FAISS ou retriever: {faiss_err}", exc_info=True)
+            log.error("Erro ao criar índice FAISS ou retriever: %s", faiss_err, exc_info=True)
             return None
 
     except Exception as e:
-        log.error(f"Erro inesperado em initialize_rdpm_retriever: {e}", exc_info=True)
+        log.error("Erro inesperado em initialize_rdpm_retriever: %s", e, exc_info=True)
         return None
 
 def create_rag_chain(retriever, llm_client: OpenAI):
@@ -120,7 +242,7 @@ def create_rag_chain(retriever, llm_client: OpenAI):
             temperature=0.1,
             max_tokens=1000 # Ajuste conforme necessário
         )
-        log.info(f"Langchain ChatOpenAI configurado com modelo: {llm.model_name}")
+        log.info("Langchain ChatOpenAI configurado com modelo: %s", llm.model_name)
 
         # Define o template do prompt (mantido como antes)
         prompt_template = """Você é um assistente especializado e muito preciso sobre o Regulamento Disciplinar da Polícia Militar de Rondônia (RDPM). Sua tarefa é responder à pergunta do usuário baseando-se SOMENTE nos trechos do RDPM fornecidos abaixo como contexto.
@@ -147,7 +269,7 @@ def create_rag_chain(retriever, llm_client: OpenAI):
         return retrieval_chain
 
     except Exception as e:
-        log.error(f"Erro ao criar a RAG chain: {e}", exc_info=True)
+        log.error("Erro ao criar a RAG chain: %s", e, exc_info=True)
         return None
 
 # --- Função de Inicialização Principal (Chamada pelo lifespan de app.py) ---
@@ -192,6 +314,39 @@ def initialize_rdpm_agent(llm_client: Union[OpenAI, None]):
 
 # --- Função de Query (Chamada pelas rotas FastHTML) ---
 
+def _embed_question(question: str) -> list:
+    """Embedding da pergunta com o mesmo modelo usado na indexação do RDPM"""
+    return RDP_RETRIEVER.vectorstore.embeddings.embed_query(question.strip())
+
+def _cached_answer(question: str) -> Tuple[str, Any, Union[Tuple[str, list], None]]:
+    """
+    Consulta o cache: primeiro pela pergunta exata, depois por similaridade semântica.
+    Uma candidata semântica só é aceita se a pergunta atual recuperar os mesmos trechos
+    do RDPM e citar os mesmos números (ver answer_signature).
+
+    Returns:
+        Tuple: (chave, embedding ou None se não foi necessário, (resposta, contexto) ou None)
+    """
+    key = question_key(question)
+    cached = RDP_SEMANTIC_CACHE.lookup_key(key)
+    if cached:
+        return key, None, cached
+    question_vector = _embed_question(question)
+    candidates = RDP_SEMANTIC_CACHE.candidates(question_vector)
+    if not candidates:
+        return key, question_vector, None
+    # Busca no FAISS reaproveitando o embedding: barata perto de uma chamada ao LLM
+    documents = RDP_RETRIEVER.vectorstore.similarity_search_by_vector(
+        question_vector, k=RDP_RETRIEVER.search_kwargs.get("k", 4)
+    )
+    signature = answer_signature(question, documents)
+    for index, entry, entry_signature in candidates:
+        if entry_signature == signature:
+            RDP_SEMANTIC_CACHE.touch(index)
+            return key, question_vector, entry
+    log.info("Pergunta similar em cache descartada: trechos recuperados ou números diferentes.")
+    return key, question_vector, None
+
 def query_rdpm(question: str) -> dict | None:
     """
     Executa uma consulta no RAG chain pré-inicializado.
@@ -212,12 +367,64 @@ def query_rdpm(question: str) -> dict | None:
         log.warning("Tentativa de query RDPM com pergunta vazia.")
         return {"answer": "Por favor, faça uma pergunta.", "context": []} # Retorna resposta padrão
 
-    log.info(f"Executando query RDPM: '{question[:50]}...'")
+    log.info("Executando query RDPM: '%s...'", question[:50])
     try:
+        key, question_vector, cached = _cached_answer(question)
+        if cached:
+            log.info("Query RDPM respondida pelo cache.")
+            answer, context = cached
+            return {"input": question, "answer": answer, "context": context}
+
         response = RDP_RAG_CHAIN.invoke({"input": question})
         # response já é um dicionário se a chamada for bem-sucedida
         log.info("Query RDPM concluída.")
+        if response.get("answer"):
+            context = response.get("context", [])
+            RDP_SEMANTIC_CACHE.store(key, question_vector, response["answer"], context, answer_signature(question, context))
         return response
     except Exception as e:
-        log.error(f"Erro durante a invocação da RAG chain RDPM: {e}", exc_info=True)
-        return None # Indica erro na consulta
\ No newline at end of file
+        log.error("Erro durante a invocação da RAG chain RDPM: %s", e, exc_info=True)
+        return None # Indica erro na consulta
+
+def stream_rdpm(question: str) -> Iterator[Tuple[str, Any]]:
+    """
+    Executa uma consulta no RAG chain entregando o resultado em partes,
+    à medida que o LLM gera a resposta.
+
+    Args:
+        question (str): A pergunta do usuário.
+
+    Yields:
+        Tuple[str, Any]: ("context", lista de documentos) uma vez, após a recuperação,
+                         e ("answer", trecho de texto) para cada parte da resposta.
+
+    Raises:
+        RuntimeError: Se o agente não estiver inicializado.
+    """
+    if RDP_RAG_CHAIN is None:
+        raise RuntimeError("RAG chain RDPM não inicializada.")
+
+    log.info("Executando query RDPM (stream): '%s...'", question[:50])
+    key, question_vector, cached = _cached_answer(question)
+    if cached:
+        log.info("Query RDPM respondida pelo cache.")
+        answer, context = cached
+        yield "context", context
+        yield "answer", answer
+        return
+
+    answer_parts = []
+    context = []
+    for chunk in RDP_RAG_CHAIN.stream({"input": question}):
+        # create_retrieval_chain emite "input", depois "context" e então a resposta em pedaços
+        if chunk.get("context"):
+            context = chunk["context"]
+            yield "context", context
+        if chunk.get("answer"):
+            answer_parts.append(chunk["answer"])
+            yield "answer", chunk["answer"]
+    log.info("Query RDPM (stream) concluída.")
+
+    # Só respostas completas entram no cache (um stream interrompido não chega aqui)
+    if answer_parts:
+        RDP_SEMANTIC_CACHE.store(key, question_vector, "".join(answer_parts), context, answer_signature(question, context))
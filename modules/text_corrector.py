@@ -2,15 +2,18 @@
 
 import os
 import logging
-from typing import Union, Optional
+from typing import Union, Optional, Iterator
 from openai import OpenAI # Certifique-se que a versão >= 1.0 está instalada
 from dotenv import load_dotenv
 
-# Configuração de Logging (Pode ser configurada centralmente em app.py)
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Configuração de Logging: feita centralmente em app.py
 # Logger nomeado para este módulo
 log = logging.getLogger(__name__)
 
+# Prompts da correção de texto genérico (compartilhados pelas versões com e sem streaming)
+CORRECT_TEXT_SYSTEM_PROMPT = "Você é um revisor de texto experiente, focado em corrigir erros gramaticais e ortográficos do Português Brasileiro, mantendo o sentido original."
+CORRECT_TEXT_USER_PROMPT = 'Corrija o seguinte texto aplicando as normas padrões da língua portuguesa. Retorne APENAS o texto corrigido, sem introduções, explicações ou formatação extra (como ```): {text}'
+
 class TextCorrector:
     """
     Classe responsável por interagir com uma API de LLM (compatível com OpenAI)
@@ -36,10 +39,10 @@ class TextCorrector:
         if self.api_key:
             try:
                 self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
-                log.info(f"Cliente OpenAI inicializado. Base URL: {self.base_url}, Modelo Padrão: {self.model_name}")
+                log.info("Cliente OpenAI inicializado. Base URL: %s, Modelo Padrão: %s", self.base_url, self.model_name)
             except Exception as e:
                  # Captura e loga erros durante a inicialização do cliente
-                 log.error(f"Erro ao inicializar cliente OpenAI com Base URL '{self.base_url}': {e}", exc_info=True)
+                 log.error("Erro ao inicializar cliente OpenAI com Base URL '%s': %s", self.base_url, e, exc_info=True)
                  self.client = None # Garante que self.client é None em caso de erro
         else:
             # Loga um aviso se a chave API não for encontrada
@@ -65,6 +68,42 @@ class TextCorrector:
         # Apenas retorna o cliente, a verificação é feita onde ele é usado
         return self.client
 
+    def _request_params(self, system_prompt: str, user_prompt: str, temperature: float, max_tokens_multiplier: float, base_tokens: int) -> dict:
+        """Parâmetros da chamada de chat completion, com max_tokens estimado a partir do input."""
+        # Estimar max_tokens com base no input
+        # Contagem de palavras simples como proxy
+        input_words = len(user_prompt.split())
+        # Adicionar uma margem e garantir um mínimo
+        max_tokens_estimate = max(int(input_words * max_tokens_multiplier) + base_tokens, 200)
+        log.info("Enviando requisição para LLM (modelo: %s, temp: %s, max_tokens ~%s)...", self.model_name, temperature, max_tokens_estimate)
+        return {
+            "model": self.model_name,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": temperature,
+            "max_tokens": max_tokens_estimate,
+        }
+
+    @staticmethod
+    def clean_response(result_text: str) -> str:
+        """
+        Remove espaços nas pontas e blocos de código ``` que a API às vezes adiciona por engano.
+
+        Args:
+            result_text: Texto retornado pela API.
+
+        Returns:
+            O texto limpo.
+        """
+        result_text = result_text.strip()
+        if result_text.startswith("```") and result_text.endswith("```"):
+             result_text = result_text[3:-3].strip()
+             if result_text.startswith("text"): # Remover 'text' se iniciar com ```text
+                  result_text = result_text[4:].strip()
+        return result_text
+
     def _call_api(self, system_prompt: str, user_prompt: str, temperature: float, max_tokens_multiplier: float = 1.5, base_tokens: int = 150) -> Optional[str]:
         """Método auxiliar interno para chamar a API de chat completion."""
         if not self.is_configured():
@@ -77,44 +116,42 @@ class TextCorrector:
              # No entanto, os métodos públicos já tratam input vazio, então None aqui indica falha interna.
              return None # Indica falha interna (não deveria chegar aqui com prompt vazio vindo dos métodos públicos)
 
-        # Estimar max_tokens com base no input
-        # Contagem de palavras simples como proxy
-        input_words = len(user_prompt.split())
-        # Adicionar uma margem e garantir um mínimo
-        max_tokens_estimate = max(int(input_words * max_tokens_multiplier) + base_tokens, 200)
-        log.info(f"Enviando requisição para LLM (modelo: {self.model_name}, temp: {temperature}, max_tokens ~{max_tokens_estimate})...")
-
         try:
             response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=temperature,
-                max_tokens=max_tokens_estimate,
-                # stream=False # Padrão é False
+                **self._request_params(system_prompt, user_prompt, temperature, max_tokens_multiplier, base_tokens)
             )
 
             # Extrai e limpa a resposta de forma segura
             if response.choices and response.choices[0].message and response.choices[0].message.content:
-                result_text = response.choices[0].message.content.strip()
                 log.info("Resposta recebida da API LLM.")
-                # Remover blocos de código ``` se a API os adicionar por engano
-                if result_text.startswith("```") and result_text.endswith("```"):
-                     result_text = result_text[3:-3].strip()
-                     if result_text.startswith("text"): # Remover 'text' se iniciar com ```text
-                          result_text = result_text[4:].strip()
-                return result_text
+                return self.clean_response(response.choices[0].message.content)
             else:
-                log.warning(f"Resposta da API LLM inesperada ou vazia: {response}")
+                log.warning("Resposta da API LLM inesperada ou vazia: %s", response)
                 return None # Retorna None se a resposta não for válida
 
         except Exception as e:
             # Captura e loga erros durante a chamada da API
-            log.error(f"Erro ao chamar API LLM em {self.base_url}: {e}", exc_info=True)
+            log.error("Erro ao chamar API LLM em %s: %s", self.base_url, e, exc_info=True)
             return None # Retorna None para indicar erro na API
 
+    def _stream_api(self, system_prompt: str, user_prompt: str, temperature: float, max_tokens_multiplier: float = 1.5, base_tokens: int = 150) -> Iterator[str]:
+        """
+        Versão em streaming de _call_api: produz os trechos do texto conforme a API os gera.
+        Os erros da API são propagados para quem consome o stream.
+        """
+        stream = self.client.chat.completions.create(
+            **self._request_params(system_prompt, user_prompt, temperature, max_tokens_multiplier, base_tokens),
+            stream=True
+        )
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            log.info("Resposta transmitida pela API LLM.")
+        finally:
+            # Libera a conexão HTTP também quando o consumidor abandona o stream (cliente desconectado)
+            stream.close()
+
     def correct_text(self, text: str) -> Optional[str]:
         """
         Corrige um texto genérico usando a API configurada.
@@ -134,10 +171,32 @@ class TextCorrector:
             log.debug("correct_text chamado com texto vazio ou apenas espaços.")
             return "" # Retorna string vazia para input vazio
 
-        system_prompt = "Você é um revisor de texto experiente, focado em corrigir erros gramaticais e ortográficos do Português Brasileiro, mantendo o sentido original."
-        user_prompt = f'Corrija o seguinte texto aplicando as normas padrões da língua portuguesa. Retorne APENAS o texto corrigido, sem introduções, explicações ou formatação extra (como ```): {text}'
+        user_prompt = CORRECT_TEXT_USER_PROMPT.format(text=text)
+        return self._call_api(CORRECT_TEXT_SYSTEM_PROMPT, user_prompt, temperature=0.3, base_tokens=100)
+
+    def correct_text_stream(self, text: str) -> Iterator[str]:
+        """
+        Corrige um texto genérico como correct_text, produzindo o resultado em partes
+        conforme a API o gera (a interface exibe o texto sem esperar a resposta completa).
+        O texto completo deve passar por clean_response ao final.
+
+        Args:
+            text: O texto a ser corrigido.
+
+        Yields:
+            Trechos do texto corrigido.
+
+        Raises:
+            RuntimeError: Se a API não estiver configurada.
+        """
+        if not self.is_configured():
+            raise RuntimeError("API de correção não configurada.")
+        if not text or not text.strip():
+            log.debug("correct_text_stream chamado com texto vazio ou apenas espaços.")
+            return
 
-        return self._call_api(system_prompt, user_prompt, temperature=0.3, base_tokens=100)
+        user_prompt = CORRECT_TEXT_USER_PROMPT.format(text=text)
+        yield from self._stream_api(CORRECT_TEXT_SYSTEM_PROMPT, user_prompt, temperature=0.3, base_tokens=100)
 
 
     def correct_transcription(self, text: str) -> Optional[str]:
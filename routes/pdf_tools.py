@@ -1,15 +1,18 @@
 import asyncio
 from fasthtml.common import *
 from starlette.requests import Request
+from contextlib import asynccontextmanager
 from pathlib import Path
-import shutil
 import tempfile
 import logging
 import os
 import io
 import json
 
-from components.layout import page_layout
+from components.layout import render_page
+from utils.http_cache import render_static_html, cached_html_response
+from utils.file_utils import unique_token, spool_upload, safe_filename, discard_temp_files, upload_size
+from utils.task_manager import run_in_process
 
 # Configuração de logging
 log = logging.getLogger(__name__)
@@ -21,8 +24,285 @@ UPLOAD_TEMP_DIR.mkdir(exist_ok=True)
 # Semáforo para limitar processamentos de PDF simultâneos
 pdf_processing_semaphore = asyncio.Semaphore(3)
 
-# Variável para armazenar a instância do PDFTransformer
-pdf_transformer = None
+# Faixa de DPI da conversão PDF -> imagem (memória e tempo crescem com DPI²)
+MIN_IMAGE_DPI = 72
+MAX_IMAGE_DPI = 300
+
+# Extensões aceitas nas conversões via LibreOffice (e a mensagem de erro correspondente)
+DOC_EXTENSIONS = frozenset({".docx", ".doc", ".odt", ".txt"})
+DOC_EXTENSIONS_MSG = ", ".join(sorted(DOC_EXTENSIONS))
+SHEET_EXTENSIONS = frozenset({".xlsx", ".csv", ".ods"})
+SHEET_EXTENSIONS_MSG = ", ".join(sorted(SHEET_EXTENSIONS))
+
+# Tamanho máximo do(s) arquivo(s) enviado(s) por operação
+MAX_UPLOAD_BYTES = 100 * 1024 * 1024
+# Limite do corpo inteiro da requisição: arquivos + campos e delimitadores do multipart
+MAX_REQUEST_BYTES = MAX_UPLOAD_BYTES + 1024 * 1024
+
+# Conversões LibreOffice simultâneas: cada uma usa um perfil de usuário exclusivo
+LIBREOFFICE_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+LIBREOFFICE_PROFILE_DIR = Path(tempfile.gettempdir()) / "fasthtml_lo_profiles"
+_libreoffice_slots = asyncio.Queue()
+for _slot in range(LIBREOFFICE_WORKERS):
+    _libreoffice_slots.put_nowait(_slot)
+
+@asynccontextmanager
+async def libreoffice_profile():
+    """Reserva um perfil LibreOffice livre (aguarda se todos estiverem em uso)"""
+    slot = await _libreoffice_slots.get()
+    try:
+        # O pid separa os perfis dos diferentes workers do uvicorn
+        yield str(LIBREOFFICE_PROFILE_DIR / f"{os.getpid()}_{slot}")
+    finally:
+        _libreoffice_slots.put_nowait(slot)
+
+async def _convert_document_to_pdf(request: Request, pdf_transformer, input_path: Path, output_path: Path):
+    """
+    Converte um documento/planilha para PDF com o LibreOffice.
+    Usa o unoserver residente quando disponível; caso contrário (ou se ele falhar),
+    executa o soffice --headless com um perfil exclusivo.
+    
+    Args:
+        request (Request): Requisição (fornece o pool do unoserver em app.state)
+        pdf_transformer: Instância do PDFTransformer
+        input_path (Path): Documento de entrada
+        output_path (Path): PDF de saída
+        
+    Returns:
+        tuple: (bool: success, str: message)
+    """
+    unoserver_pool = request.app.state.unoserver_pool
+    if unoserver_pool and unoserver_pool.available and pdf_transformer.unoconvert_cmd:
+        # unoconvert é só um cliente leve: basta uma thread
+        async with unoserver_pool.acquire() as port:
+            success, message = await asyncio.to_thread(
+                pdf_transformer.document_to_pdf_uno, str(input_path), str(output_path), port
+            )
+        if success:
+            return success, message
+        log.warning("Conversão via unoserver falhou (%s); usando soffice --headless.", message)
+
+    async with libreoffice_profile() as profile_dir:
+        return await run_in_process(
+            request.app.state.pdf_module.document_to_pdf, str(input_path), str(output_path), profile_dir=profile_dir
+        )
+
+# Operações disponíveis no seletor de ferramentas PDF
+PDF_OPERATIONS = ("compress", "merge", "img2pdf", "pdf2docx", "pdf2img", "doc2pdf", "sheet2pdf", "ocr")
+
+def _build_pdf_form(operation: str):
+    """Monta o formulário da operação PDF selecionada"""
+    
+    # Atributos comuns para todos os formulários
+    common_attrs = {
+        "hx_target": "#pdf-result-area", 
+        "hx_encoding": "multipart/form-data", 
+        "hx_swap": "innerHTML"
+    }
+
+    if operation == "compress":
+        return Form(
+            Label("Carregar PDF para Comprimir:", fr="pdf_file"), 
+            Input(type="file", id="pdf_file", name="pdf_file", accept=".pdf", required=True),
+            Label("Nível (0-4):", fr="level"), 
+            Select(*[Option(str(i), value=str(i), selected=(i==3)) for i in range(5)], id="level", name="level"),
+            Button("Comprimir PDF", type="submit"), 
+            hx_post="/pdf-tools/compress", 
+            **common_attrs
+        )
+    elif operation == "merge":
+        return Form(
+            Label("Carregar 2+ PDFs:", fr="pdf_files"), 
+            Input(type="file", id="pdf_files", name="pdf_files", accept=".pdf", multiple=True, required=True),
+            Button("Juntar PDFs", type="submit"), 
+            hx_post="/pdf-tools/merge", 
+            **common_attrs
+        )
+    elif operation == "img2pdf":
+        return Form(
+            Label("Carregar Imagens:", fr="img_files"), 
+            Input(type="file", id="img_files", name="img_files", accept="image/jpeg,image/png", multiple=True, required=True),
+            Button("Imagens para PDF", type="submit"), 
+            hx_post="/pdf-tools/img2pdf", 
+            **common_attrs
+        )
+    elif operation == "pdf2docx":
+        return Form(
+            Label("Carregar PDF:", fr="pdf_file"), 
+            Input(type="file", id="pdf_file", name="pdf_file", accept=".pdf", required=True),
+            Div(
+                Input(type="checkbox", id="apply_ocr", name="apply_ocr", value="true"), 
+                Label(" Tentar OCR", fr="apply_ocr"), 
+                style="margin: 0.5rem 0;"
+            ),
+            Button("Converter para DOCX", type="submit"), 
+            hx_post="/pdf-tools/pdf2docx", 
+            **common_attrs
+        )
+    elif operation == "pdf2img":
+        return Form(
+            Label("Carregar PDF:", fr="pdf_file"), 
+            Input(type="file", id="pdf_file", name="pdf_file", accept=".pdf", required=True),
+            Label("DPI (quanto maior, melhor a qualidade):", fr="dpi"),
+            Select(
+                *[Option(f"{dpi}", value=f"{dpi}", selected=(dpi==150)) for dpi in [75, 100, 150, 200, 300]],
+                id="dpi", 
+                name="dpi"
+            ),
+            Button("Converter para Imagens", type="submit"), 
+            hx_post="/pdf-tools/pdf2img", 
+            **common_attrs
+        )
+    elif operation == "doc2pdf":
+        return Form(
+            Label("Carregar Documento (DOCX, DOC, ODT, TXT):", fr="doc_file"),
+            Input(type="file", id="doc_file", name="doc_file", accept=".docx,.doc,.odt,.txt", required=True),
+            P("Conversão usando LibreOffice", style="font-style:italic; font-size:0.9em; color:#666;"),
+            Button("Converter para PDF", type="submit"), 
+            hx_post="/pdf-tools/doc2pdf", 
+            **common_attrs
+        )
+    elif operation == "sheet2pdf":
+        return Form(
+            Label("Carregar Planilha (XLSX, CSV, ODS):", fr="sheet_file"),
+            Input(type="file", id="sheet_file", name="sheet_file", accept=".xlsx,.csv,.ods", required=True),
+            P("Conversão usando LibreOffice. Múltiplas abas serão convertidas em múltiplas páginas.", 
+              style="font-style:italic; font-size:0.9em; color:#666;"),
+            Button("Converter para PDF", type="submit"), 
+            hx_post="/pdf-tools/sheet2pdf", 
+            **common_attrs
+        )
+    elif operation == "ocr":
+        return Form(
+            Label("Carregar PDF para aplicar OCR:", fr="pdf_file"),
+            Input(type="file", id="pdf_file", name="pdf_file", accept=".pdf", required=True),
+            Label("Idioma:", fr="language"),
+            Select(
+                Option("Português", value="por", selected=True),
+                Option("Inglês", value="eng"),
+                Option("Misto (Português+Inglês)", value="por+eng"),
+                id="language", 
+                name="language"
+            ),
+            P("OCR torna o texto pesquisável em PDFs escaneados.", 
+              style="font-style:italic; font-size:0.9em; color:#666;"),
+            Button("Aplicar OCR", type="submit"), 
+            hx_post="/pdf-tools/ocr", 
+            **common_attrs
+        )
+    else: 
+        return P("")
+
+# Os formulários não dependem da requisição: renderizados uma única vez na importação
+_PDF_FORMS = {operation: render_static_html(_build_pdf_form(operation)) for operation in PDF_OPERATIONS}
+_EMPTY_PDF_FORM = render_static_html(_build_pdf_form(""))
+
+def _build_pdf_tools_page(available: bool) -> str:
+    """
+    Página principal das ferramentas PDF, renderizada uma única vez por estado de disponibilidade.
+    
+    Args:
+        available (bool): Se o módulo PDF foi carregado
+        
+    Returns:
+        str: O HTML completo da página
+    """
+    # Mensagem de aviso se o módulo PDF não estiver disponível
+    warning_message = Div(
+    "⚠️ O módulo de processamento de PDF não está disponível no momento.",
+    cls="error-message") if not available else Div()
+
+    return render_page(
+        "Ferramentas PDF",
+        Main(
+            A("← Voltar", href="/", cls="back-button", 
+              style="background-color: #2196F3 !important; color: white !important; border: none !important;"), 
+            H1("📄 Ferramentas PDF"),
+            P("Selecione a operação desejada:"),
+
+            warning_message,
+
+            Div(
+                Select(
+                    Option("Selecione...", value=""), 
+                    Option("Comprimir PDF", value="compress"),
+                    Option("Juntar PDFs", value="merge"), 
+                    Option("Imagens para PDF", value="img2pdf"),
+                    Option("PDF para DOCX", value="pdf2docx"), 
+                    Option("PDF para Imagens", value="pdf2img"),
+                    Option("Documento para PDF", value="doc2pdf"), 
+                    Option("Planilha para PDF", value="sheet2pdf"),
+                    Option("Tornar PDF Pesquisável (OCR)", value="ocr"),
+                    name="pdf_operation", 
+                    id="pdf_operation_select",
+                    hx_get="/pdf-tools/form", 
+                    hx_target="#pdf-form-container", 
+                    hx_swap="innerHTML", 
+                    hx_trigger="change",
+                    data_clear_on_change="pdf-result-area"
+                ),
+                Div(id="pdf-form-container", style="margin-top: 1rem;")
+            ),
+
+            # Área de resultado
+            Div(id="pdf-result-area", cls="result-area"),
+
+            # Loader melhorado
+            Div(
+                Div(cls="loader-spinner"), 
+                "Processando... Por favor, aguarde.",
+                id="pdf-loading",
+                cls="loading-indicator",
+                data_loader_for="pdf-result-area"
+            ),
+
+            cls="container"
+        )
+    )
+
+# A página só muda conforme o componente esteja disponível: as duas variantes são pré-renderizadas
+_PDF_TOOLS_PAGES = {available: render_static_html(_build_pdf_tools_page(available)) for available in (True, False)}
+
+def _too_large_response(size: int) -> HTMLResponse:
+    """Resposta 413 com a mensagem de erro exibida no alvo do formulário"""
+    log.warning("Upload rejeitado: %s bytes (limite %s).", size, MAX_UPLOAD_BYTES)
+    message = Div(f"❌ Arquivo(s) muito grande(s). Limite: {MAX_UPLOAD_BYTES // (1024 * 1024)} MB.", cls="error-message")
+    return HTMLResponse(to_xml(message), status_code=413)
+
+def _request_too_large(request: Request):
+    """
+    Rejeita pelo Content-Length, antes de request.form(): o corpo multipart
+    não chega a ser recebido nem gravado em disco.
+    
+    Args:
+        request (Request): Requisição com o formulário multipart
+        
+    Returns:
+        HTMLResponse 413 com a mensagem de erro, ou None se estiver dentro do limite
+    """
+    try:
+        content_length = int(request.headers.get("content-length", 0))
+    except ValueError:
+        return None
+    if content_length > MAX_REQUEST_BYTES:
+        return _too_large_response(content_length)
+    return None
+
+def _upload_too_large(*uploads):
+    """
+    Verifica o tamanho total dos arquivos enviados antes de qualquer conversão
+    (cobre requisições sem Content-Length, que não passam por _request_too_large).
+    
+    Args:
+        *uploads: Arquivos (UploadFile) recebidos no formulário
+        
+    Returns:
+        HTMLResponse 413 com a mensagem de erro, ou None se estiver dentro do limite
+    """
+    total = sum(upload_size(upload) for upload in uploads if upload and getattr(upload, "filename", None))
+    if total > MAX_UPLOAD_BYTES:
+        return _too_large_response(total)
+    return None
 
 def register_routes(app):
     """Registra todas as rotas relacionadas às ferramentas PDF"""
@@ -30,236 +310,15 @@ def register_routes(app):
     @app.route("/pdf-tools", methods=["GET"])
     def pdf_tools_page(request: Request):
         """Página principal das ferramentas PDF"""
-        
-        # JavaScript para gerenciar o loader e limpar mensagens
-        custom_script = Script("""
-        document.addEventListener('DOMContentLoaded', function() {
-            // Referência ao select de operações
-            const operationSelect = document.getElementById('pdf_operation_select');
-            const resultArea = document.getElementById('pdf-result-area');
-            const loadingIndicator = document.getElementById('pdf-loading');
-            
-            // Função para limpar mensagens anteriores
-            function clearResults() {
-                if (resultArea) {
-                    resultArea.innerHTML = '';
-                }
-            }
-            
-            // Limpar resultados quando trocar de operação
-            if (operationSelect) {
-                operationSelect.addEventListener('change', function() {
-                    clearResults();
-                });
-            }
-            
-            // Eventos HTMX para mostrar/esconder o loader
-            document.body.addEventListener('htmx:beforeRequest', function(event) {
-                // Se a requisição for de algum formulário PDF, mostra o loader
-                if (event.detail.target && event.detail.target.id === 'pdf-result-area') {
-                    if (loadingIndicator) {
-                        loadingIndicator.style.display = 'block';
-                    }
-                    clearResults();
-                }
-            });
-            
-            document.body.addEventListener('htmx:afterRequest', function(event) {
-                // Esconde o loader após qualquer requisição
-                if (loadingIndicator) {
-                    loadingIndicator.style.display = 'none';
-                }
-            });
-        });
-        """)
-        
-        # Estilo do loader
-        loader_style = Style("""
-            #pdf-loading {
-                display: none;
-                margin-top: 1rem;
-                padding: 1rem;
-                background-color: #e9f5ff;
-                border-radius: 5px;
-                text-align: center;
-                border: 1px solid #b8daff;
-            }
-            
-            .loader-spinner {
-                display: inline-block;
-                width: 20px;
-                height: 20px;
-                border: 3px solid rgba(0, 123, 255, 0.3);
-                border-radius: 50%;
-                border-top-color: #007bff;
-                animation: spin 1s ease-in-out infinite;
-                margin-right: 10px;
-                vertical-align: middle;
-            }
-            
-            @keyframes spin {
-                to { transform: rotate(360deg); }
-            }
-        """)
-        
-        # Mensagem de aviso se o módulo PDF não estiver disponível
-        warning_message = Div(
-        "⚠️ O módulo de processamento de PDF não está disponível no momento.",
-        cls="error-message") if request.app.state.pdf_transformer is None else Div()
-        
-        return page_layout(
-            "Ferramentas PDF",
-            Main(
-                A("← Voltar", href="/", cls="back-button", 
-                  style="background-color: #2196F3 !important; color: white !important; border: none !important;"), 
-                H1("📄 Ferramentas PDF"),
-                P("Selecione a operação desejada:"),
-                
-                warning_message,
-                
-                # CSS e JavaScript personalizados
-                loader_style,
-                custom_script,
-                
-                Div(
-                    Select(
-                        Option("Selecione...", value=""), 
-                        Option("Comprimir PDF", value="compress"),
-                        Option("Juntar PDFs", value="merge"), 
-                        Option("Imagens para PDF", value="img2pdf"),
-                        Option("PDF para DOCX", value="pdf2docx"), 
-                        Option("PDF para Imagens", value="pdf2img"),
-                        Option("Documento para PDF", value="doc2pdf"), 
-                        Option("Planilha para PDF", value="sheet2pdf"),
-                        Option("Tornar PDF Pesquisável (OCR)", value="ocr"),
-                        name="pdf_operation", 
-                        id="pdf_operation_select",
-                        hx_get="/pdf-tools/form", 
-                        hx_target="#pdf-form-container", 
-                        hx_swap="innerHTML", 
-                        hx_trigger="change"
-                    ),
-                    Div(id="pdf-form-container", style="margin-top: 1rem;")
-                ),
-                
-                # Área de resultado
-                Div(id="pdf-result-area", cls="result-area"),
-                
-                # Loader melhorado
-                Div(
-                    Div(cls="loader-spinner"), 
-                    "Processando... Por favor, aguarde.",
-                    id="pdf-loading"
-                ),
-                
-                cls="container"
-            )
-        )
+        page_html, page_etag = _PDF_TOOLS_PAGES[request.app.state.pdf_transformer is not None]
+        return cached_html_response(request, page_html, page_etag)
 
     @app.route("/pdf-tools/form", methods=["GET"])
     async def get_pdf_form(request: Request):
         """Retorna o formulário para a operação PDF selecionada"""
         operation = request.query_params.get("pdf_operation", "")
-        
-        # Atributos comuns para todos os formulários
-        common_attrs = {
-            "hx_target": "#pdf-result-area", 
-            "hx_encoding": "multipart/form-data", 
-            "hx_swap": "innerHTML"
-        }
-
-        if operation == "compress":
-            return Form(
-                Label("Carregar PDF para Comprimir:", fr="pdf_file"), 
-                Input(type="file", id="pdf_file", name="pdf_file", accept=".pdf", required=True),
-                Label("Nível (0-4):", fr="level"), 
-                Select(*[Option(str(i), value=str(i), selected=(i==3)) for i in range(5)], id="level", name="level"),
-                Button("Comprimir PDF", type="submit"), 
-                hx_post="/pdf-tools/compress", 
-                **common_attrs
-            )
-        elif operation == "merge":
-            return Form(
-                Label("Carregar 2+ PDFs:", fr="pdf_files"), 
-                Input(type="file", id="pdf_files", name="pdf_files", accept=".pdf", multiple=True, required=True),
-                Button("Juntar PDFs", type="submit"), 
-                hx_post="/pdf-tools/merge", 
-                **common_attrs
-            )
-        elif operation == "img2pdf":
-            return Form(
-                Label("Carregar Imagens:", fr="img_files"), 
-                Input(type="file", id="img_files", name="img_files", accept="image/jpeg,image/png", multiple=True, required=True),
-                Button("Imagens para PDF", type="submit"), 
-                hx_post="/pdf-tools/img2pdf", 
-                **common_attrs
-            )
-        elif operation == "pdf2docx":
-            return Form(
-                Label("Carregar PDF:", fr="pdf_file"), 
-                Input(type="file", id="pdf_file", name="pdf_file", accept=".pdf", required=True),
-                Div(
-                    Input(type="checkbox", id="apply_ocr", name="apply_ocr", value="true"), 
-                    Label(" Tentar OCR", fr="apply_ocr"), 
-                    style="margin: 0.5rem 0;"
-                ),
-                Button("Converter para DOCX", type="submit"), 
-                hx_post="/pdf-tools/pdf2docx", 
-                **common_attrs
-            )
-        elif operation == "pdf2img":
-            return Form(
-                Label("Carregar PDF:", fr="pdf_file"), 
-                Input(type="file", id="pdf_file", name="pdf_file", accept=".pdf", required=True),
-                Label("DPI (quanto maior, melhor a qualidade):", fr="dpi"),
-                Select(
-                    *[Option(f"{dpi}", value=f"{dpi}", selected=(dpi==150)) for dpi in [75, 100, 150, 200, 300]],
-                    id="dpi", 
-                    name="dpi"
-                ),
-                Button("Converter para Imagens", type="submit"), 
-                hx_post="/pdf-tools/pdf2img", 
-                **common_attrs
-            )
-        elif operation == "doc2pdf":
-            return Form(
-                Label("Carregar Documento (DOCX, DOC, ODT, TXT):", fr="doc_file"),
-                Input(type="file", id="doc_file", name="doc_file", accept=".docx,.doc,.odt,.txt", required=True),
-                P("Conversão usando LibreOffice", style="font-style:italic; font-size:0.9em; color:#666;"),
-                Button("Converter para PDF", type="submit"), 
-                hx_post="/pdf-tools/doc2pdf", 
-                **common_attrs
-            )
-        elif operation == "sheet2pdf":
-            return Form(
-                Label("Carregar Planilha (XLSX, CSV, ODS):", fr="sheet_file"),
-                Input(type="file", id="sheet_file", name="sheet_file", accept=".xlsx,.csv,.ods", required=True),
-                P("Conversão usando LibreOffice. Múltiplas abas serão convertidas em múltiplas páginas.", 
-                  style="font-style:italic; font-size:0.9em; color:#666;"),
-                Button("Converter para PDF", type="submit"), 
-                hx_post="/pdf-tools/sheet2pdf", 
-                **common_attrs
-            )
-        elif operation == "ocr":
-            return Form(
-                Label("Carregar PDF para aplicar OCR:", fr="pdf_file"),
-                Input(type="file", id="pdf_file", name="pdf_file", accept=".pdf", required=True),
-                Label("Idioma:", fr="language"),
-                Select(
-                    Option("Português", value="por", selected=True),
-                    Option("Inglês", value="eng"),
-                    Option("Misto (Português+Inglês)", value="por+eng"),
-                    id="language", 
-                    name="language"
-                ),
-                P("OCR torna o texto pesquisável em PDFs escaneados.", 
-                  style="font-style:italic; font-size:0.9em; color:#666;"),
-                Button("Aplicar OCR", type="submit"), 
-                hx_post="/pdf-tools/ocr", 
-                **common_attrs
-            )
-        else: 
-            return P("")
+        form_html, form_etag = _PDF_FORMS.get(operation, _EMPTY_PDF_FORM)
+        return cached_html_response(request, form_html, form_etag, "public, max-age=600")
 
     @app.route("/pdf-tools/compress", methods=["POST"])
     async def pdf_compress_process(request: Request):
@@ -269,6 +328,10 @@ def register_routes(app):
         if not pdf_transformer:
             return HTMLResponse("Erro: Módulo PDF não inicializado.", status_code=500)
 
+        too_large = _request_too_large(request)
+        if too_large:
+            return too_large
+
         try:
             form_data = await request.form()
             uploaded_file = form_data.get("pdf_file")
@@ -278,27 +341,33 @@ def register_routes(app):
 
         if not uploaded_file or not uploaded_file.filename:
             return Div("❌ Nenhum arquivo PDF fornecido.", cls="error-message")
+        too_large = _upload_too_large(uploaded_file)
+        if too_large:
+            return too_large
 
-        file_bytes = await uploaded_file.read()
-        original_filename = Path(uploaded_file.filename).name
-        ts = int(Path().stat().st_mtime)
+        original_filename = safe_filename(uploaded_file.filename)
+        ts = unique_token()
+        input_filepath = UPLOAD_TEMP_DIR / f"pdfin_{ts}_{original_filename}"
         processed_filename = f"comp_{ts}_{original_filename}"
         processed_filepath = UPLOAD_TEMP_DIR / processed_filename
 
         try:
-            success, result_bytes, message = pdf_transformer.process_compression_ocr(file_bytes, level, False)
-            if success and result_bytes:
-                with open(processed_filepath, "wb") as f:
-                    f.write(result_bytes)
+            # Gravar o upload em disco em blocos, sem carregar o PDF inteiro na memória
+            await spool_upload(uploaded_file, input_filepath)
+
+            success, message = await run_in_process(
+                request.app.state.pdf_module.process_compression_ocr_file, str(input_filepath), str(processed_filepath), level, False
+            )
+            if success and processed_filepath.exists():
                 dl_link = f"/download/{processed_filename}"
                 return Div(P(f"✅ {message}"), A(f"📄 Baixar PDF Comprimido", href=dl_link, target="_blank"), cls="success-message")
             else:
                 return Div(f"❌ Falha na compressão: {message}", cls="error-message")
         except Exception as e:
-            log.exception(f"Erro durante compressão de PDF: {e}")
+            log.exception("Erro durante compressão de PDF: %s", e)
             return Div("❌ Erro interno durante o processamento.", cls="error-message")
-        
-        
+        finally:
+            discard_temp_files(input_filepath)
 
     @app.route("/pdf-tools/merge", methods=["POST"])
     async def pdf_merge_process(request: Request):
@@ -309,6 +378,10 @@ def register_routes(app):
         if not pdf_transformer:
             return HTMLResponse("Erro: Módulo PDF não inicializado.", status_code=500)
         
+        too_large = _request_too_large(request)
+        if too_large:
+            return too_large
+
         try:
             form_data = await request.form()
             uploaded_files = form_data.getlist("pdf_files")
@@ -317,33 +390,36 @@ def register_routes(app):
         
         if not uploaded_files or len(uploaded_files) < 2:
             return Div("❌ Selecione pelo menos dois arquivos PDF.", cls="error-message")
+        too_large = _upload_too_large(*uploaded_files)
+        if too_large:
+            return too_large
         
-        pdf_bytes_list = []
-        filenames = []
+        input_filepaths = []
+        ts = unique_token()
         
         try:
-            for f in uploaded_files:
+            # Gravar cada upload em disco em blocos, sem acumular os PDFs na memória
+            for idx, f in enumerate(uploaded_files):
                 if f.filename:
-                    pdf_bytes_list.append(await f.read())
-                    filenames.append(Path(f.filename).name)
+                    input_filepath = UPLOAD_TEMP_DIR / f"mergein_{ts}_{idx}_{safe_filename(f.filename)}"
+                    input_filepaths.append(await spool_upload(f, input_filepath))
             
-            if len(pdf_bytes_list) < 2:
+            if len(input_filepaths) < 2:
                 return Div("❌ Pelo menos dois PDFs válidos são necessários.", cls="error-message")
             
-            success, result_bytes, message = pdf_transformer.merge_pdfs(pdf_bytes_list)
-            if success and result_bytes:
-                ts = int(Path().stat().st_mtime)
-                merged_filename = f"merged_{ts}.pdf"
-                merged_filepath = UPLOAD_TEMP_DIR / merged_filename
-                with open(merged_filepath, "wb") as f:
-                    f.write(result_bytes)
+            merged_filename = f"merged_{ts}.pdf"
+            merged_filepath = UPLOAD_TEMP_DIR / merged_filename
+            success, message = await run_in_process(request.app.state.pdf_module.merge_pdf_files, input_filepaths, str(merged_filepath))
+            if success:
                 dl_link = f"/download/{merged_filename}"
                 return Div(P(f"✅ {message}"), A(f"📄 Baixar PDF Unificado", href=dl_link, target="_blank"), cls="success-message")
             else:
                 return Div(f"❌ Falha na junção: {message}", cls="error-message")
         except Exception as e:
-            log.exception(f"Erro durante junção de PDFs: {e}")
+            log.exception("Erro durante junção de PDFs: %s", e)
             return Div("❌ Erro interno durante o processamento.", cls="error-message")
+        finally:
+            discard_temp_files(*input_filepaths)
 
     @app.route("/pdf-tools/img2pdf", methods=["POST"])
     async def pdf_img2pdf_process(request: Request):
@@ -354,6 +430,10 @@ def register_routes(app):
         if not pdf_transformer:
             return HTMLResponse("Erro: Módulo PDF não inicializado.", status_code=500)
         
+        too_large = _request_too_large(request)
+        if too_large:
+            return too_large
+
         try:
             form_data = await request.form()
             uploaded_files = form_data.getlist("img_files")
@@ -362,23 +442,26 @@ def register_routes(app):
         
         if not uploaded_files:
             return Div("❌ Nenhuma imagem fornecida.", cls="error-message")
+        too_large = _upload_too_large(*uploaded_files)
+        if too_large:
+            return too_large
         
-        img_bytes_list = []
-        filenames = []
+        input_filepaths = []
+        ts = unique_token()
         
         try:
-            for f in uploaded_files:
+            # Gravar cada imagem em disco em blocos; o conversor lê direto dos arquivos
+            for idx, f in enumerate(uploaded_files):
                 if f.filename:
-                    img_bytes_list.append(await f.read())
-                    filenames.append(Path(f.filename).name)
+                    input_filepath = UPLOAD_TEMP_DIR / f"imgin_{ts}_{idx}_{safe_filename(f.filename)}"
+                    input_filepaths.append(await spool_upload(f, input_filepath))
             
-            if not img_bytes_list:
+            if not input_filepaths:
                 return Div("❌ Nenhuma imagem válida fornecida.", cls="error-message")
             
-            ts = int(Path().stat().st_mtime)
             pdf_filename = f"images_{ts}.pdf"
             pdf_filepath = UPLOAD_TEMP_DIR / pdf_filename
-            success, message = pdf_transformer.image_to_pdf(img_bytes_list, str(pdf_filepath))
+            success, message = await run_in_process(request.app.state.pdf_module.image_to_pdf, input_filepaths, str(pdf_filepath))
             
             if success:
                 dl_link = f"/download/{pdf_filename}"
@@ -388,13 +471,15 @@ def register_routes(app):
                     pdf_filepath.unlink()
                 return Div(f"❌ Falha na conversão: {message}", cls="error-message")
         except Exception as e:
-            log.exception(f"Erro durante conversão de imagem para PDF: {e}")
+            log.exception("Erro durante conversão de imagem para PDF: %s", e)
             if 'pdf_filepath' in locals() and pdf_filepath.exists():
                 try:
                     pdf_filepath.unlink()
                 except Exception:
                     pass
             return Div("❌ Erro interno durante o processamento.", cls="error-message")
+        finally:
+            discard_temp_files(*input_filepaths)
 
     @app.route("/pdf-tools/pdf2docx", methods=["POST"])
     async def pdf_pdf2docx_process(request: Request):
@@ -405,6 +490,10 @@ def register_routes(app):
         if not pdf_transformer:
             return HTMLResponse("Erro: Módulo PDF não inicializado.", status_code=500)
         
+        too_large = _request_too_large(request)
+        if too_large:
+            return too_large
+
         try:
             form_data = await request.form()
             uploaded_file = form_data.get("pdf_file")
@@ -414,19 +503,20 @@ def register_routes(app):
         
         if not uploaded_file or not uploaded_file.filename:
             return Div("❌ Nenhum arquivo PDF fornecido.", cls="error-message")
+        too_large = _upload_too_large(uploaded_file)
+        if too_large:
+            return too_large
         
-        input_filename = Path(uploaded_file.filename).name
-        ts = int(Path().stat().st_mtime)
+        input_filename = safe_filename(uploaded_file.filename)
+        ts = unique_token()
         input_filepath = UPLOAD_TEMP_DIR / f"pdfin_{ts}_{input_filename}"
         docx_filename = f"{Path(input_filename).stem}_{ts}.docx"
         docx_filepath = UPLOAD_TEMP_DIR / docx_filename
         
         try:
-            with open(input_filepath, "wb") as buffer:
-                await uploaded_file.seek(0)
-                shutil.copyfileobj(uploaded_file.file, buffer)
+            await spool_upload(uploaded_file, input_filepath)
             
-            success, message = pdf_transformer.pdf_to_docx(str(input_filepath), str(docx_filepath), apply_ocr=apply_ocr)
+            success, message = await run_in_process(request.app.state.pdf_module.pdf_to_docx, str(input_filepath), str(docx_filepath), apply_ocr=apply_ocr)
             if success:
                 dl_link = f"/download/{docx_filename}"
                 css_class = "success-message" if "sucesso" in message.lower() else "warning-message"
@@ -436,7 +526,7 @@ def register_routes(app):
                     docx_filepath.unlink()
                 return Div(f"❌ Falha na conversão: {message}", cls="error-message")
         except Exception as e:
-            log.exception(f"Erro durante conversão de PDF para DOCX: {e}")
+            log.exception("Erro durante conversão de PDF para DOCX: %s", e)
             if 'docx_filepath' in locals() and docx_filepath.exists():
                 try:
                     docx_filepath.unlink()
@@ -444,11 +534,7 @@ def register_routes(app):
                     pass
             return Div("❌ Erro interno durante o processamento.", cls="error-message")
         finally:
-            if 'input_filepath' in locals() and input_filepath.exists():
-                try:
-                    input_filepath.unlink()
-                except OSError as e_unlink:
-                    log.warning(f"Erro ao remover arquivo temporário: {e_unlink}")
+            discard_temp_files(input_filepath)
 
     @app.route("/pdf-tools/pdf2img", methods=["POST"])
     async def pdf_to_img_process(request: Request):
@@ -459,56 +545,56 @@ def register_routes(app):
         if not pdf_transformer:
             return HTMLResponse("Erro: Módulo PDF não inicializado.", status_code=500)
         
+        too_large = _request_too_large(request)
+        if too_large:
+            return too_large
+
         try:
             form_data = await request.form()
             uploaded_file = form_data.get("pdf_file")
-            dpi = int(form_data.get("dpi", "150"))
+            dpi = int(form_data.get("dpi") or "150")
         except Exception as e:
             return Div(f"❌ Erro ao processar formulário: {e}", cls="error-message")
         
+        if not MIN_IMAGE_DPI <= dpi <= MAX_IMAGE_DPI:
+            log.warning("DPI %s fora da faixa permitida; ajustando para %s-%s.", dpi, MIN_IMAGE_DPI, MAX_IMAGE_DPI)
+            dpi = max(MIN_IMAGE_DPI, min(dpi, MAX_IMAGE_DPI))
+        
         if not uploaded_file or not uploaded_file.filename:
             return Div("❌ Nenhum arquivo PDF fornecido.", cls="error-message")
+        too_large = _upload_too_large(uploaded_file)
+        if too_large:
+            return too_large
         
-        input_filename = Path(uploaded_file.filename).name
-        ts = int(Path().stat().st_mtime)
+        input_filename = safe_filename(uploaded_file.filename)
+        ts = unique_token()
         input_filepath = UPLOAD_TEMP_DIR / f"pdfin_{ts}_{input_filename}"
-        output_dir = UPLOAD_TEMP_DIR / f"pdf_images_{ts}"
-        output_dir.mkdir(exist_ok=True)
         zip_filename = f"pdf_images_{ts}.zip"
         zip_filepath = UPLOAD_TEMP_DIR / zip_filename
         
         try:
-            with open(input_filepath, "wb") as buffer:
-                await uploaded_file.seek(0)
-                shutil.copyfileobj(uploaded_file.file, buffer)
+            await spool_upload(uploaded_file, input_filepath)
             
-            image_paths, message = pdf_transformer.pdf_to_image(
-                str(input_filepath), str(output_dir), image_format='png', dpi=dpi
+            # As páginas são renderizadas em memória e gravadas direto no ZIP
+            image_count, message = await run_in_process(
+                request.app.state.pdf_module.pdf_to_image_zip, str(input_filepath), str(zip_filepath), image_format='png', dpi=dpi
             )
             
-            if image_paths and len(image_paths) > 0:
-                success, zip_message = pdf_transformer.create_zip_from_files(image_paths, str(zip_filepath))
-                if success and zip_filepath.exists():
-                    dl_link = f"/download/{zip_filename}"
-                    return Div(
-                        P(f"✅ PDF convertido para {len(image_paths)} imagem(ns)! {message}"),
-                        A(f"📦 Baixar Imagens (ZIP)", href=dl_link, target="_blank"),
-                        cls="success-message"
-                    )
-                else:
-                    return Div(f"❌ Falha ao criar arquivo ZIP: {zip_message}", cls="error-message")
+            if image_count and zip_filepath.exists():
+                dl_link = f"/download/{zip_filename}"
+                return Div(
+                    P(f"✅ PDF convertido para {image_count} imagem(ns)! {message}"),
+                    A(f"📦 Baixar Imagens (ZIP)", href=dl_link, target="_blank"),
+                    cls="success-message"
+                )
             else:
+                discard_temp_files(zip_filepath)
                 return Div(f"❌ Falha ao converter PDF para imagens: {message}", cls="error-message")
         except Exception as e:
-            log.exception(f"Erro durante conversão de PDF para imagens: {e}")
+            log.exception("Erro durante conversão de PDF para imagens: %s", e)
             return Div(f"❌ Erro interno durante a conversão: {str(e)}", cls="error-message")
         finally:
-            # Limpar arquivos temporários
-            if 'input_filepath' in locals() and input_filepath.exists():
-                try:
-                    input_filepath.unlink()
-                except OSError as e_unlink:
-                    log.warning(f"Erro ao remover arquivo temporário: {e_unlink}")
+            discard_temp_files(input_filepath)
 
     @app.route("/pdf-tools/doc2pdf", methods=["POST"])
     async def doc_to_pdf_process(request: Request):
@@ -519,9 +605,13 @@ def register_routes(app):
         if not pdf_transformer:
             return HTMLResponse("Erro: Módulo PDF não inicializado.", status_code=500)
         
-        if not pdf_transformer.libreoffice_path:
+        if not request.app.state.libreoffice_available:
             return Div("❌ LibreOffice não encontrado no servidor. Conversão indisponível.", cls="error-message")
         
+        too_large = _request_too_large(request)
+        if too_large:
+            return too_large
+
         try:
             form_data = await request.form()
             uploaded_file = form_data.get("doc_file")
@@ -530,25 +620,24 @@ def register_routes(app):
         
         if not uploaded_file or not uploaded_file.filename:
             return Div("❌ Nenhum documento fornecido.", cls="error-message")
+        too_large = _upload_too_large(uploaded_file)
+        if too_large:
+            return too_large
         
-        input_filename = Path(uploaded_file.filename).name
+        input_filename = safe_filename(uploaded_file.filename)
         input_ext = Path(input_filename).suffix.lower()
-        allowed_exts = ['.docx', '.doc', '.odt', '.txt']
+        if input_ext not in DOC_EXTENSIONS:
+            return Div(f"❌ Formato não suportado. Use: {DOC_EXTENSIONS_MSG}", cls="error-message")
         
-        if input_ext not in allowed_exts:
-            return Div(f"❌ Formato não suportado. Use: {', '.join(allowed_exts)}", cls="error-message")
-        
-        ts = int(Path().stat().st_mtime)
+        ts = unique_token()
         input_filepath = UPLOAD_TEMP_DIR / f"docin_{ts}_{input_filename}"
         pdf_filename = f"{Path(input_filename).stem}_{ts}.pdf"
         pdf_filepath = UPLOAD_TEMP_DIR / pdf_filename
         
         try:
-            with open(input_filepath, "wb") as buffer:
-                await uploaded_file.seek(0)
-                shutil.copyfileobj(uploaded_file.file, buffer)
+            await spool_upload(uploaded_file, input_filepath)
             
-            success, message = pdf_transformer.document_to_pdf(str(input_filepath), str(pdf_filepath))
+            success, message = await _convert_document_to_pdf(request, pdf_transformer, input_filepath, pdf_filepath)
             
             if success and pdf_filepath.exists():
                 dl_link = f"/download/{pdf_filename}"
@@ -560,14 +649,10 @@ def register_routes(app):
             else:
                 return Div(f"❌ Falha na conversão: {message}", cls="error-message")
         except Exception as e:
-            log.exception(f"Erro durante conversão de documento para PDF: {e}")
+            log.exception("Erro durante conversão de documento para PDF: %s", e)
             return Div("❌ Erro interno durante o processamento.", cls="error-message")
         finally:
-            if 'input_filepath' in locals() and input_filepath.exists():
-                try:
-                    input_filepath.unlink()
-                except OSError as e:
-                    log.warning(f"Erro ao remover arquivo temporário: {e}")
+            discard_temp_files(input_filepath)
 
     @app.route("/pdf-tools/sheet2pdf", methods=["POST"])
     async def sheet_to_pdf_process(request: Request):
@@ -578,9 +663,13 @@ def register_routes(app):
         if not pdf_transformer:
             return HTMLResponse("Erro: Módulo PDF não inicializado.", status_code=500)
         
-        if not pdf_transformer.libreoffice_path:
+        if not request.app.state.libreoffice_available:
             return Div("❌ LibreOffice não encontrado no servidor. Conversão indisponível.", cls="error-message")
         
+        too_large = _request_too_large(request)
+        if too_large:
+            return too_large
+
         try:
             form_data = await request.form()
             uploaded_file = form_data.get("sheet_file")
@@ -589,26 +678,25 @@ def register_routes(app):
         
         if not uploaded_file or not uploaded_file.filename:
             return Div("❌ Nenhuma planilha fornecida.", cls="error-message")
+        too_large = _upload_too_large(uploaded_file)
+        if too_large:
+            return too_large
         
-        input_filename = Path(uploaded_file.filename).name
+        input_filename = safe_filename(uploaded_file.filename)
         input_ext = Path(input_filename).suffix.lower()
-        allowed_exts = ['.xlsx', '.csv', '.ods']
+        if input_ext not in SHEET_EXTENSIONS:
+            return Div(f"❌ Formato não suportado. Use: {SHEET_EXTENSIONS_MSG}", cls="error-message")
         
-        if input_ext not in allowed_exts:
-            return Div(f"❌ Formato não suportado. Use: {', '.join(allowed_exts)}", cls="error-message")
-        
-        ts = int(Path().stat().st_mtime)
+        ts = unique_token()
         input_filepath = UPLOAD_TEMP_DIR / f"sheetin_{ts}_{input_filename}"
         pdf_filename = f"{Path(input_filename).stem}_{ts}.pdf"
         pdf_filepath = UPLOAD_TEMP_DIR / pdf_filename
         
         try:
-            with open(input_filepath, "wb") as buffer:
-                await uploaded_file.seek(0)
-                shutil.copyfileobj(uploaded_file.file, buffer)
+            await spool_upload(uploaded_file, input_filepath)
             
             # Usa a mesma função do documento para PDF
-            success, message = pdf_transformer.document_to_pdf(str(input_filepath), str(pdf_filepath))
+            success, message = await _convert_document_to_pdf(request, pdf_transformer, input_filepath, pdf_filepath)
             
             if success and pdf_filepath.exists():
                 dl_link = f"/download/{pdf_filename}"
@@ -627,14 +715,10 @@ def register_routes(app):
                     cls="error-message"
                 )
         except Exception as e:
-            log.exception(f"Erro durante conversão de planilha para PDF: {e}")
+            log.exception("Erro durante conversão de planilha para PDF: %s", e)
             return Div("❌ Erro interno durante o processamento.", cls="error-message")
         finally:
-            if 'input_filepath' in locals() and input_filepath.exists():
-                try:
-                    input_filepath.unlink()
-                except OSError as e:
-                    log.warning(f"Erro ao remover arquivo temporário: {e}")
+            discard_temp_files(input_filepath)
 
     @app.route("/pdf-tools/ocr", methods=["POST"])
     async def pdf_ocr_process(request: Request):
@@ -644,9 +728,13 @@ def register_routes(app):
         if not pdf_transformer:
             return HTMLResponse("Erro: Módulo PDF não inicializado.", status_code=500)
         
-        if not pdf_transformer.ocrmypdf_installed:
+        if not request.app.state.ocr_available:
             return Div("❌ OCRmyPDF não encontrado no servidor. OCR indisponível.", cls="error-message")
         
+        too_large = _request_too_large(request)
+        if too_large:
+            return too_large
+
         try:
             form_data = await request.form()
             uploaded_file = form_data.get("pdf_file")
@@ -656,74 +744,44 @@ def register_routes(app):
         
         if not uploaded_file or not uploaded_file.filename:
             return Div("❌ Nenhum arquivo PDF fornecido.", cls="error-message")
+        too_large = _upload_too_large(uploaded_file)
+        if too_large:
+            return too_large
         
-        # Ler os bytes do arquivo fora do semáforo
-        pdf_bytes = await uploaded_file.read()
-        original_filename = Path(uploaded_file.filename).name
-        ts = int(Path().stat().st_mtime)
+        original_filename = safe_filename(uploaded_file.filename)
+        ts = unique_token()
+        input_filepath = UPLOAD_TEMP_DIR / f"pdfin_{ts}_{original_filename}"
         ocr_filename = f"ocr_{ts}_{original_filename}"
+        ocr_filepath = UPLOAD_TEMP_DIR / ocr_filename
         
         try:
+            # Gravar o upload em disco fora do semáforo, sem carregar o PDF na memória
+            await spool_upload(uploaded_file, input_filepath)
+            
             # Usar o semáforo para limitar processamentos simultâneos
             async with pdf_processing_semaphore:
-                log.info(f"Iniciando OCR para {original_filename}")
-                success, processed_bytes, message = pdf_transformer.process_compression_ocr(
-                    pdf_bytes, 
+                log.info("Iniciando OCR para %s", original_filename)
+                success, message = await run_in_process(
+                    request.app.state.pdf_module.process_compression_ocr_file,
+                    str(input_filepath),
+                    str(ocr_filepath),
                     compression_level=-1,  # -1 significa pular compressão
                     apply_ocr=True,
                     ocr_language=language
                 )
             
             # Código após a liberação do semáforo
-            if success and processed_bytes:
-                # Salvar o arquivo OCR para download
-                ocr_filepath = UPLOAD_TEMP_DIR / ocr_filename
-                with open(ocr_filepath, "wb") as f:
-                    f.write(processed_bytes)
-                
+            if success and ocr_filepath.exists():
                 dl_link = f"/download/{ocr_filename}"
                 return Div(
-                    P(f"✅ OCR aplicado com sucesso! O PDF agora é pesquisável."),
+                    P(f"✅ {message}"),
                     A(f"📄 Baixar PDF com OCR", href=dl_link, target="_blank"),
                     cls="success-message"
                 )
             else:
                 return Div(f"❌ Falha ao aplicar OCR: {message}", cls="error-message")
         except Exception as e:
-            log.exception(f"Erro ao aplicar OCR: {e}")
+            log.exception("Erro ao aplicar OCR: %s", e)
             return Div(f"❌ Erro interno: {str(e)}", cls="error-message")
-        
-    
-    # A rota de download pode ficar neste arquivo ou ser movida para um utils/file_utils.py
-    @app.route("/download/{filename:path}", methods=["GET"])
-    async def download_file(filename: str):
-        """Processa solicitações de download para arquivos processados"""
-        try:
-            safe_filename = Path(filename).name
-            if not safe_filename or ".." in safe_filename:
-                raise ValueError("Nome de arquivo inválido")
-            
-            file_path = UPLOAD_TEMP_DIR / safe_filename
-            if file_path.is_file():
-                log.info(f"Servindo download: {safe_filename}")
-                
-                # Determinar o tipo de mídia apropriado
-                media_type = 'application/octet-stream'
-                ext = safe_filename.lower().split('.')[-1]
-                if ext == 'pdf':
-                    media_type = 'application/pdf'
-                elif ext == 'zip':
-                    media_type = 'application/zip'
-                elif ext == 'docx':
-                    media_type = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-                elif ext == 'txt':
-                    media_type = 'text/plain'
-                elif ext == 'mp3':
-                    media_type = 'audio/mpeg'
-                
-                return FileResponse(file_path, filename=safe_filename, media_type=media_type)
-            else:
-                return HTMLResponse("Arquivo não encontrado.", status_code=404)
-        except Exception as e:
-            log.error(f"Erro ao processar download de {filename}: {e}")
-            return HTMLResponse("Erro ao processar download.", status_code=500)
\ No newline at end of file
+        finally:
+            discard_temp_files(input_filepath)
@@ -1,15 +1,22 @@
 # routes/transcriber.py
 
 import asyncio
+import functools
 from fasthtml.common import *
 from starlette.requests import Request
 from pathlib import Path
-import shutil
 import tempfile
 import logging
 import os
+import re
+import json
+from concurrent.futures import ThreadPoolExecutor
+from starlette.responses import StreamingResponse
 
-from components.layout import page_layout
+from components.layout import render_page
+from utils.http_cache import render_static_html, cached_html_response
+from utils.file_utils import discard_temp_files, keep_temp_files_alive, safe_filename, spool_upload, unique_token
+from utils.static_files import static_url
 
 # Configuração de logging
 log = logging.getLogger(__name__)
@@ -21,168 +28,190 @@ UPLOAD_TEMP_DIR.mkdir(exist_ok=True)
 # Ajuste o valor '2' conforme necessário para seu hardware
 audio_transcription_semaphore = asyncio.Semaphore(2)
 
-# Referências para funções e objetos importados dos módulos
-# Serão definidas ao registrar as rotas
-whisper_model = None
-transcribe_audio_file = None
-text_corrector = None
+# O modelo Whisper não é thread-safe: todas as transcrições passam por uma única thread
+# (os kernels do PyTorch liberam o GIL, então o event loop continua livre)
+whisper_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="whisper")
 
-def register_routes(app):
-    """Registra todas as rotas relacionadas à transcrição de áudio"""
+# Progresso das transcrições: um arquivo JSON por job em UPLOAD_TEMP_DIR.
+# O stream SSE pode cair em outro worker do uvicorn, por isso o estado não fica em memória.
+PROGRESS_POLL_INTERVAL = 1.0
+_JOB_ID_RE = re.compile(r"^[0-9a-f]+_[0-9a-f]+$")
 
-    @app.route("/audio-transcriber", methods=["GET"])
-    def audio_transcriber_page(request: Request):
-        """Página do transcritor de áudio"""
-        
-        # Estilo para o loader
-        loader_style = Style("""
-            #audio-loading {
-                display: none;
-                margin-top: 1rem;
-                padding: 1rem;
-                background-color: #e9f5ff;
-                border-radius: 5px;
-                text-align: center;
-                border: 1px solid #b8daff;
-            }
-            
-            .loader-spinner {
-                display: inline-block;
-                width: 20px;
-                height: 20px;
-                border: 3px solid rgba(0, 123, 255, 0.3);
-                border-radius: 50%;
-                border-top-color: #007bff;
-                animation: spin 1s ease-in-out infinite;
-                margin-right: 10px;
-                vertical-align: middle;
-            }
-            
-            @keyframes spin {
-                to { transform: rotate(360deg); }
-            }
+# Etapas exibidas ao usuário
+STAGE_QUEUED = "Aguardando vaga para transcrição..."
+STAGE_TRANSCRIBING = "Transcrevendo áudio com Whisper <span class='transcription-step'>(Etapa 1/2)</span>..."
+STAGE_REFINING = "Refinando transcrição com IA <span class='transcription-step'>(Etapa 2/2)</span>..."
+
+# Referência forte às tarefas em background (evita coleta pelo GC antes do fim)
+_transcription_tasks = set()
+
+def _progress_path(job_id: str) -> Path:
+    """Arquivo de estado do job de transcrição"""
+    return UPLOAD_TEMP_DIR / f"transcription_{job_id}.json"
+
+def _write_progress(job_id: str, event: str, data: str) -> None:
+    """Grava o estado do job de forma atômica (o leitor nunca vê um JSON pela metade)"""
+    path = _progress_path(job_id)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps({"event": event, "data": data}), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+def _read_progress(job_id: str):
+    """Lê o estado do job; None se não existir (expirado ou desconhecido)"""
+    try:
+        return json.loads(_progress_path(job_id).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+async def _set_progress(job_id: str, event: str, data: str) -> None:
+    """Publica uma etapa (ou o resultado) do job sem bloquear o event loop"""
+    await asyncio.to_thread(_write_progress, job_id, event, data)
+
+def _sse_message(event: str, data: str) -> str:
+    """Formata um evento Server-Sent Events (dados com várias linhas viram várias linhas data:)"""
+    lines = "".join(f"data: {line}\n" for line in (data.splitlines() or [""]))
+    return f"event: {event}\n{lines}\n"
+
+async def _run_transcription(state, job_id: str, in_p: Path, in_f: str) -> None:
+    """
+    Executa a transcrição (e o refinamento) em background, publicando cada etapa.
+    O resultado final (HTML) é publicado como evento "done".
+    
+    Args:
+        state: app.state com o modelo Whisper e o corretor de texto
+        job_id (str): Identificador do job
+        in_p (Path): Arquivo de áudio já salvo em disco
+        in_f (str): Nome do arquivo (para log)
+    """
+    # A espera na fila (semáforo e thread do Whisper) pode passar da idade máxima da limpeza
+    # periódica: o áudio e o arquivo de progresso são mantidos enquanto o job não termina
+    async with keep_temp_files_alive(in_p, _progress_path(job_id)):
+        try:
+            # Adquirir o semáforo antes de iniciar a transcrição
+            # Isso limita o número de transcrições simultâneas
+            async with audio_transcription_semaphore:
+                log.info("Iniciando transcrição do arquivo: %s", in_f)
+                await _set_progress(job_id, "stage", STAGE_TRANSCRIBING)
+                # Transcrever o áudio usando o modelo Whisper
+                loop = asyncio.get_running_loop()
+                ok, msg, raw_txt = await loop.run_in_executor(
+                    whisper_executor, functools.partial(state.transcribe_audio_file, str(in_p), model=state.whisper_model)
+                )
             
-            .transcription-step {
-                color: #0066cc;
-                font-weight: bold;
-            }
-        """)
+                # Tentar refinar a transcrição com o corretor de texto
+                corr_txt = None
+                corr_msg = P()
+                if ok and state.text_corrector_configured:
+                    await _set_progress(job_id, "stage", STAGE_REFINING)
+                    corr_txt = await asyncio.to_thread(state.text_corrector.correct_transcription, raw_txt)
+                    if corr_txt is None:
+                        corr_msg = P("⚠️ Falha ao refinar a transcrição.", style="font-style:italic; color:orange;")
+                else:
+                    corr_msg = P("ℹ️ Refinamento com IA não disponível.", style="font-style:italic;")
         
-        # JavaScript para gerenciar o loader
-        loader_script = Script("""
-        document.addEventListener('DOMContentLoaded', function() {
-            const form = document.getElementById('audio-form');
-            const loadingIndicator = document.getElementById('audio-loading');
-            const resultArea = document.getElementById('a-result');
-            let processingStarted = false;
-            let processingStepTimer;
-            const processingSteps = [
-                "Carregando arquivo de áudio...",
-                "Preparando para transcrição...",
-                "Processando áudio com Whisper...",
-                "Transcrevendo áudio <span class='transcription-step'>(Etapa 1/2)</span>...",
-                "Refinando transcrição com IA <span class='transcription-step'>(Etapa 2/2)</span>..."
-            ];
-            let currentStep = 0;
-            
-            function updateProcessingMessage() {
-                const messageElement = document.getElementById('processing-message');
-                if (messageElement && processingStarted) {
-                    messageElement.innerHTML = processingSteps[currentStep];
-                    currentStep = (currentStep + 1) % processingSteps.length;
-                }
-            }
+            # Este código executa após liberação do semáforo
+            if not ok:
+                result = Div(f"❌ Falha na transcrição: {msg}", cls="error-message")
+            else:
+                # Montar o resultado
+                res = [
+                    H3("Transcrição Original:"), 
+                    Textarea(raw_txt or " ", readonly=True, rows=8, style="margin-bottom:1rem;")
+                ]
             
-            if (form) {
-                form.addEventListener('submit', function() {
-                    if (loadingIndicator) {
-                        loadingIndicator.style.display = 'block';
-                        processingStarted = true;
-                        currentStep = 0;
-                        updateProcessingMessage();
-                        processingStepTimer = setInterval(updateProcessingMessage, 5000); // Atualizar a cada 5 segundos
-                    }
-                    if (resultArea) {
-                        resultArea.innerHTML = '';
-                    }
-                });
-            }
+                # Adicionar a versão refinada se disponível
+                if corr_txt is not None:
+                    res.extend([
+                        H3("Transcrição Refinada:"), 
+                        Textarea(corr_txt, readonly=True, rows=8)
+                    ])
             
-            // Eventos HTMX para mostrar/esconder o loader
-            document.body.addEventListener('htmx:beforeRequest', function(event) {
-                if (event.detail.target && event.detail.target.id === 'a-result') {
-                    if (loadingIndicator) {
-                        loadingIndicator.style.display = 'block';
-                        processingStarted = true;
-                        currentStep = 0;
-                        updateProcessingMessage();
-                        processingStepTimer = setInterval(updateProcessingMessage, 5000);
-                    }
-                }
-            });
+                res.append(corr_msg)
+                result = Div(*res, cls="success-message")
             
-            document.body.addEventListener('htmx:afterRequest', function(event) {
-                if (loadingIndicator) {
-                    loadingIndicator.style.display = 'none';
-                    processingStarted = false;
-                    clearInterval(processingStepTimer);
-                }
-            });
-        });
-        """)
-
-        # Verificar status do modelo Whisper
-        whisper_model_loaded = request.app.state.whisper_model is not None
-        whisper_status = P("✅ Modelo de transcrição está pronto.", style="color: green; font-weight: bold;")
-        if not whisper_model_loaded:
-            whisper_status = P(
-                "⚠️ O modelo Whisper não foi carregado. A transcrição pode não funcionar corretamente.", 
-                style="color: #856404; background-color: #fff3cd; padding: 10px; border-radius: 5px; border: 1px solid #ffeeba;"
-            )
-
-        # Formulário de upload de áudio
-        form = Form(
-            Label("Carregar Arquivo de Áudio:", fr="af"), 
-            Input(type="file", id="af", name="audio_file", accept="audio/*", required=True),
-            P("Os formatos suportados incluem MP3, WAV, M4A, OGG, etc.", 
-              style="font-size: 0.85rem; color: #666; margin-top: 0.25rem;"),
-            Button("Transcrever Áudio", type="submit"), 
-            hx_post="/audio-transcriber/process", 
-            hx_target="#a-result", 
-            hx_encoding="multipart/form-data",
-            id="audio-form"
-        )
+        except Exception as e:
+            log.exception("Erro durante transcrição de áudio: %s", e)
+            result = Div("❌ Erro interno durante o processamento.", cls="error-message")
+        finally:
+            # Limpar o arquivo temporário de entrada
+            discard_temp_files(in_p)
+    
+    await _set_progress(job_id, "done", to_xml(result))
+
+def _build_audio_transcriber_page(available: bool) -> str:
+    """
+    Página do transcritor de áudio, renderizada uma única vez por estado de disponibilidade.
+    
+    Args:
+        available (bool): Se o modelo Whisper foi carregado
         
-        return page_layout(
-            "Transcritor de Áudio", 
-            Main(
-                A("← Voltar", href="/", cls="back-button", 
-                  style="background-color: #2196F3 !important; color: white !important; border: none !important;"), 
-                H1("🎤 Transcritor de Áudio"), 
-                P("Carregue um arquivo de áudio para transcrevê-lo automaticamente. A transcrição pode levar alguns minutos dependendo do tamanho do arquivo."),
-                whisper_status,
-                loader_style,
-                loader_script,
-                form,
-                Div(id="a-result", cls="result-area"),
-                # Loader melhorado
-                Div(
-                    Div(cls="loader-spinner"), 
-                    Span("Carregando arquivo de áudio...", id="processing-message"),
-                    P("Transcrições de áudio podem levar alguns minutos. Por favor, aguarde.", 
-                      style="font-size: 0.85rem; margin-top: 0.5rem;"),
-                    id="audio-loading"
-                ),
-                cls="container"
-            )
+    Returns:
+        str: O HTML completo da página
+    """
+    # Verificar status do modelo Whisper
+    whisper_model_loaded = available
+    whisper_status = P("✅ Modelo de transcrição está pronto.", style="color: green; font-weight: bold;")
+    if not whisper_model_loaded:
+        whisper_status = P(
+            "⚠️ O modelo Whisper não foi carregado. A transcrição pode não funcionar corretamente.", 
+            style="color: #856404; background-color: #fff3cd; padding: 10px; border-radius: 5px; border: 1px solid #ffeeba;"
         )
 
+    # Formulário de upload de áudio
+    form = Form(
+        Label("Carregar Arquivo de Áudio:", fr="af"), 
+        Input(type="file", id="af", name="audio_file", accept="audio/*", required=True),
+        P("Os formatos suportados incluem MP3, WAV, M4A, OGG, etc.", 
+          style="font-size: 0.85rem; color: #666; margin-top: 0.25rem;"),
+        Button("Transcrever Áudio", type="submit"), 
+        hx_post="/audio-transcriber/process", 
+        hx_target="#a-result", 
+        hx_encoding="multipart/form-data",
+        id="audio-form"
+    )
+
+    return render_page(
+        "Transcritor de Áudio", 
+        Main(
+            A("← Voltar", href="/", cls="back-button", 
+              style="background-color: #2196F3 !important; color: white !important; border: none !important;"), 
+            H1("🎤 Transcritor de Áudio"), 
+            P("Carregue um arquivo de áudio para transcrevê-lo automaticamente. A transcrição pode levar alguns minutos dependendo do tamanho do arquivo."),
+            whisper_status,
+            form,
+            Div(id="a-result", cls="result-area"),
+            # Loader melhorado
+            Div(
+                Div(cls="loader-spinner"), 
+                Span("Enviando arquivo de áudio..."),
+                P("Transcrições de áudio podem levar alguns minutos. Por favor, aguarde.", 
+                  style="font-size: 0.85rem; margin-top: 0.5rem;"),
+                id="audio-loading",
+                cls="loading-indicator",
+                data_loader_for="a-result"
+            ),
+            Script(src=static_url("transcriber.js"), defer=True),
+            cls="container"
+        )
+    )
+
+# A página só muda conforme o componente esteja disponível: as duas variantes são pré-renderizadas
+_AUDIO_TRANSCRIBER_PAGES = {available: render_static_html(_build_audio_transcriber_page(available)) for available in (True, False)}
+
+def register_routes(app):
+    """Registra todas as rotas relacionadas à transcrição de áudio"""
+
+    @app.route("/audio-transcriber", methods=["GET"])
+    def audio_transcriber_page(request: Request):
+        """Página do transcritor de áudio"""
+        page_html, page_etag = _AUDIO_TRANSCRIBER_PAGES[request.app.state.whisper_model is not None]
+        return cached_html_response(request, page_html, page_etag)
+
     @app.route("/audio-transcriber/process", methods=["POST"])
     async def audio_transcriber_process(request: Request):
         # Obtenha os recursos do estado da aplicação
         whisper_model = request.app.state.whisper_model
         transcribe_audio_file = request.app.state.transcribe_audio_file
-        text_corrector = request.app.state.text_corrector
         
         if not whisper_model or not transcribe_audio_file:
             return Div("❌ Erro: Transcrição indisponível. O modelo Whisper não foi carregado.", cls="error-message")
@@ -196,60 +225,57 @@ def register_routes(app):
         if not up_file or not up_file.filename:
             return Div("❌ Nenhum arquivo de áudio selecionado.", cls="error-message")
         
-        ts = int(Path().stat().st_mtime)
-        in_f = Path(up_file.filename).name
+        ts = unique_token()
+        in_f = safe_filename(up_file.filename)
         in_p = UPLOAD_TEMP_DIR / f"audin_{ts}_{in_f}"
         
-        # Salvar o arquivo primeiro (fora do semáforo para não bloquear)
-        with open(in_p, "wb") as b:
-            await up_file.seek(0)
-            shutil.copyfileobj(up_file.file, b)
-        
         try:
-            # Adquirir o semáforo antes de iniciar a transcrição
-            # Isso limita o número de transcrições simultâneas
-            async with audio_transcription_semaphore:
-                log.info(f"Iniciando transcrição do arquivo: {in_f}")
-                # Transcrever o áudio usando o modelo Whisper
-                ok, msg, raw_txt = transcribe_audio_file(str(in_p), model=whisper_model)
-                
-                # Tentar refinar a transcrição com o corretor de texto
-                corr_txt = None
-                corr_msg = P()
-                if ok and text_corrector and text_corrector.is_configured():
-                    corr_txt = text_corrector.correct_transcription(raw_txt)
-                    if corr_txt is None:
-                        corr_msg = P("⚠️ Falha ao refinar a transcrição.", style="font-style:italic; color:orange;")
-                else:
-                    corr_msg = P("ℹ️ Refinamento com IA não disponível.", style="font-style:italic;")
-            
-            # Este código executa após liberação do semáforo
-            if not ok:
-                return Div(f"❌ Falha na transcrição: {msg}", cls="error-message")
-            
-            # Montar o resultado
-            res = [
-                H3("Transcrição Original:"), 
-                Textarea(raw_txt or " ", readonly=True, rows=8, style="margin-bottom:1rem;")
-            ]
-            
-            # Adicionar a versão refinada se disponível
-            if corr_txt is not None:
-                res.extend([
-                    H3("Transcrição Refinada:"), 
-                    Textarea(corr_txt, readonly=True, rows=8)
-                ])
-            
-            res.append(corr_msg)
-            return Div(*res, cls="success-message")
-                
+            await spool_upload(up_file, in_p)
+            await _set_progress(ts, "stage", STAGE_QUEUED)
         except Exception as e:
-            log.exception(f"Erro durante transcrição de áudio: {e}")
+            log.exception("Erro ao salvar arquivo de áudio: %s", e)
+            discard_temp_files(in_p)
             return Div("❌ Erro interno durante o processamento.", cls="error-message")
-        finally:
-            # Limpar o arquivo temporário de entrada
-            if 'in_p' in locals() and in_p.exists():
-                try:
-                    in_p.unlink()
-                except OSError as e:
-                    log.warning(f"Erro ao remover arquivo temporário: {e}")
\ No newline at end of file
+        
+        # A transcrição segue em background; o cliente acompanha as etapas pelo stream SSE
+        task = asyncio.create_task(_run_transcription(request.app.state, ts, in_p, in_f))
+        _transcription_tasks.add(task)
+        task.add_done_callback(_transcription_tasks.discard)
+        
+        return Div(
+            Div(cls="loader-spinner"), 
+            Span(NotStr(STAGE_QUEUED), cls="progress-message"),
+            P("Transcrições de áudio podem levar alguns minutos. Por favor, aguarde.", 
+              style="font-size: 0.85rem; margin-top: 0.5rem;"),
+            cls="loading-indicator",
+            style="display: block;",
+            data_progress_url=f"/audio-transcriber/progress/{ts}"
+        )
+
+    @app.route("/audio-transcriber/progress/{job_id}", methods=["GET"])
+    async def audio_transcriber_progress(request: Request, job_id: str):
+        """Stream SSE com as etapas da transcrição e, ao final, o HTML do resultado"""
+        if not _JOB_ID_RE.match(job_id):
+            return HTMLResponse("Job inválido.", status_code=400)
+        
+        async def event_stream():
+            last_state = None
+            while not await request.is_disconnected():
+                state = await asyncio.to_thread(_read_progress, job_id)
+                if state is None:
+                    expired = Div("❌ Transcrição não encontrada ou expirada. Envie o arquivo novamente.", cls="error-message")
+                    yield _sse_message("done", to_xml(expired))
+                    return
+                if state != last_state:
+                    last_state = state
+                    yield _sse_message(state["event"], state["data"])
+                    if state["event"] == "done":
+                        discard_temp_files(_progress_path(job_id))
+                        return
+                await asyncio.sleep(PROGRESS_POLL_INTERVAL)
+        
+        return StreamingResponse(
+            event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
@@ -0,0 +1,45 @@
+# scripts/fetch_vendor.py
+"""
+Baixa as bibliotecas de terceiros usadas pelas páginas para static/vendor/,
+para que sejam servidas pelo próprio servidor (com cache e pré-compressão)
+em vez de CDNs externos.
+
+Uso: python scripts/fetch_vendor.py
+"""
+
+import sys
+import urllib.request
+from pathlib import Path
+
+VENDOR_DIR = Path(__file__).resolve().parent.parent / "static" / "vendor"
+
+# Arquivo local -> URL de origem (versões fixadas)
+VENDOR_FILES = {
+    "htmx-1.9.10.min.js": "https://unpkg.com/htmx.org@1.9.10/dist/htmx.min.js",
+}
+
+def fetch_vendor_files() -> bool:
+    """
+    Baixa os arquivos de VENDOR_FILES que ainda não existem em static/vendor/.
+
+    Returns:
+        bool: True se todos os arquivos estão disponíveis localmente
+    """
+    VENDOR_DIR.mkdir(parents=True, exist_ok=True)
+    ok = True
+    for filename, url in VENDOR_FILES.items():
+        target = VENDOR_DIR / filename
+        if target.exists():
+            print(f"[ok] {filename}")
+            continue
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                target.write_bytes(response.read())
+            print(f"[baixado] {filename} <- {url}")
+        except Exception as e:
+            print(f"[erro] {filename}: {e}", file=sys.stderr)
+            ok = False
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if fetch_vendor_files() else 1)
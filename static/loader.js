@@ -0,0 +1,47 @@
+// Indicadores de carregamento compartilhados entre as páginas das ferramentas.
+//
+// <div class="loading-indicator" data-loader-for="result-area"> é exibido enquanto
+// houver uma requisição HTMX cujo alvo seja #result-area; o alvo é limpo antes do envio.
+// Elementos com data-clear-on-change="result-area" limpam o alvo indicado ao mudar.
+document.addEventListener('DOMContentLoaded', function() {
+    function loaderFor(target) {
+        if (!target || !target.id) {
+            return null;
+        }
+        return document.querySelector('.loading-indicator[data-loader-for="' + target.id + '"]');
+    }
+
+    // Eventos HTMX para mostrar/esconder o loader
+    document.body.addEventListener('htmx:beforeRequest', function(event) {
+        const loadingIndicator = loaderFor(event.detail.target);
+        if (loadingIndicator) {
+            loadingIndicator.style.display = 'block';
+            event.detail.target.innerHTML = '';
+        }
+    });
+
+    document.body.addEventListener('htmx:afterRequest', function(event) {
+        const loadingIndicator = loaderFor(event.detail.target);
+        if (loadingIndicator) {
+            loadingIndicator.style.display = 'none';
+        }
+    });
+
+    // Respostas 413 (arquivo muito grande) trazem a mensagem de erro: exibi-las no alvo
+    document.body.addEventListener('htmx:beforeSwap', function(event) {
+        if (event.detail.xhr.status === 413) {
+            event.detail.shouldSwap = true;
+            event.detail.isError = false;
+        }
+    });
+
+    // Limpar resultados anteriores quando o usuário troca de operação
+    document.querySelectorAll('[data-clear-on-change]').forEach(function(element) {
+        element.addEventListener('change', function() {
+            const resultArea = document.getElementById(element.dataset.clearOnChange);
+            if (resultArea) {
+                resultArea.innerHTML = '';
+            }
+        });
+    });
+});
@@ -0,0 +1,248 @@
+// Calculadora de prescrição disciplinar: suspensões, tooltips e validação do formulário
+document.addEventListener('DOMContentLoaded', function() {
+    // Variáveis globais para armazenar as suspensões
+    let suspensionsList = [];
+    const suspList = document.getElementById('suspensions-list');
+    const suspStartInput = document.getElementById('susp-start');
+    const suspEndInput = document.getElementById('susp-end');
+    const addSuspButton = document.getElementById('add-suspension');
+    const removeSuspButton = document.getElementById('remove-suspension');
+    const suspSection = document.getElementById('suspension-section');
+    const suspCheckbox = document.getElementById('has-suspension');
+    const calculatorForm = document.getElementById('calculator-form');
+
+    const natureSelect = document.getElementById('natureza');
+    const knowledgeDate = document.getElementById('conhecimento-date');
+    const instDate = document.getElementById('instauracao-date');
+
+    // Elementos de erro de cada campo, buscados uma única vez
+    const errorElements = new Map();
+
+    function getErrorElement(element) {
+        if (!errorElements.has(element.id)) {
+            errorElements.set(element.id, document.getElementById(`${element.id}-error`));
+        }
+        return errorElements.get(element.id);
+    }
+
+    // Mostrar mensagens de erro de validação (só escreve no DOM se algo mudou)
+    function showValidationError(element, message) {
+        const errorElement = getErrorElement(element);
+        if (errorElement) {
+            if (errorElement.textContent !== message) {
+                errorElement.textContent = message;
+            }
+            errorElement.classList.remove('hidden');
+        }
+    }
+
+    // Esconder mensagens de erro de validação
+    function hideValidationError(element) {
+        const errorElement = getErrorElement(element);
+        if (errorElement) {
+            errorElement.classList.add('hidden');
+        }
+    }
+
+    // Formatar data para exibição
+    function formatDate(dateStr) {
+        const date = new Date(dateStr);
+        return date.toLocaleDateString('pt-BR');
+    }
+
+    // Adicionar suspensão à lista
+    function addSuspension() {
+        const startDate = suspStartInput.value;
+        const endDate = suspEndInput.value;
+
+        if (!startDate || !endDate) {
+            showValidationError(suspStartInput, 'Por favor, preencha as datas de início e fim da suspensão.');
+            return;
+        }
+
+        if (new Date(endDate) < new Date(startDate)) {
+            showValidationError(suspEndInput, 'A data de fim da suspensão deve ser igual ou posterior à data de início.');
+            return;
+        }
+
+        // Verificar relação com a data de instauração
+        const instDate = document.getElementById('instauracao-date').value;
+        if (instDate && new Date(startDate) < new Date(instDate)) {
+            showValidationError(suspStartInput, 'A suspensão não pode começar antes da Data de Instauração.');
+            return;
+        }
+
+        // Adicionar à lista (um único nó novo no DOM)
+        const suspension = {start: startDate, end: endDate};
+        suspensionsList.push(suspension);
+        suspList.appendChild(createSuspensionItem(suspension));
+        updateSuspensionsState();
+
+        // Limpar campos e erros
+        suspStartInput.value = '';
+        suspEndInput.value = '';
+        hideValidationError(suspStartInput);
+        hideValidationError(suspEndInput);
+    }
+
+    // Remover última suspensão
+    function removeLastSuspension() {
+        if (suspensionsList.length > 0) {
+            suspensionsList.pop();
+            suspList.lastElementChild.remove();
+            updateSuspensionsState();
+        } else {
+            showValidationError(document.getElementById('suspensions-list'), 'Não há períodos de suspensão para remover.');
+        }
+    }
+
+    // Item visual de um período de suspensão
+    function createSuspensionItem(susp) {
+        const suspItem = document.createElement('div');
+        suspItem.className = 'suspension-item';
+        suspItem.innerHTML = `
+            <span class="suspension-dates-text">
+                ${formatDate(susp.start)} até ${formatDate(susp.end)}
+            </span>
+        `;
+        return suspItem;
+    }
+
+    // Atualizar o campo oculto e o botão remover (a lista visual é ajustada item a item)
+    const suspensionsData = document.getElementById('suspensions-data');
+
+    function updateSuspensionsState() {
+        suspensionsData.value = JSON.stringify(suspensionsList);
+        removeSuspButton.classList.toggle('hidden', suspensionsList.length === 0);
+    }
+
+    // Mostrar/ocultar seção de suspensão
+    function toggleSuspensionSection() {
+        suspSection.classList.toggle('hidden', !suspCheckbox.checked);
+        if (!suspCheckbox.checked) {
+            // Limpar suspensões se a seção for ocultada
+            suspensionsList = [];
+            suspList.replaceChildren();
+            updateSuspensionsState();
+        }
+    }
+
+    // Validação de campos (sem mover o foco: só o envio do formulário leva ao campo inválido)
+    function validateField(field, errorMessage) {
+        if (!field.value) {
+            showValidationError(field, errorMessage);
+            return false;
+        }
+        hideValidationError(field);
+        return true;
+    }
+
+    // Validar relação entre datas (memoizado: as datas só são comparadas se mudaram)
+    let lastDatePair = null;
+    let lastDateRelationValid = true;
+
+    function validateDateRelation() {
+        const datePair = knowledgeDate.value + '|' + instDate.value;
+        if (datePair !== lastDatePair) {
+            lastDatePair = datePair;
+            // Valores de input[type=date] (AAAA-MM-DD) se comparam corretamente como texto
+            lastDateRelationValid = !(knowledgeDate.value && instDate.value && instDate.value < knowledgeDate.value);
+        }
+
+        if (!lastDateRelationValid) {
+            showValidationError(instDate, 'A Data de Instauração não pode ser anterior à Data de Conhecimento do fato.');
+            return false;
+        }
+        hideValidationError(instDate);
+        return true;
+    }
+
+    // Validação no blur com debounce: ao percorrer o formulário com Tab,
+    // só o campo em que o usuário para é validado
+    const BLUR_VALIDATION_DELAY = 100;
+
+    function validateOnBlur(field, validate) {
+        let timer = null;
+        field.addEventListener('blur', function() {
+            clearTimeout(timer);
+            timer = setTimeout(validate, BLUR_VALIDATION_DELAY);
+        });
+        field.addEventListener('focus', function() {
+            clearTimeout(timer);
+        });
+    }
+
+    // Inicializar o toggle da seção de suspensão
+    if (suspCheckbox) {
+        suspCheckbox.addEventListener('change', toggleSuspensionSection);
+        toggleSuspensionSection(); // Configuração inicial
+    }
+
+    // Adicionar listeners de eventos
+    if (addSuspButton) {
+        addSuspButton.addEventListener('click', function(e) {
+            e.preventDefault();
+            addSuspension();
+        });
+    }
+
+    if (removeSuspButton) {
+        removeSuspButton.addEventListener('click', function(e) {
+            e.preventDefault();
+            removeLastSuspension();
+        });
+    }
+
+    // Adicionar validação de foco para cada campo
+    validateOnBlur(natureSelect, function() {
+        validateField(natureSelect, 'Por favor, selecione a Natureza da Infração.');
+    });
+
+    validateOnBlur(knowledgeDate, function() {
+        validateField(knowledgeDate, 'Por favor, informe a Data de Conhecimento do Fato.');
+        validateDateRelation();
+    });
+
+    validateOnBlur(instDate, function() {
+        validateField(instDate, 'Por favor, informe a Data de Instauração.');
+        validateDateRelation();
+    });
+
+    // Validações antes do envio do formulário
+    if (calculatorForm) {
+        calculatorForm.addEventListener('submit', function(e) {
+            e.preventDefault(); // Previne a submissão para validar primeiro
+
+            let firstInvalid = null;
+
+            // Validar campos obrigatórios
+            if (!validateField(natureSelect, 'Por favor, selecione a Natureza da Infração.')) {
+                firstInvalid = firstInvalid || natureSelect;
+            }
+            if (!validateField(knowledgeDate, 'Por favor, informe a Data de Conhecimento do Fato.')) {
+                firstInvalid = firstInvalid || knowledgeDate;
+            }
+            if (!validateField(instDate, 'Por favor, informe a Data de Instauração.')) {
+                firstInvalid = firstInvalid || instDate;
+            }
+
+            // Validar relação entre datas
+            if (!validateDateRelation()) {
+                firstInvalid = firstInvalid || instDate;
+            }
+
+            if (firstInvalid) {
+                firstInvalid.focus();
+            } else {
+                // Se passou na validação, enviar o formulário
+                this.submit();
+            }
+        });
+    }
+
+    // Se houver um resultado na página, role para ele
+    const resultArea = document.getElementById('result-area');
+    if (resultArea && resultArea.innerHTML.trim() !== '') {
+        setTimeout(() => resultArea.scrollIntoView({ behavior: 'smooth' }), 500);
+    }
+});
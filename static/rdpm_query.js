@@ -0,0 +1,364 @@
+// Página de consulta ao RDPM (chat)
+
+// Agendador de leituras/escritas de layout (no estilo FastDOM): num mesmo frame
+// todas as leituras (measure) rodam antes das escritas (mutate), evitando layouts forçados.
+const domScheduler = (function() {
+    const measures = [];
+    const mutates = [];
+    let scheduled = false;
+
+    function flush() {
+        scheduled = false;
+        // Escritas agendadas durante as leituras ainda entram neste frame
+        measures.splice(0).forEach(fn => fn());
+        mutates.splice(0).forEach(fn => fn());
+    }
+
+    function schedule() {
+        if (!scheduled) {
+            scheduled = true;
+            requestAnimationFrame(flush);
+        }
+    }
+
+    return {
+        measure(fn) { measures.push(fn); schedule(); },
+        mutate(fn) { mutates.push(fn); schedule(); }
+    };
+})();
+
+document.addEventListener('DOMContentLoaded', function() {
+    const inputField = document.getElementById('question-input');
+    const chatForm = document.getElementById('chat-form');
+    const chatContainer = document.getElementById('chat-history');
+    let thinkingIndicator = null; // referência mantida: dispensa busca por id ao remover
+
+    // Janela de mensagens: no máximo MAX_RENDERED_MESSAGES ficam no DOM. As demais são
+    // desanexadas (sem custo de layout) e voltam em lotes ao rolar até o topo ou o final.
+    const MAX_RENDERED_MESSAGES = 60;
+    const RESTORE_BATCH = 20;
+    const RESTORE_THRESHOLD_PX = 50;
+    const detachedMessages = []; // acima da janela, da mais antiga para a mais recente
+    const detachedNewerMessages = []; // abaixo da janela, da mais recente para a mais antiga
+    let scrollScheduled = false;
+
+    let scrollPending = false;
+
+    // Função para rolar para o final do chat (uma leitura e uma escrita por frame,
+    // mesmo que várias mensagens sejam adicionadas no mesmo frame)
+    function scrollToBottom() {
+        if (scrollPending) {
+            return;
+        }
+        scrollPending = true;
+        domScheduler.measure(function() {
+            const height = chatContainer.scrollHeight;
+            domScheduler.mutate(function() {
+                scrollPending = false;
+                chatContainer.scrollTop = height;
+            });
+        });
+    }
+
+    // Remove do DOM as mensagens além da janela (as mais antigas)
+    function trimHistory() {
+        let excess = chatContainer.children.length - MAX_RENDERED_MESSAGES;
+        while (excess-- > 0) {
+            const oldest = chatContainer.firstElementChild;
+            detachedMessages.push(oldest);
+            oldest.remove();
+        }
+    }
+
+    // Remove do DOM as mensagens além da janela (as mais recentes), após restaurar antigas
+    function trimNewerMessages() {
+        let excess = chatContainer.children.length - MAX_RENDERED_MESSAGES;
+        while (excess-- > 0) {
+            const newest = chatContainer.lastElementChild;
+            detachedNewerMessages.push(newest);
+            newest.remove();
+        }
+    }
+
+    // Reinsere um lote de mensagens antigas no topo, mantendo a posição visível
+    function restoreOlderMessages() {
+        const batch = detachedMessages.splice(-RESTORE_BATCH);
+        const previousHeight = chatContainer.scrollHeight;
+        chatContainer.prepend(...batch);
+        chatContainer.scrollTop += chatContainer.scrollHeight - previousHeight;
+        // Remover do final não desloca o conteúdo visível
+        trimNewerMessages();
+    }
+
+    // Reinsere um lote de mensagens recentes no final, mantendo a posição visível
+    function restoreNewerMessages() {
+        const batch = detachedNewerMessages.splice(-RESTORE_BATCH).reverse();
+        chatContainer.append(...batch);
+        const previousHeight = chatContainer.scrollHeight;
+        const previousTop = chatContainer.scrollTop;
+        trimHistory();
+        chatContainer.scrollTop = previousTop - (previousHeight - chatContainer.scrollHeight);
+    }
+
+    // Volta a janela para as mensagens mais recentes (antes de adicionar uma nova)
+    function showLatestMessages() {
+        if (detachedNewerMessages.length === 0) {
+            return;
+        }
+        chatContainer.append(...detachedNewerMessages.reverse());
+        detachedNewerMessages.length = 0;
+        trimHistory();
+    }
+
+    // Um único listener para todos os expanders: o conteúdo é o elemento seguinte
+    chatContainer.addEventListener('click', function(e) {
+        const expander = e.target.closest('.context-expander');
+        if (expander) {
+            expander.nextElementSibling.classList.toggle('hidden');
+        }
+    });
+
+    chatContainer.addEventListener('scroll', function() {
+        if (scrollScheduled || (detachedMessages.length === 0 && detachedNewerMessages.length === 0)) {
+            return;
+        }
+        scrollScheduled = true;
+        requestAnimationFrame(function() {
+            scrollScheduled = false;
+            const distanceToBottom = chatContainer.scrollHeight - chatContainer.scrollTop - chatContainer.clientHeight;
+            if (chatContainer.scrollTop < RESTORE_THRESHOLD_PX && detachedMessages.length > 0) {
+                restoreOlderMessages();
+            } else if (distanceToBottom < RESTORE_THRESHOLD_PX && detachedNewerMessages.length > 0) {
+                restoreNewerMessages();
+            }
+        });
+    }, { passive: true });
+
+    // Função para adicionar a mensagem do usuário e o loader
+    function addUserMessageAndLoader(question) {
+        showLatestMessages();
+        // Mostrar a mensagem do usuário imediatamente
+        const userMessage = document.createElement('div');
+        userMessage.className = 'chat-message user';
+        userMessage.innerHTML = `<div class="chat-icon">👤</div>`;
+        userMessage.append(question);
+        chatContainer.appendChild(userMessage);
+
+        // Criar e adicionar o indicador de "pensando"
+        thinkingIndicator = document.createElement('div');
+        thinkingIndicator.className = 'thinking';
+        thinkingIndicator.innerHTML = `
+            <div class="chat-icon">⚖️</div>
+            Processando 
+            <div class="dot-animation">
+                <span class="dot"></span>
+                <span class="dot"></span>
+                <span class="dot"></span>
+            </div>
+        `;
+        chatContainer.appendChild(thinkingIndicator);
+        trimHistory();
+
+        // Rolar para o final
+        scrollToBottom();
+    }
+
+    // Cria na mensagem o expander com os trechos do RDPM usados na resposta;
+    // os trechos podem ser acrescentados aos poucos, conforme chegam
+    function createContextBlock(assistantMessage) {
+        assistantMessage.insertAdjacentHTML('beforeend', `
+            <div class="context-expander"></div>
+            <div class="context-content hidden"></div>
+        `);
+
+        const contextElement = assistantMessage.lastElementChild;
+        const expander = contextElement.previousElementSibling;
+
+        let sourceCount = 0;
+        return {
+            add(sourceFragments) {
+                // Fragmentos já escapados (e memoizados) pelo servidor, unidos uma única vez
+                contextElement.insertAdjacentHTML('beforeend', sourceFragments.join(''));
+                sourceCount += sourceFragments.length;
+                expander.textContent = `🔍 Ver trechos do RDPM utilizados (${sourceCount})`;
+            }
+        };
+    }
+
+    function removeThinkingIndicator() {
+        if (thinkingIndicator) {
+            // O indicador pode estar desanexado abaixo da janela: não deve voltar ao restaurar
+            const index = detachedNewerMessages.indexOf(thinkingIndicator);
+            if (index !== -1) {
+                detachedNewerMessages.splice(index, 1);
+            }
+            thinkingIndicator.remove();
+            thinkingIndicator = null;
+        }
+    }
+
+    // Cria a mensagem (vazia) do assistente, antes do indicador de "pensando" se ele ainda existir
+    function startAssistantMessage(isError = false) {
+        const assistantMessage = document.createElement('div');
+        assistantMessage.className = isError ? 'chat-message assistant error-message' : 'chat-message assistant';
+        assistantMessage.innerHTML = `<div class="chat-icon">⚖️</div><span class="answer-text"></span>`;
+        showLatestMessages();
+        chatContainer.insertBefore(assistantMessage, thinkingIndicator);
+        trimHistory();
+        return assistantMessage;
+    }
+
+    // Função para adicionar uma resposta completa do assistente (texto simples, nunca HTML)
+    function addAssistantResponse(answer, isError = false) {
+        removeThinkingIndicator();
+        const assistantMessage = startAssistantMessage(isError);
+        assistantMessage.querySelector('.answer-text').textContent = answer;
+
+        // Rolar para o final
+        scrollToBottom();
+    }
+
+    // Lê a resposta NDJSON em partes (linhas "source", "answer", "done" ou "error"):
+    // os trechos do RDPM aparecem assim que a busca termina e o texto conforme o LLM gera,
+    // com o indicador de "pensando" mantido até o primeiro trecho da resposta
+    async function readAnswerStream(response) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let answerText = '';
+        let answerElement = null;
+        let assistantMessage = null;
+        let contextBlock = null;
+        let renderPending = false;
+
+        function ensureMessage() {
+            if (!assistantMessage) {
+                assistantMessage = startAssistantMessage();
+                answerElement = assistantMessage.querySelector('.answer-text');
+            }
+        }
+
+        // Várias partes no mesmo frame resultam numa única escrita no DOM
+        function renderAnswer() {
+            if (renderPending) {
+                return;
+            }
+            renderPending = true;
+            domScheduler.mutate(function() {
+                renderPending = false;
+                answerElement.textContent = answerText;
+            });
+            scrollToBottom();
+        }
+
+        function handleLine(line) {
+            const data = JSON.parse(line);
+            if (data.type === 'answer') {
+                ensureMessage();
+                removeThinkingIndicator();
+                answerText += data.text;
+                renderAnswer();
+            } else if (data.type === 'source') {
+                ensureMessage();
+                if (!contextBlock) {
+                    contextBlock = createContextBlock(assistantMessage);
+                }
+                contextBlock.add([data.html]);
+                scrollToBottom();
+            } else if (data.type === 'error') {
+                if (assistantMessage) {
+                    assistantMessage.remove();
+                }
+                addAssistantResponse(data.error, true);
+                return true;
+            } else if (data.type === 'done') {
+                removeThinkingIndicator();
+                ensureMessage();
+                if (!answerText) {
+                    answerElement.textContent = "Não consegui processar sua pergunta.";
+                }
+                return true;
+            }
+            return false;
+        }
+
+        while (true) {
+            const { value, done } = await reader.read();
+            buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+
+            let newline;
+            while ((newline = buffer.indexOf('\n')) !== -1) {
+                const line = buffer.slice(0, newline).trim();
+                buffer = buffer.slice(newline + 1);
+                if (line && handleLine(line)) {
+                    reader.cancel();
+                    return;
+                }
+            }
+            if (done) {
+                break;
+            }
+        }
+        throw new Error('Stream encerrado antes do fim da resposta');
+    }
+
+    // Função para processar a pergunta
+    function processQuestion(question) {
+        // Adicionar mensagem e loader
+        addUserMessageAndLoader(question);
+
+        // Fazer requisição AJAX ao servidor
+        fetch('/rdpm-query/ask', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/x-www-form-urlencoded',
+            },
+            body: 'question=' + encodeURIComponent(question)
+        })
+        .then(response => {
+            const contentType = response.headers.get('Content-Type') || '';
+            if (contentType.includes('application/x-ndjson')) {
+                return readAnswerStream(response);
+            }
+            // Erros de validação continuam chegando como JSON simples
+            return response.json().then(data => {
+                const errorMsg = data.error || "Desculpe, ocorreu um erro ao processar sua pergunta.";
+                addAssistantResponse(errorMsg, true);
+            });
+        })
+        .catch(error => {
+            console.error('Erro na requisição:', error);
+            addAssistantResponse("Desculpe, ocorreu um erro de comunicação. Por favor, tente novamente.", true);
+        });
+    }
+
+    // Evento de pressionar Enter no campo de texto
+    if (inputField) {
+        inputField.addEventListener('keypress', function(e) {
+            if (e.key === 'Enter' && !e.shiftKey) {
+                e.preventDefault();
+
+                // Só processar se tiver conteúdo
+                const question = inputField.value.trim();
+                if (question !== '') {
+                    processQuestion(question);
+                    inputField.value = '';  // Limpar o campo
+                }
+            }
+        });
+    }
+
+    // Evento de clicar no botão de enviar
+    if (chatForm) {
+        chatForm.addEventListener('submit', function(e) {
+            e.preventDefault();
+
+            // Só processar se tiver conteúdo
+            const question = inputField.value.trim();
+            if (question !== '') {
+                processQuestion(question);
+                inputField.value = '';  // Limpar o campo
+            }
+        });
+    }
+});
@@ -0,0 +1,128 @@
+// Página do corretor de texto: envia o formulário e exibe a correção em streaming.
+// O POST responde em NDJSON ("text" para cada trecho, "done" com o texto final ou "error");
+// erros de validação chegam como fragmento HTML e são exibidos diretamente.
+document.addEventListener('DOMContentLoaded', function() {
+    const form = document.getElementById('text-form');
+    const resultArea = document.getElementById('result-area');
+    const loadingIndicator = document.getElementById('text-loading');
+    if (!form || !resultArea) {
+        return;
+    }
+
+    function setLoading(visible) {
+        if (loadingIndicator) {
+            loadingIndicator.style.display = visible ? 'block' : 'none';
+        }
+    }
+
+    function showError(message) {
+        const error = document.createElement('div');
+        error.className = 'error-message';
+        error.textContent = '❌ ' + message;
+        resultArea.replaceChildren(error);
+    }
+
+    function createOutput() {
+        const container = document.createElement('div');
+        container.className = 'success-message';
+        const title = document.createElement('h3');
+        title.textContent = '📝 Texto Corrigido:';
+        const output = document.createElement('textarea');
+        output.id = 'corrected-text-output';
+        output.readOnly = true;
+        output.rows = 10;
+        container.append(title, output);
+        resultArea.replaceChildren(container);
+        return output;
+    }
+
+    async function readCorrectionStream(response) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let text = '';
+        let output = null;
+        let renderPending = false;
+
+        // Vários trechos no mesmo frame resultam numa única escrita no DOM
+        function render() {
+            if (renderPending) {
+                return;
+            }
+            renderPending = true;
+            requestAnimationFrame(function() {
+                renderPending = false;
+                output.value = text;
+            });
+        }
+
+        function handleLine(line) {
+            const data = JSON.parse(line);
+            if (data.type === 'text') {
+                if (!output) {
+                    setLoading(false);
+                    output = createOutput();
+                }
+                text += data.text;
+                render();
+            } else if (data.type === 'done') {
+                setLoading(false);
+                // O texto final vem limpo (sem blocos ``` que a API eventualmente adicione)
+                text = data.text;
+                (output || (output = createOutput())).value = text;
+                return true;
+            } else if (data.type === 'error') {
+                setLoading(false);
+                showError(data.error);
+                return true;
+            }
+            return false;
+        }
+
+        while (true) {
+            const { value, done } = await reader.read();
+            buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+
+            let newline;
+            while ((newline = buffer.indexOf('\n')) !== -1) {
+                const line = buffer.slice(0, newline).trim();
+                buffer = buffer.slice(newline + 1);
+                if (line && handleLine(line)) {
+                    reader.cancel();
+                    return;
+                }
+            }
+            if (done) {
+                break;
+            }
+        }
+        throw new Error('Stream encerrado antes do fim da correção');
+    }
+
+    form.addEventListener('submit', function(event) {
+        event.preventDefault();
+        resultArea.replaceChildren();
+        setLoading(true);
+
+        fetch(form.action, {
+            method: 'POST',
+            body: new URLSearchParams(new FormData(form))
+        })
+        .then(response => {
+            const contentType = response.headers.get('Content-Type') || '';
+            if (contentType.includes('application/x-ndjson')) {
+                return readCorrectionStream(response);
+            }
+            // Erros de validação continuam chegando como fragmento HTML
+            return response.text().then(html => {
+                setLoading(false);
+                resultArea.innerHTML = html;
+            });
+        })
+        .catch(error => {
+            console.error('Erro na correção:', error);
+            setLoading(false);
+            showError('Falha de comunicação ao corrigir o texto. Tente novamente.');
+        });
+    });
+});
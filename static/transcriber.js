@@ -0,0 +1,47 @@
+// Página do transcritor de áudio: acompanha as etapas reais da transcrição via SSE.
+// O POST devolve um indicador com data-progress-url; o stream envia eventos "stage"
+// (mensagem da etapa atual) e, ao final, "done" com o HTML do resultado.
+document.addEventListener('DOMContentLoaded', function() {
+    let progressSource = null;
+
+    function followProgress(resultArea) {
+        const progress = resultArea.querySelector('[data-progress-url]');
+        if (progressSource) {
+            progressSource.close();
+            progressSource = null;
+        }
+        if (!progress) {
+            return;
+        }
+
+        const source = new EventSource(progress.dataset.progressUrl);
+        progressSource = source;
+
+        source.addEventListener('stage', function(event) {
+            const messageElement = progress.querySelector('.progress-message');
+            if (messageElement) {
+                messageElement.innerHTML = event.data;
+            }
+        });
+
+        source.addEventListener('done', function(event) {
+            source.close();
+            progressSource = null;
+            resultArea.innerHTML = event.data;
+        });
+
+        source.onerror = function() {
+            // Reconexões são automáticas; só desiste se o navegador encerrar o stream
+            if (source.readyState === EventSource.CLOSED) {
+                progressSource = null;
+                resultArea.innerHTML = '<div class="error-message">❌ Conexão perdida ao acompanhar a transcrição.</div>';
+            }
+        };
+    }
+
+    document.body.addEventListener('htmx:afterSwap', function(event) {
+        if (event.detail.target && event.detail.target.id === 'a-result') {
+            followProgress(event.detail.target);
+        }
+    });
+});
@@ -1,11 +1,21 @@
+import io
 import os
+import re
+import stat
+import asyncio
+import time
+import secrets
+import hashlib
 import tempfile
 import shutil
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
-from datetime import datetime
+from urllib.parse import quote
 from typing import List, Union, Tuple, Optional
-from starlette.responses import FileResponse, Response, JSONResponse
+from starlette.responses import FileResponse, Response
+from utils.responses import ORJSONResponse
+from utils.http_cache import etag_matches
 
 # Configuração de logging
 log = logging.getLogger(__name__)
@@ -13,10 +23,66 @@ log = logging.getLogger(__name__)
 # Diretório temporário para uploads
 UPLOAD_TEMP_DIR = Path(tempfile.gettempdir()) / "fasthtml_uploads"
 UPLOAD_TEMP_DIR.mkdir(exist_ok=True)
+UPLOAD_TEMP_DIR_RESOLVED = UPLOAD_TEMP_DIR.resolve()
+
+# Tamanho dos blocos usados ao gravar uploads em disco
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+# Cache dos downloads: arquivos gerados são imutáveis e só existem até a limpeza periódica
+DOWNLOAD_CACHE_CONTROL = "private, max-age=3600, immutable"
+
+# Atrás do nginx: prefixo de uma location "internal" apontando para UPLOAD_TEMP_DIR
+# (ex: "/internal/"). Se definido, o envio do arquivo é delegado ao nginx (sendfile).
+X_ACCEL_REDIRECT_PREFIX = os.environ.get("X_ACCEL_REDIRECT_PREFIX")
+
+# Limpeza periódica: arquivos gerados ficam disponíveis para download por 1 hora
+TEMP_FILE_MAX_AGE_HOURS = 1
+TEMP_CLEANUP_INTERVAL = 600  # segundos
+# Jobs em andamento renovam o mtime dos seus arquivos bem antes de atingirem a idade máxima
+TEMP_FILE_KEEPALIVE_INTERVAL = 300  # segundos
+
+# Caracteres não permitidos em nomes de arquivos gravados em disco
+_UNSAFE_FILENAME_RE = re.compile(r"[^\w.\-]")
+MAX_FILENAME_LENGTH = 128
+
+# Tipos MIME por extensão (minúscula, com ponto)
+MIME_TYPES = {
+    '.pdf': 'application/pdf',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.doc': 'application/msword',
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    '.xls': 'application/vnd.ms-excel',
+    '.csv': 'text/csv',
+    '.txt': 'text/plain',
+    '.zip': 'application/zip',
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.mp3': 'audio/mpeg',
+    '.mp4': 'video/mp4',
+    '.wav': 'audio/wav',
+    '.json': 'application/json',
+    '.xml': 'application/xml',
+    '.html': 'text/html',
+}
+
+def unique_token() -> str:
+    """
+    Gera um identificador único para compor nomes de arquivos temporários.
+    Combina o relógio em nanossegundos com um sufixo aleatório, evitando
+    colisões entre uploads simultâneos no mesmo segundo.
+    
+    Returns:
+        str: Identificador único (ex: '17f3a9c2b4e5d6a7_9f1c2b3a')
+    """
+    return f"{time.time_ns():x}_{secrets.token_hex(4)}"
 
 def safe_filename(filename: str) -> str:
     """
-    Gera um nome de arquivo seguro, substituindo caracteres problemáticos.
+    Gera um nome de arquivo seguro a partir do nome enviado pelo cliente.
+    Descarta diretórios (/ ou \\), substitui caracteres problemáticos por "_"
+    e limita o tamanho, preservando a extensão.
     
     Args:
         filename (str): Nome de arquivo original
@@ -24,10 +90,14 @@ def safe_filename(filename: str) -> str:
     Returns:
         str: Nome de arquivo seguro
     """
-    # Remover caracteres potencialmente perigosos
-    safe_name = "".join(c for c in filename if c.isalnum() or c in "._- ")
-    # Substituir espaços por underscores
-    safe_name = safe_name.replace(" ", "_")
+    name = filename.rsplit("/", 1)[-1].rsplit("\\", 1)[-1]
+    safe_name = _UNSAFE_FILENAME_RE.sub("_", name).lstrip(".") or "arquivo"
+    if len(safe_name) > MAX_FILENAME_LENGTH:
+        stem, dot, ext = safe_name.rpartition(".")
+        if dot and len(ext) < 16:
+            safe_name = stem[:MAX_FILENAME_LENGTH - len(ext) - 1] + dot + ext
+        else:
+            safe_name = safe_name[:MAX_FILENAME_LENGTH]
     return safe_name
 
 def generate_temp_filepath(original_filename: str, prefix: str = None) -> Path:
@@ -42,18 +112,17 @@ def generate_temp_filepath(original_filename: str, prefix: str = None) -> Path:
         Path: Caminho para o arquivo temporário
     """
     # Obtém extensão e nome seguro
-    filename = Path(original_filename).name
-    filename = safe_filename(filename)
+    filename = safe_filename(original_filename)
     
-    # Gera timestamp para garantir unicidade
-    timestamp = int(datetime.now().timestamp())
+    # Gera identificador único (evita colisões entre uploads no mesmo segundo)
+    token = unique_token()
     
     # Adiciona prefixo se fornecido
     if prefix:
         prefix = safe_filename(prefix)
-        new_filename = f"{prefix}_{timestamp}_{filename}"
+        new_filename = f"{prefix}_{token}_{filename}"
     else:
-        new_filename = f"{timestamp}_{filename}"
+        new_filename = f"{token}_{filename}"
     
     return UPLOAD_TEMP_DIR / new_filename
 
@@ -75,24 +144,86 @@ def save_uploaded_file(file, prefix: str = None) -> Tuple[bool, str, Optional[Pa
         # Gerar caminho temporário
         temp_path = generate_temp_filepath(file.filename, prefix)
         
-        # Salvar arquivo
-        with open(temp_path, "wb") as f:
-            file_content = file.file.read()
-            f.write(file_content)
+        # Salvar arquivo (em blocos, sem carregar o conteúdo inteiro na memória)
+        _copy_upload(file.file, temp_path, UPLOAD_CHUNK_SIZE)
         
-        log.info(f"Arquivo salvo com sucesso: {temp_path}")
+        log.info("Arquivo salvo com sucesso: %s", temp_path)
         return True, "Arquivo salvo com sucesso.", temp_path
     
     except Exception as e:
-        log.error(f"Erro ao salvar arquivo: {e}", exc_info=True)
+        log.error("Erro ao salvar arquivo: %s", e, exc_info=True)
         return False, f"Erro ao salvar arquivo: {str(e)}", None
 
+def _source_fileno(source) -> Optional[int]:
+    """Descritor do arquivo de origem, ou None se ele não estiver em disco (ex: BytesIO)"""
+    # SpooledTemporaryFile ainda em memória: fileno() forçaria a gravação em disco (rollover)
+    if not getattr(source, "_rolled", True):
+        return None
+    try:
+        return source.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        return None
+
+def _copy_upload(source, dest: Path, chunk_size: int) -> None:
+    """
+    Copia o arquivo temporário do upload para o destino (executada em thread).
+    Se a origem já está em disco, a cópia é feita pelo kernel com os.sendfile;
+    caso contrário (BytesIO ou spool ainda em memória), em blocos.
+    """
+    source.seek(0)
+    with open(dest, "wb") as buffer:
+        in_fd = _source_fileno(source) if hasattr(os, "sendfile") else None
+        if in_fd is not None:
+            offset = 0
+            while True:
+                sent = os.sendfile(buffer.fileno(), in_fd, offset, chunk_size)
+                if not sent:
+                    break
+                offset += sent
+        else:
+            shutil.copyfileobj(source, buffer, chunk_size)
+
+def upload_size(upload) -> int:
+    """
+    Tamanho de um arquivo enviado (UploadFile), sem ler o conteúdo.
+    
+    Args:
+        upload: Objeto UploadFile recebido no formulário
+        
+    Returns:
+        int: Tamanho em bytes
+    """
+    size = getattr(upload, "size", None)
+    if size is None:
+        # Versões antigas do Starlette não informam o tamanho: medir pelo arquivo temporário
+        position = upload.file.tell()
+        size = upload.file.seek(0, os.SEEK_END)
+        upload.file.seek(position)
+    return size
+
+async def spool_upload(upload, dest: Union[str, Path], chunk_size: int = UPLOAD_CHUNK_SIZE) -> Path:
+    """
+    Grava um arquivo enviado (UploadFile) em disco em blocos, sem carregar o
+    conteúdo inteiro na memória e sem bloquear o event loop durante a cópia.
+    
+    Args:
+        upload: Objeto UploadFile recebido no formulário
+        dest (Union[str, Path]): Caminho de destino
+        chunk_size (int, optional): Tamanho de cada bloco lido/gravado
+        
+    Returns:
+        Path: Caminho do arquivo gravado
+    """
+    dest = Path(dest)
+    await asyncio.to_thread(_copy_upload, upload.file, dest, chunk_size)
+    return dest
+
 def delete_temp_file(file_path: Union[str, Path]) -> bool:
     """
     Remove um arquivo temporário de forma segura.
     
     Args:
-        file_path (Union[str, Path]): Caminho do arquivo a ser removido
+        file_path (Union[str, Path]): Caminho do arquivo (ou diretório) a ser removido
         
     Returns:
         bool: True se o arquivo foi removido com sucesso, False caso contrário
@@ -104,56 +235,129 @@ def delete_temp_file(file_path: Union[str, Path]) -> bool:
     
     # Verificar se o caminho está dentro do diretório temporário (medida de segurança)
     if UPLOAD_TEMP_DIR not in path.parents and path != UPLOAD_TEMP_DIR:
-        log.warning(f"Tentativa de excluir arquivo fora do diretório temporário: {path}")
+        log.warning("Tentativa de excluir arquivo fora do diretório temporário: %s", path)
         return False
     
     try:
-        if path.exists():
+        if path.is_dir():
+            shutil.rmtree(path)
+            log.debug("Diretório temporário removido: %s", path)
+            return True
+        elif path.exists():
             path.unlink()
-            log.debug(f"Arquivo temporário removido: {path}")
+            log.debug("Arquivo temporário removido: %s", path)
             return True
         else:
-            log.warning(f"Tentativa de excluir arquivo inexistente: {path}")
+            log.warning("Tentativa de excluir arquivo inexistente: %s", path)
             return False
     except Exception as e:
-        log.error(f"Erro ao excluir arquivo temporário {path}: {e}")
+        log.error("Erro ao excluir arquivo temporário %s: %s", path, e)
         return False
 
-def clean_old_temp_files(max_age_hours: int = 24) -> int:
+def _delete_temp_paths(paths: List[Union[str, Path]]) -> None:
+    """Remove os caminhos existentes da lista (executada em thread)"""
+    for path in paths:
+        if Path(path).exists():
+            delete_temp_file(path)
+
+def discard_temp_files(*paths: Union[str, Path, None]) -> None:
     """
-    Remove arquivos temporários antigos para liberar espaço.
+    Agenda a remoção de arquivos/diretórios temporários em uma thread, sem aguardar.
+    Usada nos blocos finally das rotas para não bloquear o event loop com unlink().
+    Caminhos que não chegaram a ser criados são ignorados.
     
     Args:
-        max_age_hours (int, optional): Idade máxima em horas para manter arquivos
+        *paths: Caminhos a remover (None é ignorado)
+    """
+    paths = [path for path in paths if path]
+    if paths:
+        asyncio.get_running_loop().run_in_executor(None, _delete_temp_paths, paths)
+
+def clean_old_temp_files(max_age_hours: float = 24) -> int:
+    """
+    Remove arquivos (e diretórios de saída) temporários antigos para liberar espaço.
+    
+    Args:
+        max_age_hours (float, optional): Idade máxima em horas para manter arquivos
         
     Returns:
-        int: Número de arquivos removidos
+        int: Número de itens removidos
     """
     if not UPLOAD_TEMP_DIR.exists():
         return 0
     
-    now = datetime.now().timestamp()
+    now = time.time()
     max_age_seconds = max_age_hours * 3600
     removed_count = 0
     
     try:
         for item in UPLOAD_TEMP_DIR.iterdir():
-            if item.is_file():
-                file_age = now - item.stat().st_mtime
-                if file_age > max_age_seconds:
-                    try:
-                        item.unlink()
-                        removed_count += 1
-                    except Exception as e:
-                        log.warning(f"Erro ao remover arquivo antigo {item}: {e}")
+            try:
+                if now - item.stat().st_mtime <= max_age_seconds:
+                    continue
+                if item.is_dir():
+                    shutil.rmtree(item, ignore_errors=True)
+                else:
+                    item.unlink(missing_ok=True)
+                removed_count += 1
+            except FileNotFoundError:
+                # Removido por outro worker ou pela própria rota
+                continue
+            except Exception as e:
+                log.warning("Erro ao remover arquivo antigo %s: %s", item, e)
         
-        log.info(f"Limpeza de arquivos temporários: {removed_count} arquivo(s) removido(s).")
+        if removed_count:
+            log.info("Limpeza de arquivos temporários: %s item(ns) removido(s).", removed_count)
         return removed_count
     
     except Exception as e:
-        log.error(f"Erro durante limpeza de arquivos temporários: {e}")
+        log.error("Erro durante limpeza de arquivos temporários: %s", e)
         return 0
 
+def _touch_files(paths) -> None:
+    """Renova o mtime dos arquivos que ainda existem (executada em thread)"""
+    for path in paths:
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            continue
+
+@asynccontextmanager
+async def keep_temp_files_alive(*paths: Union[str, Path], interval_seconds: int = TEMP_FILE_KEEPALIVE_INTERVAL):
+    """
+    Protege da limpeza periódica os arquivos de um job em andamento (inclusive enquanto
+    ele aguarda na fila), renovando o mtime a cada intervalo até o fim do bloco.
+    A limpeza se baseia só no mtime, então a proteção vale para todos os workers.
+    
+    Args:
+        *paths (Union[str, Path]): Arquivos do job em UPLOAD_TEMP_DIR
+        interval_seconds (int, optional): Intervalo entre as renovações
+    """
+    async def _keepalive():
+        while True:
+            await asyncio.sleep(interval_seconds)
+            await asyncio.to_thread(_touch_files, paths)
+
+    keepalive_task = asyncio.create_task(_keepalive())
+    try:
+        yield
+    finally:
+        keepalive_task.cancel()
+
+async def temp_files_cleanup_scheduler(interval_seconds: int = TEMP_CLEANUP_INTERVAL, max_age_hours: float = TEMP_FILE_MAX_AGE_HOURS):
+    """
+    Agenda a limpeza periódica do diretório temporário de uploads.
+    Esta função deve ser iniciada como uma tarefa assíncrona.
+    
+    Args:
+        interval_seconds (int, optional): Intervalo entre as varreduras
+        max_age_hours (float, optional): Idade máxima dos arquivos mantidos
+    """
+    while True:
+        # A varredura faz I/O de disco: executar em thread para não travar o event loop
+        await asyncio.to_thread(clean_old_temp_files, max_age_hours)
+        await asyncio.sleep(interval_seconds)
+
 def get_mime_type(filename: str) -> str:
     """
     Determina o tipo MIME com base na extensão do arquivo.
@@ -164,32 +368,12 @@ def get_mime_type(filename: str) -> str:
     Returns:
         str: Tipo MIME do arquivo
     """
-    extension = Path(filename).suffix.lower()
-    
-    mime_types = {
-        '.pdf': 'application/pdf',
-        '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-        '.doc': 'application/msword',
-        '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        '.xls': 'application/vnd.ms-excel',
-        '.csv': 'text/csv',
-        '.txt': 'text/plain',
-        '.zip': 'application/zip',
-        '.png': 'image/png',
-        '.jpg': 'image/jpeg',
-        '.jpeg': 'image/jpeg',
-        '.gif': 'image/gif',
-        '.mp3': 'audio/mpeg',
-        '.mp4': 'video/mp4',
-        '.wav': 'audio/wav',
-        '.json': 'application/json',
-        '.xml': 'application/xml',
-        '.html': 'text/html',
-    }
+    _, dot, extension = filename.rpartition(".")
     
-    return mime_types.get(extension, 'application/octet-stream')
+    return MIME_TYPES.get(dot + extension.lower(), 'application/octet-stream')
 
-def serve_file_download(file_path: Union[str, Path], download_filename: str = None) -> FileResponse:
+def serve_file_download(file_path: Union[str, Path], download_filename: str = None,
+                        stat_result: os.stat_result = None, headers: dict = None) -> FileResponse:
     """
     Cria uma resposta para download de arquivo.
     
@@ -197,14 +381,16 @@ def serve_file_download(file_path: Union[str, Path], download_filename: str = No
         file_path (Union[str, Path]): Caminho do arquivo a ser servido
         download_filename (str, optional): Nome a ser usado para download 
             (se None, usa o nome original)
+        stat_result (os.stat_result, optional): Resultado de stat já obtido (evita nova consulta ao disco)
+        headers (dict, optional): Cabeçalhos adicionais (ETag, Cache-Control)
         
     Returns:
         FileResponse: Resposta para download do arquivo
     """
     path = Path(file_path)
     
-    if not path.exists():
-        log.error(f"Arquivo para download não encontrado: {path}")
+    if stat_result is None and not path.exists():
+        log.error("Arquivo para download não encontrado: %s", path)
         raise FileNotFoundError(f"Arquivo {path} não existe")
     
     # Se o nome de download não for especificado, usa o nome original do arquivo
@@ -213,11 +399,55 @@ def serve_file_download(file_path: Union[str, Path], download_filename: str = No
     # Determinar o tipo MIME
     media_type = get_mime_type(filename)
     
-    return FileResponse(
+    response = FileResponse(
         path=path,
         filename=filename,
-        media_type=media_type
+        media_type=media_type,
+        stat_result=stat_result
     )
+    # O FileResponse gera seu próprio ETag a partir do stat; os cabeçalhos informados prevalecem
+    if headers:
+        response.headers.update(headers)
+    return response
+
+def accel_redirect_response(filename: str, headers: dict = None) -> Response:
+    """
+    Resposta vazia com X-Accel-Redirect: o nginx envia o arquivo diretamente do disco.
+    
+    Args:
+        filename (str): Nome do arquivo dentro de UPLOAD_TEMP_DIR
+        headers (dict, optional): Cabeçalhos adicionais (ETag, Cache-Control)
+        
+    Returns:
+        Response: Resposta sem corpo para o nginx completar
+    """
+    quoted_name = quote(filename)
+    if quoted_name != filename:
+        content_disposition = f"attachment; filename*=utf-8''{quoted_name}"
+    else:
+        content_disposition = f'attachment; filename="{filename}"'
+    accel_headers = {
+        "X-Accel-Redirect": f"{X_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{quoted_name}",
+        "Content-Type": get_mime_type(filename),
+        "Content-Disposition": content_disposition,
+    }
+    if headers:
+        accel_headers.update(headers)
+    return Response(headers=accel_headers)
+
+def download_etag(filename: str, stat_result: os.stat_result) -> str:
+    """
+    ETag forte de um arquivo gerado (nome único + data de modificação + tamanho).
+    
+    Args:
+        filename (str): Nome do arquivo
+        stat_result (os.stat_result): Resultado de stat do arquivo
+        
+    Returns:
+        str: ETag entre aspas
+    """
+    key = f"{filename}-{stat_result.st_mtime_ns}-{stat_result.st_size}"
+    return f'"{hashlib.md5(key.encode()).hexdigest()}"'
 
 def download_file_route(request, filename: str):
     """
@@ -232,27 +462,38 @@ def download_file_route(request, filename: str):
         Response: Resposta HTTP apropriada (arquivo ou erro)
     """
     try:
-        # Verificar segurança do nome do arquivo
-        safe_name = Path(filename).name
-        if not safe_name or ".." in safe_name:
-            log.warning(f"Tentativa de download com nome de arquivo suspeito: {filename}")
-            return Response("Nome de arquivo inválido", status_code=400)
-        
-        file_path = UPLOAD_TEMP_DIR / safe_name
+        # Resolver o caminho (inclusive links simbólicos) e exigir que fique diretamente em UPLOAD_TEMP_DIR
+        try:
+            file_path = (UPLOAD_TEMP_DIR / filename).resolve(strict=True)
+            stat_result = file_path.stat()
+        except (OSError, RuntimeError):
+            log.warning("Arquivo solicitado para download não encontrado: %s", filename)
+            return Response("Arquivo não encontrado", status_code=404)
         
-        if not file_path.exists():
-            log.warning(f"Arquivo solicitado para download não encontrado: {safe_name}")
+        if file_path.parent != UPLOAD_TEMP_DIR_RESOLVED:
+            log.warning("Tentativa de download fora do diretório temporário: %s", filename)
+            return Response("Nome de arquivo inválido", status_code=400)
+        if not stat.S_ISREG(stat_result.st_mode):
+            log.warning("Arquivo solicitado para download não encontrado: %s", filename)
             return Response("Arquivo não encontrado", status_code=404)
+        safe_name = file_path.name
+        
+        # Arquivos gerados não mudam: o cliente que já baixou recebe 304 sem corpo
+        headers = {"ETag": download_etag(safe_name, stat_result), "Cache-Control": DOWNLOAD_CACHE_CONTROL}
+        if request is not None and etag_matches(request, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
         
-        log.info(f"Servindo download: {safe_name}")
+        log.info("Servindo download: %s", safe_name)
         
-        return serve_file_download(file_path)
+        if X_ACCEL_REDIRECT_PREFIX:
+            return accel_redirect_response(safe_name, headers=headers)
+        return serve_file_download(file_path, stat_result=stat_result, headers=headers)
     
     except Exception as e:
-        log.error(f"Erro ao servir download para {filename}: {e}", exc_info=True)
+        log.error("Erro ao servir download para %s: %s", filename, e, exc_info=True)
         return Response("Erro ao processar download", status_code=500)
 
-def prepare_error_response(message: str, status_code: int = 400) -> JSONResponse:
+def prepare_error_response(message: str, status_code: int = 400) -> ORJSONResponse:
     """
     Prepara uma resposta de erro JSON padronizada.
     
@@ -261,14 +502,14 @@ def prepare_error_response(message: str, status_code: int = 400) -> JSONResponse
         status_code (int, optional): Código de status HTTP
         
     Returns:
-        JSONResponse: Resposta de erro formatada
+        ORJSONResponse: Resposta de erro formatada
     """
-    return JSONResponse(
+    return ORJSONResponse(
         content={"success": False, "error": message},
         status_code=status_code
     )
 
-def prepare_success_response(data=None, message: str = "Operação concluída com sucesso") -> JSONResponse:
+def prepare_success_response(data=None, message: str = "Operação concluída com sucesso") -> ORJSONResponse:
     """
     Prepara uma resposta de sucesso JSON padronizada.
     
@@ -277,11 +518,11 @@ def prepare_success_response(data=None, message: str = "Operação concluída co
         message (str, optional): Mensagem de sucesso
         
     Returns:
-        JSONResponse: Resposta de sucesso formatada
+        ORJSONResponse: Resposta de sucesso formatada
     """
     response = {"success": True, "message": message}
     
     if data is not None:
         response["data"] = data
     
-    return JSONResponse(content=response)
+    return ORJSONResponse(content=response)
@@ -0,0 +1,59 @@
+# utils/http_cache.py
+
+import hashlib
+from typing import Tuple
+from fasthtml.common import to_xml
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, Response
+
+def render_static_html(component) -> Tuple[bytes, str]:
+    """
+    Renderiza um componente FastHTML uma única vez para reutilização entre requisições.
+
+    Args:
+        component: Componente (ou página completa) a ser renderizado, ou HTML já renderizado (str)
+
+    Returns:
+        Tuple[bytes, str]: (HTML em bytes UTF-8, ETag forte correspondente)
+    """
+    html = component if isinstance(component, str) else to_xml(component)
+    html_bytes = html.encode("utf-8")
+    etag = f'"{hashlib.md5(html_bytes).hexdigest()}"'
+    return html_bytes, etag
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Verifica se o cabeçalho If-None-Match da requisição corresponde ao ETag.
+
+    Args:
+        request (Request): Requisição Starlette
+        etag (str): ETag atual do recurso
+
+    Returns:
+        bool: True se o cliente já possui a versão atual
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates
+
+def cached_html_response(request: Request, html_bytes: bytes, etag: str, cache_control: str = "no-cache") -> Response:
+    """
+    Retorna HTML pré-renderizado, respondendo 304 quando o cliente já possui a versão atual.
+
+    Args:
+        request (Request): Requisição Starlette
+        html_bytes (bytes): HTML pré-renderizado
+        etag (str): ETag do conteúdo
+        cache_control (str, optional): Valor do cabeçalho Cache-Control
+
+    Returns:
+        Response: HTMLResponse com o conteúdo ou resposta 304 sem corpo
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(html_bytes, headers=headers)
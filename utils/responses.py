@@ -0,0 +1,54 @@
+# utils/responses.py
+
+import json
+import logging
+from typing import Any
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    logging.warning("Módulo orjson não encontrado. Respostas JSON usarão o módulo json padrão.")
+    orjson = None
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSONResponse serializada com orjson (bem mais rápido que o json padrão).
+    Se o orjson não estiver instalado, mantém a serialização do Starlette.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+def ndjson_line(content: Any) -> bytes:
+    """
+    Serializa um objeto como uma linha de NDJSON (JSON + quebra de linha),
+    para respostas transmitidas em partes.
+
+    Args:
+        content (Any): Objeto serializável em JSON
+
+    Returns:
+        bytes: Linha JSON terminada em "\\n"
+    """
+    if orjson is None:
+        return json.dumps(content, ensure_ascii=False).encode("utf-8") + b"\n"
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+
+def json_loads(data: str | bytes) -> Any:
+    """
+    Desserializa JSON com orjson quando disponível (json padrão caso contrário).
+    Erros de sintaxe levantam json.JSONDecodeError nos dois casos
+    (orjson.JSONDecodeError é subclasse dela).
+
+    Args:
+        data (str | bytes): Texto JSON
+
+    Returns:
+        Any: Objeto Python correspondente
+    """
+    if orjson is None:
+        return json.loads(data)
+    return orjson.loads(data)
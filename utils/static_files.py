@@ -0,0 +1,279 @@
+# utils/static_files.py
+
+import os
+import re
+import asyncio
+import gzip
+import hashlib
+import logging
+import mimetypes
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Tuple, Optional
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+from starlette.responses import FileResponse, Response
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:
+    logging.warning("Módulo brotli não encontrado. Variantes .br dos arquivos estáticos não serão geradas.")
+    brotli = None
+
+# Configuração de logging
+log = logging.getLogger(__name__)
+
+# Diretório de arquivos estáticos
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+
+# Nomes com impressão digital: style.<8 hex>.css
+FINGERPRINT_RE = re.compile(r"\.([0-9a-f]{8})(\.[^./]+)$")
+
+# Políticas de cache
+CACHE_IMMUTABLE = "public, max-age=31536000, immutable"
+CACHE_SHORT = "public, max-age=300"
+
+# Extensões de texto que valem a pena pré-comprimir
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".svg", ".json", ".html", ".txt"}
+
+# Variantes pré-comprimidas, em ordem de preferência: (Content-Encoding, sufixo)
+PRECOMPRESSED_VARIANTS = (("br", ".br"), ("gzip", ".gz"))
+
+# Arquivos com impressão digital até este tamanho são servidos da memória após o primeiro acesso
+MEMORY_CACHE_MAX_SIZE = 64 * 1024
+
+def strip_fingerprint(path: str) -> str:
+    """Remove a impressão digital do nome do arquivo (style.1a2b3c4d.css -> style.css)"""
+    match = FINGERPRINT_RE.search(path)
+    if match:
+        return path[:match.start()] + match.group(2)
+    return path
+
+def _write_atomic(target: Path, data: bytes) -> None:
+    """Grava o arquivo de forma atômica (vários workers podem gerar a mesma variante)"""
+    fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, target)
+    except Exception:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+def precompress_static_files(directory: Path = STATIC_DIR) -> int:
+    """
+    Gera as variantes .gz (e .br, se o módulo brotli estiver disponível) dos arquivos
+    estáticos de texto. Variantes já atualizadas são mantidas.
+
+    Args:
+        directory (Path, optional): Diretório de arquivos estáticos
+
+    Returns:
+        int: Número de variantes geradas
+    """
+    if not directory.is_dir():
+        return 0
+
+    generated = 0
+    for source in directory.rglob("*"):
+        if not source.is_file() or source.suffix not in COMPRESSIBLE_SUFFIXES:
+            continue
+        try:
+            source_mtime = source.stat().st_mtime
+            data = None
+            for encoding, suffix in PRECOMPRESSED_VARIANTS:
+                if encoding == "br" and brotli is None:
+                    continue
+                target = source.with_name(source.name + suffix)
+                if target.exists() and target.stat().st_mtime >= source_mtime:
+                    continue
+                if data is None:
+                    data = source.read_bytes()
+                if encoding == "br":
+                    compressed = brotli.compress(data, quality=11)
+                else:
+                    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                _write_atomic(target, compressed)
+                generated += 1
+        except Exception as e:
+            log.warning("Erro ao pré-comprimir arquivo estático %s: %s", source, e)
+
+    if generated:
+        log.info("Pré-compressão de estáticos: %s variante(s) gerada(s).", generated)
+    return generated
+
+def _quality(params: list) -> float:
+    """Valor q de um item do Accept-Encoding (1.0 se ausente, 0.0 se inválido)"""
+    for param in params:
+        name, _, value = param.partition("=")
+        if name.strip() == "q":
+            try:
+                return float(value.strip())
+            except ValueError:
+                return 0.0
+    return 1.0
+
+def _accepted_encodings(scope: Scope) -> set:
+    """Extrai os encodings aceitos pelo cliente do cabeçalho Accept-Encoding (q > 0)"""
+    for name, value in scope.get("headers", []):
+        if name == b"accept-encoding":
+            accepted = set()
+            for token in value.decode("latin-1").lower().split(","):
+                encoding, *params = token.split(";")
+                if encoding.strip() and _quality(params) > 0:
+                    accepted.add(encoding.strip())
+            return accepted
+    return set()
+
+@lru_cache(maxsize=None)
+def static_url(filename: str) -> str:
+    """
+    Gera a URL pública de um arquivo estático com impressão digital do conteúdo.
+
+    Args:
+        filename (str): Caminho relativo ao diretório estático (ex: "style.css")
+
+    Returns:
+        str: URL no formato /static/style.<hash>.css, ou /static/<filename> se o arquivo não existir
+    """
+    file_path = STATIC_DIR / filename
+    try:
+        digest = hashlib.sha1(file_path.read_bytes()).hexdigest()[:8]
+    except OSError:
+        log.warning("Arquivo estático não encontrado para fingerprint: %s", file_path)
+        return f"/static/{filename}"
+
+    path = Path(filename)
+    return f"/static/{path.with_name(f'{path.stem}.{digest}{path.suffix}').as_posix()}"
+
+def has_current_fingerprint(path: str) -> bool:
+    """
+    Indica se o caminho traz a impressão digital do conteúdo atual do arquivo.
+    Só nesse caso a URL pode ser servida como imutável: impressões digitais antigas
+    ou inventadas (style.00000000.css) continuam servindo o arquivo, mas com cache curto.
+    Deve ser chamada apenas para arquivos existentes (static_url é memoizada).
+
+    Args:
+        path (str): Caminho relativo ao diretório estático (ex: "style.1a2b3c4d.css")
+
+    Returns:
+        bool: True se a impressão digital corresponde à gerada por static_url
+    """
+    if not FINGERPRINT_RE.search(path):
+        return False
+    return static_url(strip_fingerprint(path)) == f"/static/{path}"
+
+def vendor_url(filename: str, fallback_url: str) -> str:
+    """
+    URL de uma biblioteca de terceiros hospedada em static/vendor/ (ver scripts/fetch_vendor.py).
+
+    Args:
+        filename (str): Nome do arquivo dentro de static/vendor/
+        fallback_url (str): URL do CDN usada se o arquivo não tiver sido baixado
+
+    Returns:
+        str: URL local com impressão digital, ou a URL do CDN
+    """
+    if (STATIC_DIR / "vendor" / filename).is_file():
+        return static_url(f"vendor/{filename}")
+    return fallback_url
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles com Cache-Control agressivo e variantes pré-comprimidas.
+    Arquivos com a impressão digital do conteúdo atual são servidos como imutáveis;
+    os demais recebem um max-age curto (o ETag do Starlette é mantido).
+    Se o cliente aceitar br/gzip e existir a variante .br/.gz, ela é servida.
+    Respostas pequenas de arquivos com a impressão digital atual (conteúdo fixo por deploy)
+    ficam em memória: os acessos seguintes não tocam o sistema de arquivos.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (caminho com impressão digital, encodings aceitos) -> (corpo, cabeçalhos)
+        # Só entram caminhos cuja impressão digital foi validada: nomes arbitrários
+        # não são armazenados e não fazem o cache crescer
+        self._memory_cache: Dict[Tuple[str, frozenset], Tuple[bytes, dict]] = {}
+
+    def _memory_cache_key(self, path: str, scope: Scope) -> Optional[Tuple[str, frozenset]]:
+        """
+        Chave do cache em memória, ou None se a resposta não pode vir do cache:
+        arquivo sem impressão digital, ou requisição com Range (respondida com 206 pelo FileResponse).
+        """
+        if not FINGERPRINT_RE.search(path):
+            return None
+        if any(name == b"range" for name, _ in scope.get("headers", [])):
+            return None
+        supported = {encoding for encoding, _ in PRECOMPRESSED_VARIANTS}
+        return path, frozenset(_accepted_encodings(scope) & supported)
+
+    async def _store_in_memory(self, cache_key: Tuple[str, frozenset], response: Response) -> None:
+        """Guarda em memória uma resposta de arquivo pequena (lida uma única vez, em thread)"""
+        if not isinstance(response, FileResponse) or response.status_code != 200:
+            return
+        if int(response.headers.get("content-length", MEMORY_CACHE_MAX_SIZE + 1)) > MEMORY_CACHE_MAX_SIZE:
+            return
+        body = await asyncio.to_thread(Path(response.path).read_bytes)
+        headers = {name: value for name, value in response.headers.items() if name != "content-length"}
+        self._memory_cache[cache_key] = (body, headers)
+
+    def lookup_path(self, path: str) -> Tuple[str, Optional[object]]:
+        full_path, stat_result = super().lookup_path(path)
+        if stat_result is None:
+            # Remove a impressão digital do nome e procura o arquivo original
+            stripped = strip_fingerprint(path)
+            if stripped != path:
+                return super().lookup_path(stripped)
+        return full_path, stat_result
+
+    async def _get_precompressed_response(self, path: str, scope: Scope) -> Optional[Response]:
+        """Retorna a variante pré-comprimida aceita pelo cliente, se existir"""
+        real_path = strip_fingerprint(path)
+        if Path(real_path).suffix not in COMPRESSIBLE_SUFFIXES:
+            return None
+
+        accepted = _accepted_encodings(scope)
+        for encoding, suffix in PRECOMPRESSED_VARIANTS:
+            if encoding not in accepted:
+                continue
+            try:
+                response = await super().get_response(real_path + suffix, scope)
+            except HTTPException as e:
+                if e.status_code == 404:
+                    continue
+                raise
+            if response.status_code == 404:
+                continue
+            response.headers["Content-Encoding"] = encoding
+            media_type = mimetypes.guess_type(real_path)[0] or "application/octet-stream"
+            if media_type.startswith("text/") or media_type.endswith("javascript"):
+                media_type += "; charset=utf-8"
+            response.headers["Content-Type"] = media_type
+            return response
+        return None
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        cache_key = self._memory_cache_key(path, scope)
+        cached = self._memory_cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            body, headers = cached
+            response = Response(body, headers=headers)
+            if self.is_not_modified(response.headers, Headers(scope=scope)):
+                return NotModifiedResponse(response.headers)
+            return response
+
+        response = await self._get_precompressed_response(path, scope)
+        if response is None:
+            response = await super().get_response(path, scope)
+        if Path(strip_fingerprint(path)).suffix in COMPRESSIBLE_SUFFIXES:
+            response.headers["Vary"] = "Accept-Encoding"
+        if response.status_code in (200, 304):
+            immutable = has_current_fingerprint(path)
+            response.headers["Cache-Control"] = CACHE_IMMUTABLE if immutable else CACHE_SHORT
+            if cache_key and immutable:
+                await self._store_in_memory(cache_key, response)
+        return response
@@ -1,12 +1,15 @@
 # utils/task_manager.py
 
+import os
 import time
 import logging
 import threading
 import asyncio
 import uuid
+import functools
+import multiprocessing
 from typing import Dict, Any, Callable, Optional
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from starlette.background import BackgroundTasks
 
 # Configuração de logging
@@ -21,6 +24,20 @@ TASK_STORE: Dict[str, Dict[str, Any]] = {}
 MAX_WORKERS = 8  # Ajuste conforme necessário para seu hardware
 task_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
 
+# Executor de processos para operações CPU-bound (PDF, OCR), fora do event loop e do GIL.
+# Os workers não são criados por fork do worker do uvicorn (multithread, com torch/FAISS
+# carregados): nascem de um forkserver limpo, ou por spawn onde não há forkserver.
+PROCESS_WORKERS = max(2, (os.cpu_count() or 2) // 2)
+PROCESS_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+# Importados uma única vez no forkserver: os workers já nascem com eles carregados
+PROCESS_PRELOAD_MODULES = ["modules.pdf_transformer"]
+_process_context = multiprocessing.get_context(PROCESS_START_METHOD)
+if PROCESS_START_METHOD == "forkserver":
+    _process_context.set_forkserver_preload(PROCESS_PRELOAD_MODULES)
+process_executor = ProcessPoolExecutor(max_workers=PROCESS_WORKERS, mp_context=_process_context)
+# Criação dos workers em andamento (ver start_process_pool): run_in_process aguarda a conclusão
+_process_pool_start: Optional[asyncio.Future] = None
+
 # Bloqueio para acesso seguro ao dicionário de tarefas
 task_store_lock = threading.Lock()
 
@@ -58,7 +75,7 @@ def update_task_status(task_id: str, **kwargs) -> None:
         if task_id in TASK_STORE:
             TASK_STORE[task_id].update(kwargs)
         else:
-            log.warning(f"Tentativa de atualizar tarefa inexistente: {task_id}")
+            log.warning("Tentativa de atualizar tarefa inexistente: %s", task_id)
 
 def clean_old_tasks(max_age_hours: int = 24) -> None:
     """
@@ -77,7 +94,7 @@ def clean_old_tasks(max_age_hours: int = 24) -> None:
             del TASK_STORE[task_id]
     
     if task_ids_to_remove:
-        log.info(f"Limpeza: removidas {len(task_ids_to_remove)} tarefas antigas")
+        log.info("Limpeza: removidas %s tarefas antigas", len(task_ids_to_remove))
 
 async def task_cleanup_scheduler():
     """
@@ -119,12 +136,12 @@ def execute_task_in_thread(task_id: str, func: Callable, *args, **kwargs) -> Non
             end_time=time.time()
         )
         
-        log.info(f"Tarefa {task_id} concluída com sucesso")
+        log.info("Tarefa %s concluída com sucesso", task_id)
         
     except Exception as e:
         # Em caso de erro, registra no status
         error_msg = str(e)
-        log.error(f"Erro na tarefa {task_id}: {error_msg}", exc_info=True)
+        log.error("Erro na tarefa %s: %s", task_id, error_msg, exc_info=True)
         update_task_status(
             task_id, 
             status="failed",
@@ -158,7 +175,7 @@ def submit_task(func: Callable, *args, **kwargs) -> str:
     # Submete a tarefa para a pool de threads
     task_executor.submit(execute_task_in_thread, task_id, func, *args, **kwargs)
     
-    log.info(f"Tarefa {task_id} enviada para processamento em background")
+    log.info("Tarefa %s enviada para processamento em background", task_id)
     return task_id
 
 def start_background_task(background_tasks: BackgroundTasks, func: Callable, *args, **kwargs) -> str:
@@ -193,9 +210,48 @@ def start_background_task(background_tasks: BackgroundTasks, func: Callable, *ar
     # Adiciona a tarefa à fila de background
     background_tasks.add_task(_background_wrapper)
     
-    log.info(f"Tarefa {task_id} agendada em background via BackgroundTasks")
+    log.info("Tarefa %s agendada em background via BackgroundTasks", task_id)
     return task_id
 
+async def run_in_process(func: Callable, *args, **kwargs) -> Any:
+    """
+    Executa uma função CPU-bound no pool de processos sem bloquear o event loop.
+    A função e seus argumentos precisam ser serializáveis (pickle): use funções de módulo,
+    não métodos de instâncias (a instância seria serializada a cada chamada).
+    
+    Args:
+        func (Callable): Função a ser executada
+        *args, **kwargs: Argumentos para a função
+        
+    Returns:
+        Any: O retorno da função
+    """
+    if _process_pool_start is not None and not _process_pool_start.done():
+        # Workers ainda sendo criados na inicialização: aguardar (asyncio.wait não cancela
+        # a criação se esta requisição for cancelada)
+        await asyncio.wait({_process_pool_start})
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(process_executor, functools.partial(func, *args, **kwargs))
+
+def _spawn_process_workers() -> None:
+    """Cria todos os workers do pool de processos (e o forkserver) de uma vez (executada em thread)"""
+    # Cada submit sem worker ocioso cria um novo processo, até PROCESS_WORKERS
+    futures = [process_executor.submit(os.getpid) for _ in range(PROCESS_WORKERS)]
+    for future in futures:
+        future.result()
+
+async def start_process_pool() -> None:
+    """
+    Cria os workers do pool de processos em background (o forkserver importa os módulos
+    pré-carregados), para que a primeira requisição não pague a criação dos processos.
+    Deve ser iniciada como tarefa de inicialização do lifespan, junto com os demais componentes.
+    """
+    global _process_pool_start
+    loop = asyncio.get_running_loop()
+    _process_pool_start = loop.run_in_executor(None, _spawn_process_workers)
+    await _process_pool_start
+    log.info("Pool de processos iniciado (%s, %s worker(s)).", PROCESS_START_METHOD, PROCESS_WORKERS)
+
 async def initialize_async_processor():
     """
     Inicializa o processador assíncrono.
@@ -215,6 +271,7 @@ def shutdown_async_processor():
     Deve ser chamada durante o encerramento da aplicação.
     """
     task_executor.shutdown(wait=False)
+    process_executor.shutdown(wait=False, cancel_futures=True)
     log.info("Processador assíncrono finalizado")
 
 def get_pending_tasks_count() -> int:
@@ -268,7 +325,7 @@ def cancel_task(task_id: str) -> bool:
                 'status': 'cancelled',
                 'end_time': time.time()
             })
-            log.info(f"Tarefa {task_id} cancelada")
+            log.info("Tarefa %s cancelada", task_id)
             return True
         
         # Não pode cancelar tarefas já em andamento ou concluídas
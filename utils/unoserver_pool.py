@@ -0,0 +1,129 @@
+# utils/unoserver_pool.py
+
+import os
+import shutil
+import socket
+import asyncio
+import logging
+import tempfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import List, Optional
+
+# Configuração de logging
+log = logging.getLogger(__name__)
+
+# Instâncias residentes do LibreOffice por worker do uvicorn (cada uma ocupa ~200 MB)
+UNOSERVER_INSTANCES = int(os.environ.get("UNOSERVER_INSTANCES", "1"))
+UNOSERVER_HOST = "127.0.0.1"
+UNOSERVER_START_TIMEOUT = 60
+UNOSERVER_PROFILE_DIR = Path(tempfile.gettempdir()) / "fasthtml_unoserver_profiles"
+
+def _free_port() -> int:
+    """Obtém uma porta TCP livre (cada worker do uvicorn inicia seus próprios servidores)"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((UNOSERVER_HOST, 0))
+        return sock.getsockname()[1]
+
+async def _wait_for_port(port: int, process: asyncio.subprocess.Process, timeout: float) -> bool:
+    """Aguarda o servidor aceitar conexões (ou o processo terminar)"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        if process.returncode is not None:
+            return False
+        try:
+            _, writer = await asyncio.open_connection(UNOSERVER_HOST, port)
+            writer.close()
+            await writer.wait_closed()
+            return True
+        except OSError:
+            await asyncio.sleep(0.5)
+    return False
+
+class UnoServerPool:
+    """
+    Pool de processos unoserver: o LibreOffice fica residente e cada conversão
+    é apenas uma chamada do cliente unoconvert, sem pagar a inicialização do soffice.
+    Se o unoserver não estiver instalado, o pool fica indisponível e as rotas
+    continuam usando o soffice --headless.
+    """
+
+    def __init__(self, size: int = UNOSERVER_INSTANCES):
+        self.size = max(0, size)
+        self._processes: List[asyncio.subprocess.Process] = []
+        self._ports: asyncio.Queue = asyncio.Queue()
+
+    @property
+    def available(self) -> bool:
+        """True se há ao menos um servidor pronto"""
+        return bool(self._processes)
+
+    async def _start_instance(self, index: int) -> Optional[asyncio.subprocess.Process]:
+        """Inicia um unoserver com portas e perfil de usuário exclusivos"""
+        port, uno_port = _free_port(), _free_port()
+        profile_dir = UNOSERVER_PROFILE_DIR / f"{os.getpid()}_{index}"
+        process = await asyncio.create_subprocess_exec(
+            "unoserver",
+            "--interface", UNOSERVER_HOST, "--port", str(port),
+            "--uno-port", str(uno_port),
+            "--user-installation", profile_dir.resolve().as_uri(),
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        if await _wait_for_port(port, process, UNOSERVER_START_TIMEOUT):
+            log.info("unoserver #%s pronto na porta %s (pid %s).", index, port, process.pid)
+            self._ports.put_nowait(port)
+            return process
+        log.error("unoserver #%s não respondeu na porta %s; instância descartada.", index, port)
+        await self._terminate(process)
+        return None
+
+    async def start(self) -> bool:
+        """
+        Inicia as instâncias do pool.
+
+        Returns:
+            bool: True se ao menos uma instância ficou pronta
+        """
+        if not self.size or not shutil.which("unoserver"):
+            log.info("unoserver não disponível; conversões LibreOffice usarão soffice --headless.")
+            return False
+
+        processes = await asyncio.gather(
+            *(self._start_instance(index) for index in range(self.size)), return_exceptions=True
+        )
+        for process in processes:
+            if isinstance(process, Exception):
+                log.error("Erro ao iniciar unoserver: %s", process)
+            elif process is not None:
+                self._processes.append(process)
+        return self.available
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Reserva a porta de um servidor livre (aguarda se todos estiverem em uso)"""
+        port = await self._ports.get()
+        try:
+            yield port
+        finally:
+            self._ports.put_nowait(port)
+
+    @staticmethod
+    async def _terminate(process: asyncio.subprocess.Process) -> None:
+        """Encerra um processo unoserver (SIGTERM, depois SIGKILL)"""
+        if process.returncode is not None:
+            return
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), timeout=10)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+
+    async def stop(self) -> None:
+        """Encerra todas as instâncias do pool"""
+        processes, self._processes = self._processes, []
+        await asyncio.gather(*(self._terminate(process) for process in processes), return_exceptions=True)
+        if processes:
+            log.info("%s instância(s) unoserver encerrada(s).", len(processes))